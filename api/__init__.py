@@ -0,0 +1,39 @@
+# api/__init__.py
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Mount
+
+
+class FlaskAppContext:
+    """ASGI middleware running every API request inside a Flask app context, so config, the
+    cache, the password policy and the login limiters work exactly as in the blueprints."""
+
+    def __init__(self, app, flask_app):
+        self.app = app
+        self.flask_app = flask_app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        with self.flask_app.app_context():
+            await self.app(scope, receive, send)
+
+
+async def _api_error(request, exc):
+    return JSONResponse({"error": exc.message}, exc.status_code, headers=exc.headers)
+
+
+def create_api(flask_app):
+    """The versioned JSON API (/v1/...) as an ASGI app over the asyncio engine; see asgi.py.
+
+    The engine is in api.state.engine; whoever serves the API disposes it on shutdown.
+    """
+    from .database import init_async_db
+    from .v1 import ApiError, routes as v1_routes
+
+    engine, sessions = init_async_db(flask_app)
+    api = Starlette(routes=[Mount("/v1", routes=v1_routes)], exception_handlers={ApiError: _api_error})
+    api.state.engine = engine
+    api.state.sessions = sessions
+    api.add_middleware(FlaskAppContext, flask_app=flask_app)
+    return api
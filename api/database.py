@@ -0,0 +1,37 @@
+# api/database.py
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+
+from db_profiles import engine_options, install_profile
+
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+
+class ApiSession(Session):
+    """The sync Session inside the API's AsyncSessions; a class of its own so session
+    events (stat counters, list cache invalidation) can be attached to it as to db.session."""
+
+
+def async_url(url):
+    """The same database through its asyncio driver: aiosqlite or asyncpg."""
+    url = make_url(url)
+    driver = ASYNC_DRIVERS.get(url.get_backend_name())
+    if driver is None:
+        raise ValueError(f"No asyncio driver for {url.drivername}; set API_DATABASE_URL")
+    return url.set(drivername=driver).render_as_string(hide_password=False)
+
+
+def init_async_db(flask_app):
+    """(engine, sessionmaker) for the API, tuned by the same DB_PROFILE as the Flask engine."""
+    from read_models import register_list_invalidation
+    from stats import register_counter_tracking
+
+    config = flask_app.config
+    url = config.get("API_DATABASE_URL") or async_url(config["SQLALCHEMY_DATABASE_URI"])
+    engine = create_async_engine(url, **engine_options(config["DB_PROFILE"], url, config))
+    install_profile(engine.sync_engine, config["DB_PROFILE"], config)
+    if config.get("STATS_COUNTERS"):
+        register_counter_tracking(ApiSession)
+    register_list_invalidation(ApiSession)
+    return engine, async_sessionmaker(engine, expire_on_commit=False, sync_session_class=ApiSession)
@@ -0,0 +1,320 @@
+# api/v1.py
+from datetime import date, datetime
+from functools import wraps
+
+from flask import current_app
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import aliased
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from live import publish_appointment
+from models import Appointment, User
+from notifications import notify_status_change
+from pagination import KeysetPage, appointment_filters, clamp_per_page
+from passwords import verify_password
+from ratelimit import login_throttled, record_login_result
+from read_models import appointment_page_select
+from scheduling import (WORKING_HOURS_SELECT, SlotFullError, booked_select, check_range, full_slots_select,
+                        index_bookings, is_bookable, open_slots, overbooked_select, slot_lock_select,
+                        working_hours_or_default)
+
+TOKEN_SALT = "api-token"
+
+
+class ApiError(Exception):
+    """Raised by handlers; rendered as {"error": message} with the status code."""
+
+    def __init__(self, status_code, message, headers=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.message = message
+        self.headers = headers
+
+
+# ---------------- HELPERS -----------------
+def _serializer():
+    return URLSafeTimedSerializer(current_app.config["SECRET_KEY"], salt=TOKEN_SALT)
+
+
+async def _authenticate(request, session):
+    """The (id, name, role) row of the bearer token's user; looked up every time, so a deleted
+    user or a role change applies at once."""
+    header = request.headers.get("authorization", "")
+    if not header.startswith("Bearer "):
+        raise ApiError(401, "missing bearer token", {"WWW-Authenticate": "Bearer"})
+    try:
+        data = _serializer().loads(header[7:], max_age=current_app.config.get("API_TOKEN_TTL", 604800))
+        user_id = int(data["id"])
+    except (BadSignature, KeyError, TypeError, ValueError):
+        raise ApiError(401, "invalid or expired token", {"WWW-Authenticate": "Bearer"})
+    user = (await session.execute(select(User.id, User.name, User.role).where(User.id == user_id))).first()
+    if user is None:
+        raise ApiError(401, "invalid or expired token", {"WWW-Authenticate": "Bearer"})
+    return user
+
+
+def endpoint(auth=True):
+    """Open an AsyncSession for the handler and, unless auth=False, resolve the caller."""
+    def decorator(fn):
+        @wraps(fn)
+        async def handler(request):
+            async with request.app.state.sessions() as session:
+                user = await _authenticate(request, session) if auth else None
+                return await fn(request, session, user)
+        return handler
+    return decorator
+
+
+async def _json_body(request):
+    try:
+        body = await request.json()
+    except ValueError:
+        raise ApiError(400, "request body must be JSON")
+    if not isinstance(body, dict):
+        raise ApiError(400, "request body must be a JSON object")
+    return body
+
+
+def _parse(value, fmt, name):
+    try:
+        return datetime.strptime(str(value), fmt)
+    except ValueError:
+        raise ApiError(400, f"{name} must look like {fmt.replace('%', '')}")
+
+
+def _appointment_json(row, patient_name=None, doctor_name=None):
+    return {
+        "id": row.id,
+        "date": row.date.isoformat(),
+        "time": row.time.strftime("%H:%M") if row.time else None,
+        "status": row.status,
+        "message": row.message,
+        "patient_full_name": row.patient_full_name,
+        "patient_insurance": row.patient_insurance,
+        "patient": {"id": row.patient_id, "name": getattr(row, "patient_name", patient_name)},
+        "doctor": ({"id": row.doctor_id, "name": getattr(row, "doctor_name", doctor_name)}
+                   if row.doctor_id else None),
+    }
+
+
+def _appointment_select():
+    """Appointment columns plus both names: one SELECT, nothing lazy-loaded (which asyncio can't do)."""
+    patient, doctor = aliased(User), aliased(User)
+    return (
+        select(Appointment.id, Appointment.date, Appointment.time, Appointment.status, Appointment.message,
+               Appointment.patient_full_name, Appointment.patient_insurance, Appointment.patient_id,
+               Appointment.doctor_id, patient.name.label("patient_name"), doctor.name.label("doctor_name"))
+        .join(patient, Appointment.patient_id == patient.id)
+        .outerjoin(doctor, Appointment.doctor_id == doctor.id)
+    )
+
+
+def _visible_to(user):
+    """WHERE criteria with the pages' rules: patients see their own, doctors theirs, admins everything."""
+    if user.role == "admin":
+        return ()
+    if user.role == "doctor":
+        return (Appointment.doctor_id == user.id,)
+    return (Appointment.patient_id == user.id,)
+
+
+# ---------------- AUTH -----------------
+@endpoint(auth=False)
+async def create_token(request, session, user):
+    """POST {"email", "password"} -> {"token", "expires_in", "user"}; send it as "Authorization: Bearer"."""
+    body = await _json_body(request)
+    email = str(body.get("email") or "").strip().lower()
+    password = str(body.get("password") or "")
+
+    retry_after = login_throttled(email, request.client.host if request.client else None)
+    if retry_after:
+        raise ApiError(429, "too many login attempts", {"Retry-After": str(retry_after)})
+
+    account = (await session.execute(select(User).where(User.email == email))).scalar_one_or_none()
+    # Hashing takes tens of milliseconds of CPU; off the event loop it doesn't stall other requests
+    ok = await run_in_threadpool(_verify, current_app._get_current_object(), account, password)
+    record_login_result(email, ok)
+    if not ok:
+        raise ApiError(401, "invalid credentials")
+    if session.is_modified(account):
+        await session.commit()  # saves the hash upgraded by verify_password
+
+    return JSONResponse({
+        "token": _serializer().dumps({"id": account.id}),
+        "expires_in": current_app.config.get("API_TOKEN_TTL", 604800),
+        "user": {"id": account.id, "name": account.name, "email": account.email, "role": account.role},
+    })
+
+
+def _verify(flask_app, account, password):
+    with flask_app.app_context():
+        return verify_password(account, password)
+
+
+def _publish(flask_app, kind, appt, patient_name):
+    # Off the event loop: the postgres broker's NOTIFY is a blocking round-trip
+    with flask_app.app_context():
+        publish_appointment(kind, appt, patient_name)
+
+
+# ---------------- APPOINTMENTS -----------------
+@endpoint()
+async def list_appointments(request, session, user):
+    """GET ?status=&doctor=&date_from=&date_to=&cursor=&per_page= (doctors: &scope=unassigned)."""
+    args = request.query_params
+    filters = appointment_filters(args)
+    if user.role == "doctor" and args.get("scope") == "unassigned":
+        criteria = (Appointment.doctor_id.is_(None),)
+    else:
+        criteria = _visible_to(user)
+    if user.role != "admin":
+        filters.pop("doctor_id", None)
+
+    try:
+        per_page = int(args.get("per_page", current_app.config.get("APPOINTMENTS_PER_PAGE", 50)))
+    except ValueError:
+        raise ApiError(400, "per_page must be a number")
+    per_page = clamp_per_page(per_page)
+    rows = (await session.execute(appointment_page_select(criteria, args.get("cursor"), per_page, filters))).all()
+    page = KeysetPage.from_rows(rows, per_page)
+    return JSONResponse({"appointments": [_appointment_json(r) for r in page], "next_cursor": page.next_cursor})
+
+
+@endpoint()
+async def get_appointment(request, session, user):
+    stmt = _appointment_select().where(*_visible_to(user), Appointment.id == request.path_params["appt_id"])
+    row = (await session.execute(stmt)).first()
+    if row is None:
+        raise ApiError(404, "appointment not found")
+    return JSONResponse(_appointment_json(row))
+
+
+async def _lock_slot(session, day, t):
+    stmt = slot_lock_select((await session.connection()).dialect.name, day, t) if t else None
+    if stmt is not None:
+        await session.execute(stmt)
+
+
+async def _check_capacity(session, day, t):
+    """scheduling.check_capacity for the async session."""
+    await session.flush()
+    if t and (await session.execute(overbooked_select([(day, t)]))).first() is not None:
+        raise SlotFullError("that slot is fully booked")
+
+
+@endpoint()
+async def book_appointment(request, session, user):
+    """POST {"date": "2026-01-10", "time": "14:30", "doctor_id", "message", "full_name", "insurance"}."""
+    body = await _json_body(request)
+    day = _parse(body.get("date"), "%Y-%m-%d", "date").date()
+    t = _parse(body.get("time"), "%H:%M", "time").time()
+    try:
+        doctor_id = int(body["doctor_id"]) if body.get("doctor_id") else None
+    except (TypeError, ValueError):
+        raise ApiError(400, "doctor_id must be a number")
+
+    slot_minutes = current_app.config.get("APPOINTMENT_SLOT_MINUTES", 30)
+    hours = working_hours_or_default((await session.execute(WORKING_HOURS_SELECT)).scalar())
+    if day < date.today() or not is_bookable(day, t, slot_minutes, hours):
+        raise ApiError(400, "that time is outside working hours; see /availability")
+
+    doctor_name = None
+    if doctor_id:
+        doctor_name = (await session.execute(
+            select(User.name).where(User.id == doctor_id, User.role == "doctor")
+        )).scalar()
+        if doctor_name is None:
+            raise ApiError(400, "unknown doctor")
+
+    appt = Appointment(patient_id=user.id, doctor_id=doctor_id or None, date=day, time=t,
+                       message=body.get("message"), patient_full_name=body.get("full_name"),
+                       patient_insurance=body.get("insurance"))
+    # uq_appointment_doctor_slot rejects a double booking even if two requests race;
+    # the capacity check does the same for "any doctor" bookings
+    await _lock_slot(session, day, t)
+    session.add(appt)
+    try:
+        await _check_capacity(session, day, t)
+        await session.commit()
+    except (IntegrityError, SlotFullError):
+        await session.rollback()
+        raise ApiError(409, "that slot was just booked; pick another time")
+    await run_in_threadpool(_publish, current_app._get_current_object(), "created", appt, user.name)
+    return JSONResponse(_appointment_json(appt, user.name, doctor_name), 201)
+
+
+@endpoint()
+async def update_appointment_status(request, session, user):
+    """PATCH {"status": "approved" | "rejected"}: the appointment's doctor, or an admin."""
+    body = await _json_body(request)
+    status = body.get("status")
+    if status not in ("approved", "rejected"):
+        raise ApiError(400, "status must be approved or rejected")
+
+    appt = await session.get(Appointment, request.path_params["appt_id"])
+    if appt is None:
+        raise ApiError(404, "appointment not found")
+    if not (user.role == "admin" or (user.role == "doctor" and appt.doctor_id == user.id)):
+        raise ApiError(403, "you cannot modify this appointment")
+
+    await _lock_slot(session, appt.date, appt.time)
+    appt.status = status
+    notify_status_change(appt, session)
+    try:
+        await _check_capacity(session, appt.date, appt.time)
+        await session.commit()
+    except (IntegrityError, SlotFullError):
+        # Re-approving a rejected booking whose slot was taken since
+        await session.rollback()
+        raise ApiError(409, "that would double-book a doctor")
+
+    row = (await session.execute(_appointment_select().where(Appointment.id == appt.id))).first()
+    await run_in_threadpool(_publish, current_app._get_current_object(), "status", row, row.patient_name)
+    return JSONResponse(_appointment_json(row))
+
+
+# ---------------- AVAILABILITY / DOCTORS -----------------
+@endpoint()
+async def availability(request, session, user):
+    """GET ?start=2026-01-10&end=2026-01-16&doctor=3, same answer as the /availability page endpoint."""
+    args = request.query_params
+    if "start" not in args:
+        raise ApiError(400, "start and end must be dates in YYYY-MM-DD format")
+    start = _parse(args["start"], "%Y-%m-%d", "start").date()
+    end = _parse(args.get("end", args["start"]), "%Y-%m-%d", "end").date()
+    doctor = args.get("doctor")
+    doctor_id = int(doctor) if doctor and doctor.isdigit() else None
+    try:
+        check_range(start, end)
+    except ValueError as e:
+        raise ApiError(400, str(e))
+
+    slot_minutes = current_app.config.get("APPOINTMENT_SLOT_MINUTES", 30)
+    hours = working_hours_or_default((await session.execute(WORKING_HOURS_SELECT)).scalar())
+    rows = (await session.execute(full_slots_select(start, end))).all()
+    if doctor_id:
+        rows += (await session.execute(booked_select(doctor_id, start, end))).all()
+    booked = index_bookings(rows, slot_minutes)
+    return JSONResponse({"doctor_id": doctor_id, "slot_minutes": slot_minutes,
+                         "slots": open_slots(hours, booked, start, end, slot_minutes)})
+
+
+@endpoint()
+async def list_doctors(request, session, user):
+    rows = (await session.execute(select(User.id, User.name).where(User.role == "doctor").order_by(User.name))).all()
+    return JSONResponse({"doctors": [{"id": r.id, "name": r.name} for r in rows]})
+
+
+routes = [
+    Route("/token", create_token, methods=["POST"]),
+    Route("/appointments", list_appointments, methods=["GET"]),
+    Route("/appointments", book_appointment, methods=["POST"]),
+    Route("/appointments/{appt_id:int}", get_appointment, methods=["GET"]),
+    Route("/appointments/{appt_id:int}", update_appointment_status, methods=["PATCH"]),
+    Route("/availability", availability, methods=["GET"]),
+    Route("/doctors", list_doctors, methods=["GET"]),
+]
@@ -2,104 +2,311 @@
 
 from flask import Flask
 from flask_login import LoginManager
-from flask_migrate import Migrate
 from dotenv import load_dotenv
 import os
+import sys
 
-from models import db, User
-from routes import register_routes
+from models import db
+from db_profiles import default_profile, engine_options, install_profile, describe
 
-# ----------------------
-# Load environment variables
-# ----------------------
-load_dotenv()  # Loads variables from .env
+basedir = os.path.abspath(os.path.dirname(__file__))
 
-USE_SUPABASE = os.getenv("USE_SUPABASE", "False").lower() in ["true", "1", "yes"]
-SUPABASE_DB_URL = os.getenv("SUPABASE_DB_URL")
-SECRET_KEY = os.getenv("SECRET_KEY", "dev-secret-key")
+login_manager = LoginManager()
+login_manager.login_view = "auth.login"
+
+
+def _flag(name, default="False"):
+    return os.getenv(name, default).lower() in ["true", "1", "yes"]
 
-# ----------------------
-# Flask App Setup
-# ----------------------
-app = Flask(__name__)
-app.config["SECRET_KEY"] = SECRET_KEY
-app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 
 # ----------------------
-# Database Configuration
+# Configuration (environment / .env)
 # ----------------------
-basedir = os.path.abspath(os.path.dirname(__file__))
+def load_config(app):
+    """Read every setting from the environment into app.config; create_app() applies overrides after."""
+    config = app.config
+    config["SECRET_KEY"] = os.getenv("SECRET_KEY", "dev-secret-key")
+    config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 
-if USE_SUPABASE:
-    if not SUPABASE_DB_URL:
-        raise ValueError("SUPABASE_DB_URL must be set when USE_SUPABASE=True")
+    # ---------------- Database -----------------
+    config["USE_SUPABASE"] = _flag("USE_SUPABASE")
+    config["SUPABASE_DB_URL"] = os.getenv("SUPABASE_DB_URL")
+    config["DATABASE_URL"] = os.getenv("DATABASE_URL")  # explicit URL wins (benchmarks, CI)
 
-    app.config["SQLALCHEMY_DATABASE_URI"] = SUPABASE_DB_URL
+    # Engine profile (see db_profiles.py)
+    # 🔑 VERY IMPORTANT on Supabase: use "postgres-pooler" with the transaction pooler (port 6543)
+    config["DB_PROFILE"] = os.getenv("DB_PROFILE")  # default: from the database URL
+    config["DB_MAX_CONNECTIONS"] = int(os.getenv("DB_MAX_CONNECTIONS", "0"))  # budget for all workers; 0 = 5 + 10 each
+    config["WEB_CONCURRENCY"] = int(os.getenv("WEB_CONCURRENCY", "1"))  # gunicorn workers (gunicorn reads it too)
+    config["GUNICORN_THREADS"] = int(os.getenv("GUNICORN_THREADS", "1"))
+    config["DB_STATEMENT_TIMEOUT_MS"] = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))  # 0 = no timeout
+    config["DB_APPLICATION_NAME"] = os.getenv("DB_APPLICATION_NAME", "dental")
+    config["SQLITE_BUSY_TIMEOUT_MS"] = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+    config["SQLITE_MMAP_SIZE"] = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
 
-    # 🔑 VERY IMPORTANT: Supabase connection stability
-    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
-        "pool_pre_ping": True,   # Fixes 'server closed the connection unexpectedly'
-        "pool_recycle": 300,     # Recycle connections every 5 minutes
-        "pool_size": 5,
-        "max_overflow": 10,
-    }
+    # Read replicas (see replicas.py): GET/HEAD requests read from these, everything else uses the primary
+    config["DATABASE_REPLICA_URLS"] = [u.strip() for u in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if u.strip()]
+    config["REPLICA_HEALTH_INTERVAL"] = int(os.getenv("REPLICA_HEALTH_INTERVAL", "10"))  # seconds between checks
+    config["REPLICA_MAX_LAG_SECONDS"] = int(os.getenv("REPLICA_MAX_LAG_SECONDS", "0"))  # 0 = don't check lag
+    config["REPLICA_CONNECT_TIMEOUT"] = int(os.getenv("REPLICA_CONNECT_TIMEOUT", "2"))
+    config["REPLICA_STICKY_SECONDS"] = int(os.getenv("REPLICA_STICKY_SECONDS", "5"))  # primary reads after a write
 
-    print("Using Supabase/Postgres DB")
+    # ---------------- Uploads -----------------
+    config["UPLOAD_FOLDER"] = os.path.join(basedir, "static", "uploads")
+    config["MAX_CONTENT_LENGTH"] = 2 * 1024 * 1024  # 2MB max upload
 
-else:
-    # Local SQLite (development only)
-    instance_folder = os.path.join(basedir, "instance")
-    os.makedirs(instance_folder, exist_ok=True)
+    # Where uploads live: "local" (UPLOAD_FOLDER) or "s3" (any S3-compatible bucket, e.g. MinIO)
+    config["STORAGE_BACKEND"] = os.getenv("STORAGE_BACKEND", "local")
+    config["S3_BUCKET"] = os.getenv("S3_BUCKET")
+    config["S3_ENDPOINT_URL"] = os.getenv("S3_ENDPOINT_URL")
+    config["S3_REGION"] = os.getenv("S3_REGION")
+    config["S3_KEY_PREFIX"] = os.getenv("S3_KEY_PREFIX", "uploads/")
+    config["STORAGE_PUBLIC_URL"] = os.getenv("STORAGE_PUBLIC_URL")  # public bucket/CDN base, skips presigning
+    config["STORAGE_URL_EXPIRES"] = int(os.getenv("STORAGE_URL_EXPIRES", "3600"))
 
-    db_path = os.path.join(instance_folder, "dentist.db")
-    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{db_path}"
+    # Resized WebP/JPEG copies of uploads, built off the request thread (see images.py)
+    config["IMAGE_VARIANT_WIDTHS"] = tuple(
+        int(w) for w in os.getenv("IMAGE_VARIANT_WIDTHS", "320,640,1280").split(",")
+    )
+    config["IMAGE_WORKERS"] = int(os.getenv("IMAGE_WORKERS", "2"))
 
-    print("Using local SQLite DB:", db_path)
+    # ---------------- Static files (see assets.py) -----------------
+    # Serve the fingerprinted, precompressed copies from `manage.py build-assets` when built
+    config["STATIC_FINGERPRINTS"] = _flag("STATIC_FINGERPRINTS", "True")
 
-# ----------------------
-# Initialize Database
-# ----------------------
-db.init_app(app)
+    # ---------------- Templates (see jinja_cache.py) -----------------
+    config["JINJA_BYTECODE_CACHE"] = os.getenv("JINJA_BYTECODE_CACHE", "filesystem")  # filesystem, cache or off
+    config["JINJA_CACHE_DIR"] = os.getenv("JINJA_CACHE_DIR")  # default: instance/jinja_cache
+    config["TEMPLATE_WARMUP"] = True  # compile every template at startup (off for the CLI)
 
-# ----------------------
-# Flask-Migrate Setup
-# ----------------------
-migrate = Migrate(app, db)
+    # ---------------- Listings / Scheduling -----------------
+    config["APPOINTMENTS_PER_PAGE"] = int(os.getenv("APPOINTMENTS_PER_PAGE", "50"))
+    config["APPOINTMENT_SLOT_MINUTES"] = int(os.getenv("APPOINTMENT_SLOT_MINUTES", "30"))
+    # Seconds to cache each list page per user and filters (see read_models.py); 0 = off
+    config["LIST_CACHE_TTL"] = int(os.getenv("LIST_CACHE_TTL", "0"))
 
-# ----------------------
-# Upload Folder Setup
-# ----------------------
-UPLOAD_FOLDER = os.path.join(basedir, "static", "uploads")
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+    # ---------------- Live Dashboard Updates (/doctor/events, see live.py) -----------------
+    # "local" (one worker process), "postgres" (LISTEN/NOTIFY across workers) or "off"; unset =
+    # "local" when a single process has threads to spare (asgi.py or GUNICORN_THREADS > 1), else "off"
+    config["LIVE_UPDATES_BACKEND"] = os.getenv("LIVE_UPDATES_BACKEND")
+    config["LIVE_DATABASE_URL"] = os.getenv("LIVE_DATABASE_URL")  # LISTEN connection; not the transaction pooler
+    config["LIVE_BUFFER_SIZE"] = int(os.getenv("LIVE_BUFFER_SIZE", "100"))  # events a stream may lag before resync
+    config["LIVE_REPLAY_SIZE"] = int(os.getenv("LIVE_REPLAY_SIZE", "500"))  # recent events kept for reconnects
+    # Each open stream holds a request thread: at most one less than the process has, so pages
+    # are always served, and each ends after LIVE_STREAM_SECONDS
+    config["LIVE_MAX_STREAMS"] = int(os.getenv("LIVE_MAX_STREAMS", "0"))  # per process; 0 = threads - 1
+    config["LIVE_STREAM_SECONDS"] = int(os.getenv("LIVE_STREAM_SECONDS", "300"))
+    config["LIVE_HEARTBEAT_SECONDS"] = int(os.getenv("LIVE_HEARTBEAT_SECONDS", "15"))
 
-app.config["UPLOAD_FOLDER"] = UPLOAD_FOLDER
-app.config["MAX_CONTENT_LENGTH"] = 2 * 1024 * 1024  # 2MB max upload
+    # ---------------- Query Count Guard (tests / debug) -----------------
+    config["QUERY_COUNT_LIMIT"] = int(os.getenv("QUERY_COUNT_LIMIT", "0"))  # 0 = guard off
 
-# ----------------------
-# Login Manager Setup
-# ----------------------
-login_manager = LoginManager()
-login_manager.init_app(app)
-login_manager.login_view = "auth.login"
+    # ---------------- Request Metrics (/admin/metrics, /admin/metrics/prometheus) -----------------
+    config["SLOW_REQUEST_MS"] = int(os.getenv("SLOW_REQUEST_MS", "0"))  # 0 = don't log slow requests
+    config["SQL_TRACE_SAMPLE_RATE"] = float(os.getenv("SQL_TRACE_SAMPLE_RATE", "0.05"))  # share of requests traced
+    config["METRICS_TOKEN"] = os.getenv("METRICS_TOKEN")  # bearer token for Prometheus scrapers
 
-@login_manager.user_loader
-def load_user(user_id):
-    return User.query.get(int(user_id))
+    # ---------------- Cache -----------------
+    config["CACHE_BACKEND"] = os.getenv("CACHE_BACKEND", "simple")  # "simple" (per worker) or "redis" (shared)
+    config["CACHE_REDIS_URL"] = os.getenv("CACHE_REDIS_URL") or os.getenv("REDIS_URL")
+    # Seconds the rendered home page is kept; 0 = until invalidated with redis, 30s with simple
+    # (a change only invalidates the cache of the worker that made it)
+    config["HOME_CACHE_TTL"] = int(os.getenv("HOME_CACHE_TTL", "0"))
+    config["BUILD_VERSION"] = os.getenv("BUILD_VERSION")  # e.g. the git commit; default: digest of templates and assets
+
+    # ---------------- Background Jobs / Notifications (run `python manage.py worker`) -----------------
+    config["SMTP_HOST"] = os.getenv("SMTP_HOST")  # unset = notifications are only logged
+    config["SMTP_PORT"] = int(os.getenv("SMTP_PORT", "587"))
+    config["SMTP_USERNAME"] = os.getenv("SMTP_USERNAME")
+    config["SMTP_PASSWORD"] = os.getenv("SMTP_PASSWORD")
+    config["MAIL_FROM"] = os.getenv("MAIL_FROM", "no-reply@localhost")
+    config["REMINDER_HOUR"] = int(os.getenv("REMINDER_HOUR", "9"))
+    config["JOB_RETENTION_DAYS"] = int(os.getenv("JOB_RETENTION_DAYS", "7"))
+
+    # ---------------- Dashboard Counters -----------------
+    config["STATS_COUNTERS"] = _flag("STATS_COUNTERS")
+
+    # ---------------- Password Hashing (see passwords.py) -----------------
+    config["PASSWORD_HASH_ALGORITHM"] = os.getenv("PASSWORD_HASH_ALGORITHM", "scrypt")  # scrypt, pbkdf2 or argon2
+    config["PASSWORD_HASH_COST"] = int(os.getenv("PASSWORD_HASH_COST", "0")) or None  # fixed work factor
+    config["PASSWORD_HASH_TARGET_MS"] = int(os.getenv("PASSWORD_HASH_TARGET_MS", "0"))  # calibrate when no cost
+    config["PASSWORD_HASH_WARMUP"] = True  # build the unknown-email dummy hash at startup (off for the CLI)
+
+    # ---------------- Login Rate Limiting (checked before any password hashing, see ratelimit.py) -----------------
+    config["RATELIMIT_BACKEND"] = os.getenv("RATELIMIT_BACKEND", "memory")  # "memory" (per worker) or "redis"
+    config["RATELIMIT_REDIS_URL"] = os.getenv("RATELIMIT_REDIS_URL") or config["CACHE_REDIS_URL"]
+    config["LOGIN_LIMIT_PER_IP"] = int(os.getenv("LOGIN_LIMIT_PER_IP", "30"))  # attempts per window
+    config["LOGIN_LIMIT_PER_EMAIL"] = int(os.getenv("LOGIN_LIMIT_PER_EMAIL", "5"))  # failures per window
+    config["LOGIN_LIMIT_WINDOW"] = int(os.getenv("LOGIN_LIMIT_WINDOW", "300"))  # seconds
+
+    # Behind a reverse proxy every request comes from the proxy's address; trust its
+    # X-Forwarded-For so limits apply per client (set to the number of proxies in front)
+    config["TRUSTED_PROXY_HOPS"] = int(os.getenv("TRUSTED_PROXY_HOPS", "0"))
+
+    # ---------------- JSON API (asgi.py, see api/) -----------------
+    config["API_TOKEN_TTL"] = int(os.getenv("API_TOKEN_TTL", str(7 * 24 * 3600)))  # bearer token lifetime, seconds
+    config["API_DATABASE_URL"] = os.getenv("API_DATABASE_URL")  # default: the app's database via aiosqlite/asyncpg
+    config["ASGI_WSGI_THREADS"] = int(os.getenv("ASGI_WSGI_THREADS", "10"))  # threads for the pages under asgi.py
+    config["SERVED_BY_ASGI"] = False  # set by asgi.py
+
+    # ---------------- Sessions -----------------
+    # Identities are cached between requests instead of hitting the user table (see identity.py)
+    config["USER_SESSION_MODE"] = os.getenv("USER_SESSION_MODE")  # "off", "cache" or "signed"; unset = "cache" with redis, else "off"
+    config["USER_CACHE_TTL"] = int(os.getenv("USER_CACHE_TTL", "300"))
+
+
+def configure_database(app):
+    config = app.config
+    if config.get("SQLALCHEMY_DATABASE_URI"):
+        print("Using database:", config["SQLALCHEMY_DATABASE_URI"].split("@")[-1], file=sys.stderr)
+
+    elif config["DATABASE_URL"]:
+        config["SQLALCHEMY_DATABASE_URI"] = config["DATABASE_URL"]
+        print("Using DATABASE_URL:", config["DATABASE_URL"].split("@")[-1], file=sys.stderr)
+
+    elif config["USE_SUPABASE"]:
+        if not config["SUPABASE_DB_URL"]:
+            raise ValueError("SUPABASE_DB_URL must be set when USE_SUPABASE=True")
+
+        config["SQLALCHEMY_DATABASE_URI"] = config["SUPABASE_DB_URL"]
+
+        print("Using Supabase/Postgres DB", file=sys.stderr)
+
+    else:
+        # Local SQLite (development only)
+        instance_folder = os.path.join(basedir, "instance")
+        os.makedirs(instance_folder, exist_ok=True)
+
+        db_path = os.path.join(instance_folder, "dentist.db")
+        config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{db_path}"
+
+        print("Using local SQLite DB:", db_path, file=sys.stderr)
+
+    config["DB_PROFILE"] = config["DB_PROFILE"] or default_profile(config["SQLALCHEMY_DATABASE_URI"])
+    config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(
+        config["DB_PROFILE"], config["SQLALCHEMY_DATABASE_URI"], config
+    )
+    print("DB profile:", describe(config["DB_PROFILE"], config["SQLALCHEMY_ENGINE_OPTIONS"]), file=sys.stderr)
 
-# ----------------------
-# Register Blueprints
-# ----------------------
-register_routes(app)
 
 # ----------------------
-# Initialize SQLite DB (ONLY for local use)
+# App Factory
 # ----------------------
-if not USE_SUPABASE:
+def create_app(config=None):
+    """Build the Flask app. `config` (a dict) overrides what the environment says.
+
+    Nothing here connects to the database or creates tables; run `python manage.py init-db`
+    (or `python manage.py db upgrade`) for the schema.
+    """
+    from assets import init_assets
+    from cache import init_cache, register_home_invalidation
+    from identity import init_identity
+    from instrumentation import init_instrumentation
+    from jinja_cache import init_templates
+    from live import init_live
+    from passwords import init_passwords
+    from query_guard import init_query_guard
+    from read_models import register_list_invalidation
+    from ratelimit import init_ratelimit
+    from replicas import init_replicas
+    from stats import init_stats
+    from storage import init_storage
+    from uploads import upload_url
+
+    load_dotenv()  # Loads variables from .env
+
+    app = Flask(__name__)
+    load_config(app)
+    app.config.update(config or {})
+
+    # ---------------- Database -----------------
+    configure_database(app)
+    db.init_app(app)
+    with app.app_context():
+        install_profile(db.engine, app.config["DB_PROFILE"], app.config)
+
+    init_replicas(app)
+    if app.config["DATABASE_REPLICA_URLS"]:
+        print("Read replicas:", ", ".join(r.name for r in app.extensions["db_replicas"].replicas), file=sys.stderr)
+
+    # ---------------- Uploads -----------------
+    os.makedirs(app.config["UPLOAD_FOLDER"], exist_ok=True)
+    app.jinja_env.globals["upload_url"] = upload_url
+    init_storage(app)
+    if init_assets(app):
+        print("Static files: fingerprinted build in static/dist", file=sys.stderr)
+
+    # ---------------- Request hooks -----------------
+    init_query_guard(app)
+    init_instrumentation(app)
+
+    init_cache(app)
+    register_home_invalidation(db.session)
+    register_list_invalidation(db.session)
+    init_stats(app)
+    init_live(app)
+
+    init_passwords(app)
+    init_ratelimit(app)
+
+    if app.config["TRUSTED_PROXY_HOPS"]:
+        from werkzeug.middleware.proxy_fix import ProxyFix
+
+        hops = app.config["TRUSTED_PROXY_HOPS"]
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=hops, x_proto=hops)
+
+    # ---------------- Login Manager -----------------
+    login_manager.init_app(app)
+    init_identity(app, login_manager)
+
+    # ---------------- Blueprints (imported here, not when app.py is imported) -----------------
+    from routes import register_routes
+
+    register_routes(app)
+    init_templates(app)  # after the blueprints, whose template folders it also warms
+    return app
+
+
+def init_db(app):
+    """Create missing tables (local SQLite / first run); Postgres uses `manage.py db upgrade`."""
     with app.app_context():
         db.create_all()
 
+
+def reset_after_fork(app):
+    """Run in every gunicorn worker right after fork (see gunicorn.conf.py).
+
+    With preload_app the master built the engines; a worker must never reuse the master's
+    pooled sockets, so the pools are replaced without closing the parent's connections.
+    """
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+    replica_set = app.extensions.get("db_replicas")
+    if replica_set is not None:
+        for replica in replica_set.replicas:
+            replica.engine.dispose(close=False)
+
+
+# `gunicorn app:app` and scripts doing `from app import app` still work; the app is only
+# built the first time the name is looked up
+_app = None
+
+
+def __getattr__(name):
+    global _app
+    if name == "app":
+        if _app is None:
+            _app = create_app()
+        return _app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 # ----------------------
 # Run Server
 # ----------------------
 if __name__ == "__main__":
-    app.run(debug=True)
+    dev_app = create_app()
+    if dev_app.config["SQLALCHEMY_DATABASE_URI"].startswith("sqlite"):
+        init_db(dev_app)
+    dev_app.run(debug=True)
@@ -0,0 +1,35 @@
+# asgi.py
+"""ASGI entry point: the async JSON API under /api/v1, the Flask blueprints for everything else.
+
+    WEB_CONCURRENCY=4 uvicorn asgi:app --proxy-headers
+
+uvicorn reads its worker count from WEB_CONCURRENCY, as the app does (prefer it to
+--workers). The blueprints run in a thread pool (ASGI_WSGI_THREADS) behind the same server, so the
+web pages keep working unchanged; `gunicorn app:app` remains the pages-only deployment.
+"""
+import contextlib
+
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.routing import Mount
+
+from api import create_api
+from app import create_app
+
+flask_app = create_app({"SERVED_BY_ASGI": True})
+api = create_api(flask_app)
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    yield
+    await api.state.engine.dispose()
+
+
+app = Starlette(
+    routes=[
+        Mount("/api", app=api),
+        Mount("/", app=WSGIMiddleware(flask_app, workers=flask_app.config["ASGI_WSGI_THREADS"])),
+    ],
+    lifespan=lifespan,
+)
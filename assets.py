@@ -0,0 +1,152 @@
+# assets.py
+"""Fingerprinted, precompressed static files (`python manage.py build-assets`).
+
+build_assets() copies everything under static/ except uploads/ (served by /media) to
+static/dist/ as name.<hash>.ext, next to .br/.gz copies of the text formats, and writes
+static/dist/manifest.json. With a manifest, url_for('static', filename='css/style.css')
+points at the fingerprinted copy, which is served with a one-year immutable Cache-Control
+and the smallest encoding the browser accepts.
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import shutil
+
+from flask import current_app, request, send_from_directory
+
+try:
+    import brotli  # optional: pip install brotli
+except ImportError:
+    brotli = None
+
+BUILD_DIR = "dist"
+MANIFEST = "manifest.json"
+SKIP_DIRS = {"uploads", BUILD_DIR}
+COMPRESSIBLE = {".css", ".js", ".mjs", ".svg", ".ico", ".json", ".map", ".txt", ".xml", ".html", ".webmanifest"}
+MIN_COMPRESS_SIZE = 256  # smaller files aren't worth an encoded copy
+ONE_YEAR = 365 * 24 * 3600
+SUFFIXES = {"br": ".br", "gzip": ".gz"}
+
+
+# ---------------- BUILD -----------------
+def _compress(data):
+    """(encoding, bytes) pairs, best first; deterministic so rebuilds don't rewrite files."""
+    if brotli is not None:
+        yield "br", brotli.compress(data, quality=11)
+    yield "gzip", gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def _write(path, data):
+    if os.path.exists(path):
+        return  # content-addressed: same name, same bytes
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def build_assets(static_folder, clean=False):
+    """Fingerprint and precompress static files; returns the manifest's "files" mapping.
+
+    Files from earlier builds are kept (pages rendered before a deploy still point at them)
+    unless `clean` is set.
+    """
+    out_root = os.path.join(static_folder, BUILD_DIR)
+    if clean:
+        shutil.rmtree(out_root, ignore_errors=True)
+
+    files = {}
+    for dirpath, dirnames, filenames in os.walk(static_folder):
+        if os.path.samefile(dirpath, static_folder):
+            dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS]
+        for name in sorted(filenames):
+            if name.startswith("."):
+                continue
+            source = os.path.join(dirpath, name)
+            logical = os.path.relpath(source, static_folder).replace(os.sep, "/")
+            with open(source, "rb") as f:
+                data = f.read()
+
+            stem, ext = os.path.splitext(logical)
+            built = f"{BUILD_DIR}/{stem}.{hashlib.sha256(data).hexdigest()[:12]}{ext}"
+            target = os.path.join(static_folder, *built.split("/"))
+            _write(target, data)
+
+            entry = {"path": built, "size": len(data), "encodings": {}}
+            if ext.lower() in COMPRESSIBLE and len(data) >= MIN_COMPRESS_SIZE:
+                for encoding, compressed in _compress(data):
+                    if len(compressed) < len(data):
+                        _write(target + SUFFIXES[encoding], compressed)
+                        entry["encodings"][encoding] = len(compressed)
+            files[logical] = entry
+
+    os.makedirs(out_root, exist_ok=True)
+    manifest_path = os.path.join(out_root, MANIFEST)
+    with open(manifest_path + ".tmp", "w") as f:
+        json.dump({"files": files}, f, indent=2, sort_keys=True)
+    os.replace(manifest_path + ".tmp", manifest_path)  # running workers never see half a manifest
+    return files
+
+
+# ---------------- SERVE -----------------
+class AssetManifest:
+    def __init__(self, files):
+        self.urls = {logical: entry["path"] for logical, entry in files.items()}
+        # Encodings per fingerprinted path, best first
+        self.encodings = {
+            entry["path"]: [e for e in SUFFIXES if e in entry["encodings"]] for entry in files.values()
+        }
+
+    @classmethod
+    def load(cls, static_folder):
+        path = os.path.join(static_folder, BUILD_DIR, MANIFEST)
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return cls(json.load(f)["files"])
+
+
+def _fingerprinted_url(endpoint, values):
+    if endpoint == "static" and "filename" in values:
+        path = current_app.extensions["assets"].urls.get(values["filename"])
+        if path:
+            values["filename"] = path
+
+
+def serve_static(filename):
+    """The "static" endpoint: fingerprinted files get immutable caching and precompressed
+    bodies; anything else is Flask's default static file response."""
+    encodings = current_app.extensions["assets"].encodings.get(filename)
+    if encodings is None:
+        return current_app.send_static_file(filename)
+
+    encoding = request.accept_encodings.best_match(encodings) if encodings else None
+    response = send_from_directory(
+        current_app.static_folder,
+        filename + SUFFIXES[encoding] if encoding else filename,
+        mimetype=mimetypes.guess_type(filename)[0] or "application/octet-stream",
+        max_age=ONE_YEAR,
+    )
+    if encoding:
+        response.content_encoding = encoding
+    if encodings:
+        response.vary.add("Accept-Encoding")  # shared caches/CDNs keep one copy per encoding
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+def init_assets(app):
+    """Use static/dist/manifest.json when STATIC_FINGERPRINTS is on and the build exists."""
+    if not app.config.get("STATIC_FINGERPRINTS") or not app.has_static_folder:
+        return None
+    manifest = AssetManifest.load(app.static_folder)
+    if manifest is None:
+        return None
+    app.extensions["assets"] = manifest
+    app.url_defaults(_fingerprinted_url)
+    app.view_functions["static"] = serve_static
+    return manifest
@@ -0,0 +1,147 @@
+# benchmarks/api.py
+"""Throughput of the async JSON API next to the pages serving the same data, under uvicorn.
+
+    python -m benchmarks.api --database sqlite:///instance/bench.db --workers 2 --concurrency 32
+
+Both sides run in one `uvicorn asgi:app` server: the pages through the WSGI thread pool
+(ASGI_WSGI_THREADS), the API on the event loop over the asyncio engine.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from datetime import date, timedelta
+
+from benchmarks import report
+from benchmarks.routes import (ROOT, UNLIMITED_QUERIES, ACCOUNTS, HttpDriver, Scenario, _free_port,
+                               run_scenario)
+from benchmarks.seed import BENCH_PASSWORD
+
+
+def _next_weekday(days_ahead=30):
+    day = date.today() + timedelta(days=days_ahead)
+    while day.weekday() >= 5:
+        day += timedelta(days=1)
+    return day
+
+
+def scenarios():
+    week = f"start={_next_weekday()}&end={_next_weekday() + timedelta(days=6)}&doctor=2"
+    return [
+        Scenario("page_my_appointments", "/my-appointments", role="patient"),
+        Scenario("api_appointments", "/api/v1/appointments", role="patient"),
+        Scenario("page_availability", f"/availability?{week}", role="patient"),
+        Scenario("api_availability", f"/api/v1/availability?{week}", role="patient"),
+    ]
+
+
+class ApiDriver(HttpDriver):
+    """HttpDriver for /api paths: a bearer token per role instead of a session cookie."""
+
+    def __init__(self, base_url):
+        super().__init__(base_url)
+        self.tokens = {}
+        self.lock = threading.Lock()
+
+    def _token(self, role):
+        with self.lock:
+            if role not in self.tokens:
+                body = json.dumps({"email": ACCOUNTS[role], "password": BENCH_PASSWORD}).encode()
+                req = urllib.request.Request(self.base_url + "/api/v1/token", data=body, method="POST",
+                                             headers={"Content-Type": "application/json"})
+                with urllib.request.urlopen(req, timeout=60) as response:
+                    self.tokens[role] = json.load(response)["token"]
+            return self.tokens[role]
+
+    def request(self, scenario):
+        if not scenario.path.startswith("/api/"):
+            return super().request(scenario)
+        req = urllib.request.Request(self.base_url + scenario.path, method=scenario.method,
+                                     headers={"Authorization": "Bearer " + self._token(scenario.role)})
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(req, timeout=60) as response:
+                response.read()
+                status = response.status
+        except urllib.error.HTTPError as e:
+            e.read()
+            status = e.code
+        return status, time.perf_counter() - started, None
+
+
+def start_uvicorn(database, workers, port, timeout=30):
+    env = dict(os.environ, DATABASE_URL=database, QUERY_COUNT_LIMIT=UNLIMITED_QUERIES)
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "asgi:app", "--workers", str(workers),
+         "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning", "--no-access-log"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+    )
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError("uvicorn exited:\n" + proc.stderr.read().decode(errors="replace"))
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=1):
+                return proc
+        except OSError:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError(f"uvicorn did not answer on port {port} within {timeout}s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the JSON API with the pages under uvicorn.")
+    parser.add_argument("--database", required=True, help="SQLAlchemy URL of a database seeded by benchmarks.seed")
+    parser.add_argument("--url", help="benchmark an already running `uvicorn asgi:app` instead of starting one")
+    parser.add_argument("--workers", type=int, default=2, help="uvicorn workers")
+    parser.add_argument("--requests", type=int, default=500, help="measured requests per scenario")
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--only", action="append", help="run just these scenarios (repeatable)")
+    parser.add_argument("--save", help="write the results to this baseline JSON file")
+    parser.add_argument("--compare", help="baseline JSON to check the results against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed p95 slowdown (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    # Every client logs in from 127.0.0.1
+    os.environ.setdefault("LOGIN_LIMIT_PER_IP", "1000000000")
+    server = None
+    base_url = args.url
+    if not base_url:
+        port = _free_port()
+        server = start_uvicorn(args.database, args.workers, port)
+        base_url = f"http://127.0.0.1:{port}"
+    driver = ApiDriver(base_url)
+
+    results = {}
+    try:
+        for scenario in scenarios():
+            if not args.only or scenario.name in args.only:
+                results[scenario.name] = run_scenario(driver, scenario, args.requests, args.concurrency, args.warmup)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=10)
+
+    report.print_table(results)
+    meta = report.environment(
+        benchmark="api", database=args.database.split("://")[0], workers=args.workers,
+        concurrency=args.concurrency, requests=args.requests,
+    )
+    if args.save:
+        report.save(args.save, meta, results)
+    if args.compare:
+        problems = report.compare(report.load(args.compare), results, args.tolerance)
+        for line in problems:
+            print("REGRESSION", line)
+        return 1 if problems else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,199 @@
+# benchmarks/claims.py
+"""Stress the claim operations in claims.py: many doctors taking from one unassigned pool.
+
+    python -m benchmarks.claims                                   # SQLite on a temp file
+    python -m benchmarks.claims --postgres-url postgresql://localhost/dental_bench
+
+"single": every doctor walks the whole pool in its own random order and claims each
+appointment, so nearly every claim is contested. "batch": every doctor claims --batch at a
+time until nothing is left. Some pool appointments share a slot, and doctors already have
+bookings at some slots, so the slot constraint is exercised too.
+
+Afterwards the database is checked: nobody got an appointment another doctor was also told
+they got, every claimed row belongs to its claimer, and no doctor is double-booked. Exits 1
+when a check fails.
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import date, timedelta, time as dtime
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.exc import OperationalError
+
+from benchmarks import report
+
+
+def _prepare(args):
+    from models import db, User, Appointment
+
+    db.drop_all()
+    db.create_all()
+    rng = random.Random(args.seed)
+    doctors = list(range(1, args.doctors + 1))
+    patients = list(range(args.doctors + 1, args.doctors + 101))
+    db.session.execute(insert(User), [
+        {"id": i, "name": f"U{i}", "email": f"u{i}@example.com", "password": "-",
+         "role": "doctor" if i in doctors else "patient"}
+        for i in doctors + patients
+    ])
+
+    start = date.today() + timedelta(days=1)
+    slots = [(start + timedelta(days=d), dtime(9 + s // 2, 30 * (s % 2))) for d in range(30) for s in range(16)]
+    pool = []
+    while len(pool) < args.pool:
+        day, t = rng.choice(slots)
+        pool.append({"patient_id": rng.choice(patients), "doctor_id": None, "date": day, "time": t,
+                     "status": "pending", "patient_full_name": "Stress Test"})
+    booked = [{"patient_id": rng.choice(patients), "doctor_id": doctor, "date": day, "time": t, "status": "approved"}
+              for doctor in doctors for day, t in rng.sample(slots, len(slots) // 10)]
+    db.session.execute(insert(Appointment), pool + booked)
+    db.session.commit()
+    return [row[0] for row in db.session.execute(select(Appointment.id).where(Appointment.doctor_id.is_(None)))]
+
+
+def _verify(claims_by_doctor):
+    from models import db, Appointment
+
+    problems = []
+    counts = Counter(appt_id for ids in claims_by_doctor.values() for appt_id in ids)
+    doubled = [appt_id for appt_id, n in counts.items() if n > 1]
+    if doubled:
+        problems.append(f"{len(doubled)} appointments claimed by more than one doctor, e.g. {doubled[:5]}")
+
+    owners = dict(db.session.execute(
+        select(Appointment.id, Appointment.doctor_id).where(Appointment.id.in_(list(counts)))
+    ).all()) if counts else {}
+    wrong = [appt_id for doctor, ids in claims_by_doctor.items() for appt_id in ids if owners.get(appt_id) != doctor]
+    if wrong:
+        problems.append(f"{len(wrong)} claimed appointments belong to someone else, e.g. {wrong[:5]}")
+
+    clashes = db.session.execute(
+        select(Appointment.doctor_id, Appointment.date, Appointment.time)
+        .where(Appointment.doctor_id.is_not(None), Appointment.status != "rejected")
+        .group_by(Appointment.doctor_id, Appointment.date, Appointment.time)
+        .having(func.count() > 1)
+    ).all()
+    if clashes:
+        problems.append(f"{len(clashes)} double-booked doctor slots, e.g. {clashes[:3]}")
+    return problems
+
+
+def run(app, label, mode, args):
+    from claims import ClaimError, claim_appointment, claim_batch
+    from models import db, Appointment
+
+    with app.app_context():
+        pool = _prepare(args)
+
+    lock = threading.Lock()
+    stats = {"latencies": [], "claimed": 0, "refused": 0, "errors": 0}
+    claims_by_doctor = {doctor: [] for doctor in range(1, args.doctors + 1)}
+
+    def record(started, claimed=(), outcome=None):
+        with lock:
+            stats["latencies"].append(time.perf_counter() - started)
+            stats["claimed"] += len(claimed)
+            if outcome:
+                stats[outcome] += 1
+
+    def doctor(doctor_id):
+        rng = random.Random(doctor_id)
+        mine = claims_by_doctor[doctor_id]
+        with app.app_context():
+            if mode == "single":
+                for appt_id in rng.sample(pool, len(pool)):
+                    started = time.perf_counter()
+                    try:
+                        mine.append(claim_appointment(appt_id, doctor_id).id)
+                        record(started, mine[-1:])
+                    except ClaimError:
+                        record(started, outcome="refused")
+                    except OperationalError:  # "database is locked" and friends
+                        db.session.rollback()
+                        record(started, outcome="errors")
+            else:
+                while True:
+                    started = time.perf_counter()
+                    try:
+                        rows = claim_batch(doctor_id, args.batch)
+                    except ClaimError:
+                        record(started, outcome="refused")
+                        continue
+                    except OperationalError:
+                        db.session.rollback()
+                        record(started, outcome="errors")
+                        continue
+                    mine.extend(row.id for row in rows)
+                    record(started, rows)
+                    if not rows:
+                        break
+
+    threads = [threading.Thread(target=doctor, args=(d,)) for d in claims_by_doctor]
+    wall = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - wall
+
+    with app.app_context():
+        problems = _verify(claims_by_doctor)
+        left = db.session.execute(select(func.count()).where(Appointment.doctor_id.is_(None))).scalar()
+        db.session.execute(delete(Appointment))
+        db.session.commit()
+
+    row = report.summarize(stats["latencies"], wall, errors=stats["errors"])
+    row.update(claimed=stats["claimed"], refused=stats["refused"], left=left, wall_s=round(wall, 2))
+    return {f"{label}:{mode}": row}, problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stress concurrent claiming of unassigned appointments.")
+    parser.add_argument("--postgres-url", help="also run against this Postgres database (it is wiped)")
+    parser.add_argument("--doctors", type=int, default=8, help="concurrent claiming doctors (threads)")
+    parser.add_argument("--pool", type=int, default=2000, help="unassigned appointments to hand out")
+    parser.add_argument("--batch", type=int, default=10, help="appointments per batch claim")
+    parser.add_argument("--mode", choices=("single", "batch", "both"), default="both")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--save")
+    args = parser.parse_args(argv)
+
+    from app import create_app
+
+    modes = ("single", "batch") if args.mode == "both" else (args.mode,)
+    overrides = {"PASSWORD_HASH_WARMUP": False, "TEMPLATE_WARMUP": False, "LIVE_UPDATES_BACKEND": "off",
+                 "GUNICORN_THREADS": args.doctors}
+    results, failures = {}, []
+    tmpdir = tempfile.mkdtemp()
+    try:
+        targets = [("sqlite", f"sqlite:///{os.path.join(tmpdir, 'claims.db')}")]
+        if args.postgres_url:
+            targets.append(("postgres", args.postgres_url))
+        for label, url in targets:
+            app = create_app(dict(overrides, SQLALCHEMY_DATABASE_URI=url))
+            for mode in modes:
+                rows, problems = run(app, label, mode, args)
+                results.update(rows)
+                failures += [f"{label}:{mode}: {p}" for p in problems]
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+    report.print_table(results, columns=("requests", "claimed", "refused", "errors", "left", "p50_ms", "p99_ms",
+                                         "wall_s"))
+    if args.save:
+        report.save(args.save, report.environment(benchmark="claims", doctors=args.doctors, pool=args.pool,
+                                                  batch=args.batch), results)
+    for line in failures:
+        print("FAILED", line)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
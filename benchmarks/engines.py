@@ -0,0 +1,167 @@
+# benchmarks/engines.py
+"""Compare the engine profiles in db_profiles.py under a mixed booking/listing load.
+
+    python -m benchmarks.engines                        # sqlite vs sqlite-kiosk on a temp file
+    python -m benchmarks.engines --postgres-url postgresql://localhost/dental_bench \\
+                                 --pooler-url postgresql://localhost:6432/dental_bench
+
+Writer threads book appointments one transaction at a time (like patient.book); reader
+threads run the doctor's listing query. Each profile gets a fresh copy of the same data.
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta, time as dtime
+
+from sqlalchemy import create_engine, insert, select, delete
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from benchmarks import report
+
+
+def _prepare(engine, users, appointments, seed):
+    from models import db, User, Appointment
+
+    db.metadata.drop_all(engine)
+    db.metadata.create_all(engine)
+    rng = random.Random(seed)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [
+            {"id": i, "name": f"U{i}", "email": f"u{i}@example.com", "password": "-",
+             "role": "doctor" if i <= users // 50 else "patient"}
+            for i in range(1, users + 1)
+        ])
+        doctors = users // 50
+        start = date.today()
+        rows = []
+        for i in range(appointments):
+            slot = i // doctors
+            rows.append({"patient_id": rng.randint(doctors + 1, users), "doctor_id": 1 + i % doctors,
+                         "date": start + timedelta(days=slot // 16),
+                         "time": dtime(9 + (slot % 16) // 2, 30 * (slot % 2)), "status": "pending"})
+        conn.execute(insert(Appointment), rows)
+    return doctors
+
+
+def run_profile(url, profile, settings, args):
+    from db_profiles import engine_options, install_profile
+    from models import Appointment
+
+    engine = create_engine(url, **engine_options(profile, url, settings))
+    install_profile(engine, profile, settings)
+    doctors = _prepare(engine, args.users, args.appointments, args.seed)
+
+    stop = time.perf_counter() + args.duration
+    lock = threading.Lock()
+    stats = {"write": [], "read": [], "conflicts": 0, "errors": 0}
+
+    def writer(n):
+        rng = random.Random(n)
+        while time.perf_counter() < stop:
+            row = {"patient_id": rng.randint(doctors + 1, args.users), "doctor_id": rng.randint(1, doctors),
+                   "date": date.today() + timedelta(days=rng.randint(0, 365)),
+                   "time": dtime(rng.randint(9, 16), rng.choice((0, 30))), "status": "pending"}
+            started = time.perf_counter()
+            try:
+                with engine.begin() as conn:
+                    conn.execute(insert(Appointment), row)
+                outcome = "ok"
+            except IntegrityError:
+                outcome = "conflicts"
+            except OperationalError:  # "database is locked" and friends
+                outcome = "errors"
+            with lock:
+                stats["write"].append(time.perf_counter() - started)
+                if outcome != "ok":
+                    stats[outcome] += 1
+
+    def reader(n):
+        rng = random.Random(1000 + n)
+        query = select(Appointment.id, Appointment.date, Appointment.time, Appointment.status)
+        while time.perf_counter() < stop:
+            doctor = rng.randint(1, doctors)
+            started = time.perf_counter()
+            try:
+                with engine.connect() as conn:
+                    conn.execute(query.where(Appointment.doctor_id == doctor)
+                                 .order_by(Appointment.date, Appointment.time, Appointment.id).limit(50)).all()
+            except OperationalError:
+                with lock:
+                    stats["errors"] += 1
+                continue
+            with lock:
+                stats["read"].append(time.perf_counter() - started)
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(args.writers)]
+    threads += [threading.Thread(target=reader, args=(i,)) for i in range(args.readers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    with engine.begin() as conn:
+        conn.execute(delete(Appointment))
+    engine.dispose()
+
+    results = {}
+    for kind in ("write", "read"):
+        row = report.summarize(stats[kind], args.duration)
+        row["errors"] = stats["errors"]
+        if kind == "write":
+            row["conflicts"] = stats["conflicts"]
+        results[f"{profile}:{kind}"] = row
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare database engine profiles.")
+    parser.add_argument("--postgres-url", help="direct Postgres URL: also benchmark the postgres profile")
+    parser.add_argument("--pooler-url", help="PgBouncer/Supavisor URL: also benchmark postgres-pooler")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per profile")
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--appointments", type=int, default=50000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--save")
+    parser.add_argument("--compare")
+    args = parser.parse_args(argv)
+
+    settings = {"SQLITE_BUSY_TIMEOUT_MS": 5000, "SQLITE_MMAP_SIZE": 256 * 1024 * 1024,
+                "DB_MAX_CONNECTIONS": args.writers + args.readers, "WEB_CONCURRENCY": 1,
+                "GUNICORN_THREADS": args.writers + args.readers, "DB_STATEMENT_TIMEOUT_MS": 5000,
+                "DB_APPLICATION_NAME": "dental-benchmark"}
+
+    results = {}
+    tmpdir = tempfile.mkdtemp()
+    try:
+        for profile in ("sqlite", "sqlite-kiosk"):
+            url = f"sqlite:///{os.path.join(tmpdir, profile + '.db')}"
+            results.update(run_profile(url, profile, settings, args))
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+    if args.postgres_url:
+        results.update(run_profile(args.postgres_url, "postgres", settings, args))
+    if args.pooler_url:
+        results.update(run_profile(args.pooler_url, "postgres-pooler", settings, args))
+
+    report.print_table(results, columns=("requests", "errors", "conflicts", "p50_ms", "p95_ms", "p99_ms",
+                                         "throughput_rps"))
+    if args.save:
+        report.save(args.save, report.environment(benchmark="engines", duration=args.duration,
+                                                  writers=args.writers, readers=args.readers), results)
+    if args.compare:
+        problems = report.compare(report.load(args.compare), results)
+        for line in problems:
+            print("REGRESSION", line)
+        return 1 if problems else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+# benchmarks/hashing.py
+"""CPU cost of password hashing and of a full POST /login under each hash policy.
+
+    python -m benchmarks.hashing
+    python -m benchmarks.hashing --target-ms 50 --logins 30 --save hashing.json
+
+For every available algorithm it times hashing at the minimum, default and calibrated
+cost, then logs in through the Flask test client with that policy. "cpu_ms" is process
+CPU time, which is what a gunicorn worker spends per login.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks import report
+
+
+def _measure(fn, rounds):
+    wall, cpu = [], []
+    for _ in range(rounds):
+        started, started_cpu = time.perf_counter(), time.process_time()
+        fn()
+        wall.append(time.perf_counter() - started)
+        cpu.append(time.process_time() - started_cpu)
+    return wall, cpu
+
+
+def _row(wall, cpu, policy):
+    row = report.summarize(wall, sum(wall))
+    row["cpu_ms"] = round(sum(cpu) / len(cpu) * 1000, 3)
+    row["cost"] = policy.cost
+    return row
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark password hashing and login CPU time.")
+    parser.add_argument("--target-ms", type=int, default=50, help="calibration target per hash")
+    parser.add_argument("--rounds", type=int, default=10, help="hashes timed per policy")
+    parser.add_argument("--logins", type=int, default=20, help="POST /login requests per policy")
+    parser.add_argument("--save")
+    parser.add_argument("--compare")
+    args = parser.parse_args(argv)
+
+    # Logging in over and over from one address is the point here, not an attack
+    os.environ.setdefault("LOGIN_LIMIT_PER_IP", "1000000000")
+    db_file = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+    db_file.close()
+    from app import create_app, init_db
+
+    app = create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{db_file.name}"})
+    init_db(app)
+    from models import db, User
+    from passwords import ALGORITHMS, DEFAULT_COST, MIN_COST, PasswordPolicy, argon2, calibrate
+
+    results = {}
+    try:
+        with app.app_context():
+            user = User(name="Bench", email="hash-bench@example.com", password="-", role="patient")
+            db.session.add(user)
+            db.session.commit()
+
+            for algorithm in ALGORITHMS:
+                if algorithm == "argon2" and argon2 is None:
+                    print("argon2: skipped (argon2-cffi not installed)")
+                    continue
+                costs = {"min": MIN_COST[algorithm], "default": DEFAULT_COST[algorithm],
+                         f"calibrated_{args.target_ms}ms": calibrate(algorithm, args.target_ms)}
+                for label, cost in costs.items():
+                    policy = PasswordPolicy(algorithm, cost)
+                    name = f"{algorithm}_{label}"
+
+                    wall, cpu = _measure(lambda: policy.hash("correct horse battery staple"), args.rounds)
+                    results[f"hash:{name}"] = _row(wall, cpu, policy)
+
+                    app.extensions["password_policy"] = policy
+                    user.password = policy.hash("correct horse battery staple")
+                    db.session.commit()
+                    client = app.test_client()
+                    form = {"email": user.email, "password": "correct horse battery staple"}
+                    wall, cpu = _measure(lambda: client.post("/login", data=form), args.logins)
+                    results[f"login:{name}"] = _row(wall, cpu, policy)
+
+            # One-off price of upgrading an outdated hash: verify the old one, then hash again
+            old, new = PasswordPolicy("pbkdf2", MIN_COST["pbkdf2"]), PasswordPolicy("scrypt")
+            app.extensions["password_policy"] = new
+
+            def rehash_login():
+                user.password = old.hash("correct horse battery staple")
+                db.session.commit()
+                app.test_client().post("/login", data={"email": user.email,
+                                                      "password": "correct horse battery staple"})
+            wall, cpu = _measure(rehash_login, max(3, args.logins // 4))
+            results["login:rehash_pbkdf2_to_scrypt"] = _row(wall, cpu, new)
+    finally:
+        os.remove(db_file.name)
+
+    report.print_table(results, columns=("requests", "cost", "p50_ms", "p95_ms", "cpu_ms", "throughput_rps"))
+    if args.save:
+        report.save(args.save, report.environment(benchmark="hashing", target_ms=args.target_ms), results)
+    if args.compare:
+        problems = report.compare(report.load(args.compare), results)
+        for line in problems:
+            print("REGRESSION", line)
+        return 1 if problems else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+# benchmarks/report.py
+"""Latency summaries, baseline files and regression checks shared by the benchmarks."""
+import json
+import platform
+import subprocess
+import sys
+from datetime import datetime, timezone
+
+
+def percentile(sorted_values, q):
+    """Linear-interpolated percentile (q in 0..100) of an already sorted list."""
+    if not sorted_values:
+        return None
+    k = (len(sorted_values) - 1) * q / 100
+    lower = int(k)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (k - lower)
+
+
+def summarize(latencies, wall_seconds, queries=(), errors=0):
+    """Latencies are in seconds; the summary is in milliseconds and requests/second."""
+    values = sorted(latencies)
+    counted = [q for q in queries if q is not None]
+    return {
+        "requests": len(values),
+        "errors": errors,
+        "mean_ms": round(sum(values) / len(values) * 1000, 3) if values else None,
+        "p50_ms": round(percentile(values, 50) * 1000, 3) if values else None,
+        "p95_ms": round(percentile(values, 95) * 1000, 3) if values else None,
+        "p99_ms": round(percentile(values, 99) * 1000, 3) if values else None,
+        "throughput_rps": round(len(values) / wall_seconds, 1) if wall_seconds else None,
+        "queries_per_request": round(sum(counted) / len(counted), 2) if counted else None,
+    }
+
+
+def environment(**extra):
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, check=False).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        **extra,
+    }
+
+
+def print_table(results, columns=("requests", "errors", "p50_ms", "p95_ms", "p99_ms",
+                                  "throughput_rps", "queries_per_request"), out=sys.stdout):
+    width = max([len(name) for name in results] + [8])
+    out.write(f"{'scenario':<{width}}  " + "  ".join(f"{c:>{max(len(c), 8)}}" for c in columns) + "\n")
+    for name, row in results.items():
+        cells = []
+        for c in columns:
+            value = row.get(c)
+            cells.append(f"{'-' if value is None else value:>{max(len(c), 8)}}")
+        out.write(f"{name:<{width}}  " + "  ".join(cells) + "\n")
+
+
+def save(path, meta, results):
+    with open(path, "w") as f:
+        json.dump({"meta": meta, "results": results}, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(baseline, results, tolerance=0.2, min_delta_ms=2.0):
+    """Regressions of `results` against a saved baseline, as human-readable lines.
+
+    Latency counts as a regression when p95 is more than `tolerance` slower *and* at least
+    `min_delta_ms` slower (sub-millisecond pages are mostly noise). Query counts are
+    deterministic, so any increase is flagged, as is any new error.
+    """
+    problems = []
+    for name, row in results.items():
+        base = baseline.get("results", {}).get(name)
+        if base is None:
+            continue
+        if row.get("p95_ms") is not None and base.get("p95_ms") is not None:
+            limit = base["p95_ms"] * (1 + tolerance)
+            if row["p95_ms"] > limit and row["p95_ms"] - base["p95_ms"] >= min_delta_ms:
+                problems.append(f"{name}: p95 {row['p95_ms']} ms vs baseline {base['p95_ms']} ms "
+                                f"(+{(row['p95_ms'] / base['p95_ms'] - 1) * 100:.0f}%)")
+        if row.get("queries_per_request") is not None and base.get("queries_per_request") is not None:
+            if row["queries_per_request"] > base["queries_per_request"]:
+                problems.append(f"{name}: {row['queries_per_request']} queries/request vs baseline "
+                                f"{base['queries_per_request']}")
+        if row.get("errors", 0) > base.get("errors", 0):
+            problems.append(f"{name}: {row['errors']} errors vs baseline {base.get('errors', 0)}")
+    return problems
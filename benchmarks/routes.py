@@ -0,0 +1,273 @@
+# benchmarks/routes.py
+"""Load-test the core pages against a database filled by benchmarks.seed.
+
+    # in-process, through the Flask test client (no network, no server)
+    python -m benchmarks.routes --database sqlite:///instance/bench.db --mode client
+
+    # real HTTP against gunicorn started for the run
+    python -m benchmarks.routes --database sqlite:///instance/bench.db --mode http --workers 4 --concurrency 16
+
+    # peak Python memory per request (tracemalloc, client mode only; a separate, slower pass)
+    python -m benchmarks.routes --database sqlite:///instance/bench.db --memory
+
+    # CI: fail when p95 or queries/request got worse than the saved baseline
+    python -m benchmarks.routes ... --save benchmarks/baseline.json
+    python -m benchmarks.routes ... --compare benchmarks/baseline.json
+
+Queries per request come from the X-Query-Count header (see query_guard.py), so the
+server is started with a QUERY_COUNT_LIMIT high enough to never trip.
+"""
+import argparse
+import http.cookiejar
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+import urllib.error
+import urllib.parse
+import urllib.request
+from dataclasses import dataclass, field
+
+from benchmarks import report
+from benchmarks.seed import BENCH_ADMIN, BENCH_DOCTOR, BENCH_PATIENT, BENCH_PASSWORD
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+UNLIMITED_QUERIES = "1000000"
+
+ACCOUNTS = {"admin": BENCH_ADMIN, "doctor": BENCH_DOCTOR, "patient": BENCH_PATIENT}
+
+
+@dataclass
+class Scenario:
+    name: str
+    path: str
+    role: str = None          # None = anonymous visitor
+    method: str = "GET"
+    data: dict = field(default_factory=dict)
+    expect: int = 200
+
+
+SCENARIOS = [
+    Scenario("home", "/"),
+    Scenario("login", "/login", method="POST",
+             data={"email": BENCH_PATIENT, "password": BENCH_PASSWORD}, expect=302),
+    Scenario("book", "/book", role="patient"),
+    Scenario("my_appointments", "/my-appointments", role="patient"),
+    Scenario("doctor_dashboard", "/doctor/", role="doctor"),
+    Scenario("admin_appointments", "/admin/appointments", role="admin"),
+    Scenario("admin_users", "/admin/users", role="admin"),
+]
+
+
+# ---------------- DRIVERS -----------------
+class ClientDriver:
+    """Flask test client: measures the app itself, without sockets or a WSGI server."""
+
+    def __init__(self, app):
+        self.app = app
+        self.clients = {}
+
+    def _client(self, role):
+        if role not in self.clients:
+            client = self.app.test_client()
+            if role:
+                client.post("/login", data={"email": ACCOUNTS[role], "password": BENCH_PASSWORD})
+            self.clients[role] = client
+        return self.clients[role]
+
+    def request(self, scenario):
+        client = self._client(scenario.role)
+        started = time.perf_counter()
+        response = client.open(scenario.path, method=scenario.method, data=scenario.data or None)
+        response.close()
+        elapsed = time.perf_counter() - started
+        return response.status_code, elapsed, _query_count(response.headers)
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class HttpDriver:
+    """Plain urllib over a real socket; one cookie jar per role and thread."""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip("/")
+        self.local = threading.local()
+
+    def _opener(self, role):
+        openers = self.local.__dict__.setdefault("openers", {})
+        if role not in openers:
+            opener = urllib.request.build_opener(
+                urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), _NoRedirect
+            )
+            if role:
+                self._send(opener, "POST", "/login", {"email": ACCOUNTS[role], "password": BENCH_PASSWORD})
+            openers[role] = opener
+        return openers[role]
+
+    def _send(self, opener, method, path, data):
+        body = urllib.parse.urlencode(data).encode() if data else None
+        req = urllib.request.Request(self.base_url + path, data=body, method=method)
+        try:
+            with opener.open(req, timeout=60) as response:
+                response.read()
+                return response.status, response.headers
+        except urllib.error.HTTPError as e:  # 3xx (redirects are not followed), 4xx, 5xx
+            e.read()
+            return e.code, e.headers
+
+    def request(self, scenario):
+        opener = self._opener(scenario.role)
+        started = time.perf_counter()
+        status, headers = self._send(opener, scenario.method, scenario.path, scenario.data)
+        elapsed = time.perf_counter() - started
+        return status, elapsed, _query_count(headers)
+
+
+def _query_count(headers):
+    value = headers.get("X-Query-Count")
+    return int(value) if value is not None else None
+
+
+# ---------------- RUNNER -----------------
+def run_scenario(driver, scenario, requests, concurrency=1, warmup=10):
+    for _ in range(warmup):
+        driver.request(scenario)
+
+    latencies, queries, errors = [], [], [0]
+    lock = threading.Lock()
+    remaining = [requests]
+
+    def worker():
+        while True:
+            with lock:
+                if remaining[0] <= 0:
+                    return
+                remaining[0] -= 1
+            status, elapsed, count = driver.request(scenario)
+            with lock:
+                latencies.append(elapsed)
+                queries.append(count)
+                if status != scenario.expect:
+                    errors[0] += 1
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(max(1, concurrency))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - started
+    return report.summarize(latencies, wall, queries, errors[0])
+
+
+def measure_memory(driver, scenario, requests=10):
+    """Median tracemalloc peak of one request, in KiB (allocations made while handling it)."""
+    driver.request(scenario)
+    peaks = []
+    tracemalloc.start()
+    try:
+        for _ in range(requests):
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            driver.request(scenario)
+            peaks.append(tracemalloc.get_traced_memory()[1] - before)
+    finally:
+        tracemalloc.stop()
+    return round(report.percentile(sorted(peaks), 50) / 1024, 1)
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_gunicorn(database, workers, port, timeout=30):
+    env = dict(os.environ, DATABASE_URL=database, QUERY_COUNT_LIMIT=UNLIMITED_QUERIES, WEB_CONCURRENCY=str(workers))
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-w", str(workers), "-b", f"127.0.0.1:{port}", "app:app"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+    )
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError("gunicorn exited:\n" + proc.stderr.read().decode(errors="replace"))
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=1):
+                return proc
+        except OSError:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError(f"gunicorn did not start listening on port {port} within {timeout}s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the core pages.")
+    parser.add_argument("--database", required=True, help="SQLAlchemy URL of a database seeded by benchmarks.seed")
+    parser.add_argument("--mode", choices=["client", "http"], default="client")
+    parser.add_argument("--url", help="http mode: benchmark an already running server instead of starting gunicorn")
+    parser.add_argument("--workers", type=int, default=2, help="http mode: gunicorn workers")
+    parser.add_argument("--requests", type=int, default=200, help="measured requests per scenario")
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--only", action="append", help="run just these scenarios (repeatable)")
+    parser.add_argument("--memory", action="store_true", help="client mode: also report peak KiB per request")
+    parser.add_argument("--save", help="write the results to this baseline JSON file")
+    parser.add_argument("--compare", help="baseline JSON to check the results against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed p95 slowdown (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    # Logging in over and over from one address is the point here, not an attack
+    os.environ.setdefault("LOGIN_LIMIT_PER_IP", "1000000000")
+    scenarios = [s for s in SCENARIOS if not args.only or s.name in args.only]
+    server = None
+    if args.mode == "client":
+        from app import create_app
+
+        app = create_app({"SQLALCHEMY_DATABASE_URI": args.database,
+                          "QUERY_COUNT_LIMIT": int(UNLIMITED_QUERIES)})
+        driver = ClientDriver(app)
+    else:
+        base_url = args.url
+        if not base_url:
+            port = _free_port()
+            server = start_gunicorn(args.database, args.workers, port)
+            base_url = f"http://127.0.0.1:{port}"
+        driver = HttpDriver(base_url)
+
+    results = {}
+    try:
+        for scenario in scenarios:
+            results[scenario.name] = run_scenario(driver, scenario, args.requests, args.concurrency, args.warmup)
+            if args.memory and args.mode == "client":
+                results[scenario.name]["peak_kib"] = measure_memory(driver, scenario)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=10)
+
+    columns = ("requests", "errors", "p50_ms", "p95_ms", "p99_ms", "throughput_rps", "queries_per_request")
+    report.print_table(results, columns + (("peak_kib",) if args.memory else ()))
+    meta = report.environment(
+        benchmark="routes", mode=args.mode, database=args.database.split("://")[0],
+        workers=args.workers if args.mode == "http" else None,
+        concurrency=args.concurrency, requests=args.requests,
+    )
+    if args.save:
+        report.save(args.save, meta, results)
+    if args.compare:
+        problems = report.compare(report.load(args.compare), results, args.tolerance)
+        for line in problems:
+            print("REGRESSION", line)
+        return 1 if problems else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
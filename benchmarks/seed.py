@@ -0,0 +1,151 @@
+# benchmarks/seed.py
+"""Fill a throwaway database with realistic volumes for the benchmarks.
+
+    python -m benchmarks.seed --database sqlite:///instance/bench.db
+    python -m benchmarks.seed --database postgresql://localhost/dental_bench --users 100000 --appointments 1000000
+
+The database is dropped and recreated. Rows are generated from a fixed seed, so every run
+(and every CI machine) benchmarks the same data.
+"""
+import argparse
+import random
+import sys
+import time as clock
+from datetime import date, time, timedelta
+
+BENCH_PASSWORD = "benchmark"
+BENCH_ADMIN = "bench-admin@example.com"
+BENCH_DOCTOR = "bench-doctor@example.com"
+BENCH_PATIENT = "bench-patient@example.com"
+
+CHUNK = 10_000
+DOCTOR_SHARE = 0.01       # 1 in 100 users is a doctor
+UNASSIGNED_SHARE = 0.1    # appointments nobody has picked up yet
+SLOTS_PER_DAY = 16        # 09:00-17:00 in 30 minute slots
+SECTION_TYPES = ["service"] * 6 + ["testimonial"] * 3 + ["hero"]
+
+
+def _chunks(rows, size=CHUNK):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _users(count, password_hash):
+    # Users 1-3 are the fixed accounts the benchmark logs in as
+    yield {"id": 1, "name": "Bench Admin", "email": BENCH_ADMIN, "password": password_hash, "role": "admin"}
+    yield {"id": 2, "name": "Bench Doctor", "email": BENCH_DOCTOR, "password": password_hash, "role": "doctor"}
+    yield {"id": 3, "name": "Bench Patient", "email": BENCH_PATIENT, "password": password_hash, "role": "patient"}
+    doctor_every = int(1 / DOCTOR_SHARE)
+    for user_id in range(4, count + 1):
+        role = "doctor" if user_id % doctor_every == 0 else "patient"
+        yield {"id": user_id, "name": f"User {user_id}", "email": f"user{user_id}@example.com",
+               "password": password_hash, "role": role}
+
+
+def _appointments(count, doctor_ids, patient_ids, start, rng):
+    # Doctors take slots round-robin, so (doctor, date, time) stays unique like uq_appointment_doctor_slot requires
+    statuses = ["pending", "approved", "approved", "rejected"]
+    for i in range(count):
+        slot = i // len(doctor_ids)
+        day = start + timedelta(days=slot // SLOTS_PER_DAY)
+        minutes = 9 * 60 + (slot % SLOTS_PER_DAY) * 30
+        unassigned = rng.random() < UNASSIGNED_SHARE
+        yield {
+            "patient_id": rng.choice(patient_ids),
+            "doctor_id": None if unassigned else doctor_ids[i % len(doctor_ids)],
+            "date": day,
+            "time": time(minutes // 60, minutes % 60),
+            "status": "pending" if unassigned else rng.choice(statuses),
+            "message": None,
+            "patient_full_name": None,
+            "patient_insurance": None,
+        }
+
+
+def _home_content(count, rng):
+    for i in range(count):
+        section_type = SECTION_TYPES[i % len(SECTION_TYPES)]
+        yield {
+            "section_type": section_type,
+            "title": f"{section_type.title()} {i + 1}",
+            "description": " ".join(rng.choice(["gentle", "modern", "family", "dental", "care", "smile", "clinic"])
+                                   for _ in range(30)),
+            "image": None,
+            "order": i,
+        }
+
+
+def seed(users=100_000, appointments=1_000_000, home_cards=50, rng_seed=42, echo=print):
+    """Drop and recreate every table, then bulk insert the benchmark data set."""
+    from sqlalchemy import insert
+
+    from models import db, User, Appointment, HomeContent, SiteSettings
+    from passwords import hash_password
+    from stats import rebuild_counters
+
+    rng = random.Random(rng_seed)
+    started = clock.perf_counter()
+    db.drop_all()
+    db.create_all()
+
+    # One hash for everyone: hashing 100k passwords would take longer than the benchmark
+    password_hash = hash_password(BENCH_PASSWORD)
+    doctor_ids, patient_ids = [], []
+    for batch in _chunks(_users(users, password_hash)):
+        db.session.execute(insert(User), batch)
+        for row in batch:
+            (doctor_ids if row["role"] == "doctor" else patient_ids).append(row["id"])
+    echo(f"users: {users} ({len(doctor_ids)} doctors)")
+
+    start = date.today() - timedelta(days=365)
+    for n, batch in enumerate(_chunks(_appointments(appointments, doctor_ids, patient_ids, start, rng)), 1):
+        db.session.execute(insert(Appointment), batch)
+        if n % 10 == 0:
+            db.session.commit()
+            echo(f"appointments: {n * CHUNK}")
+    echo(f"appointments: {appointments}")
+
+    db.session.execute(insert(HomeContent), list(_home_content(home_cards, rng)))
+    db.session.add(SiteSettings(clinic_name="Benchmark Clinic", working_hours="Mon-Fri 9AM - 5PM"))
+    db.session.commit()
+
+    # Core inserts skip the session events that maintain the dashboard counters
+    rebuild_counters()
+    if db.engine.dialect.name == "postgresql":
+        with db.engine.connect() as conn:
+            conn.exec_driver_sql("ANALYZE")
+            # Explicit ids leave the sequence behind; keep later inserts working
+            conn.exec_driver_sql("SELECT setval(pg_get_serial_sequence('\"user\"', 'id'), (SELECT max(id) FROM \"user\"))")
+            conn.commit()
+    else:
+        with db.engine.connect() as conn:
+            conn.exec_driver_sql("ANALYZE")
+            conn.commit()
+    echo(f"seeded in {clock.perf_counter() - started:.1f}s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database", required=True, help="SQLAlchemy URL of a database that may be wiped")
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--appointments", type=int, default=1_000_000)
+    parser.add_argument("--home-cards", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    from app import create_app
+
+    app = create_app({"SQLALCHEMY_DATABASE_URI": args.database})
+
+    with app.app_context():
+        seed(args.users, args.appointments, args.home_cards, args.seed)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
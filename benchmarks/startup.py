@@ -0,0 +1,136 @@
+# benchmarks/startup.py
+"""Cold-start and per-worker boot cost of the app.
+
+    python -m benchmarks.startup
+    python -m benchmarks.startup --root /tmp/before     # another checkout, e.g. `git worktree add`
+
+Every sample runs in a fresh interpreter:
+
+  import       python -c "import app"
+  cli          python manage.py --help (what every CLI command pays before doing anything)
+  cold_worker  build the app and serve the first pages: a gunicorn worker without preload
+  fork_worker  fork from a process that already built the app, reset it and serve the first
+               pages: a gunicorn worker with preload_app (see gunicorn.conf.py)
+  first_pages_cold / first_pages_fork
+               just the first requests to /, /login and /register in those workers (template
+               compilation lands here unless it was done at boot)
+
+Trees from before create_app() existed are measured through their module-level `app`.
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks import report
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FIRST_PAGES = ("/", "/login", "/register")
+
+# Runs inside the measured tree. Prints one JSON list of (boot + first request, first pages) pairs.
+_PROBE = r"""
+import json, os, sys, time
+started = time.perf_counter()
+mode, forks, pages = sys.argv[1], int(sys.argv[2]), sys.argv[3:]
+
+def build():
+    import app as module
+    if hasattr(module, "create_app"):
+        return module.create_app(), getattr(module, "reset_after_fork", None)
+    return module.app, None
+
+def first_requests(flask_app):
+    client = flask_app.test_client()
+    booted = time.perf_counter()
+    for page in pages:
+        client.get(page)
+    return time.perf_counter() - booted
+
+if mode == "cold_worker":
+    flask_app, _ = build()
+    first = first_requests(flask_app)
+    print(json.dumps([[time.perf_counter() - started, first]]))
+else:
+    flask_app, reset = build()
+    samples = []
+    for _ in range(forks):
+        read_fd, write_fd = os.pipe()
+        forked = time.perf_counter()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            if reset is not None:
+                reset(flask_app)
+            first = first_requests(flask_app)
+            os.write(write_fd, json.dumps([time.perf_counter() - forked, first]).encode())
+            os._exit(0)
+        os.close(write_fd)
+        with os.fdopen(read_fd) as pipe:
+            samples.append(json.loads(pipe.read()))
+        os.waitpid(pid, 0)
+    print(json.dumps(samples))
+"""
+
+
+def _run(root, argv, env):
+    started = time.perf_counter()
+    proc = subprocess.run(argv, cwd=root, env=env, capture_output=True, text=True)
+    elapsed = time.perf_counter() - started
+    if proc.returncode != 0:
+        raise RuntimeError(f"{' '.join(argv)} failed:\n{proc.stderr}")
+    return elapsed, proc.stdout
+
+
+def measure(root, rounds, env):
+    python = sys.executable
+    samples = {name: [] for name in ("import", "cli", "cold_worker", "first_pages_cold",
+                                     "fork_worker", "first_pages_fork")}
+    for _ in range(rounds):
+        samples["import"].append(_run(root, [python, "-c", "import app"], env)[0])
+        samples["cli"].append(_run(root, [python, "manage.py", "--help"], env)[0])
+        _, out = _run(root, [python, "-c", _PROBE, "cold_worker", "0", *FIRST_PAGES], env)
+        for total, first in json.loads(out.splitlines()[-1]):
+            samples["cold_worker"].append(total)
+            samples["first_pages_cold"].append(first)
+    _, out = _run(root, [python, "-c", _PROBE, "fork_worker", str(rounds), *FIRST_PAGES], env)
+    for total, first in json.loads(out.splitlines()[-1]):
+        samples["fork_worker"].append(total)
+        samples["first_pages_fork"].append(first)
+    return {name: report.summarize(values, sum(values)) for name, values in samples.items()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure app import, CLI and worker boot time.")
+    parser.add_argument("--root", default=ROOT, help="checkout to measure (default: this one)")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--save")
+    parser.add_argument("--compare")
+    args = parser.parse_args(argv)
+
+    db_dir = tempfile.mkdtemp()
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(db_dir, 'startup.db')}")
+    try:
+        # Tables, so / renders its real template instead of an error page
+        _run(os.path.abspath(args.root), [sys.executable, "manage.py", "init-db"], env)
+        results = measure(os.path.abspath(args.root), args.rounds, env)
+    finally:
+        shutil.rmtree(db_dir, ignore_errors=True)
+
+    report.print_table(results, columns=("requests", "p50_ms", "p95_ms", "mean_ms"))
+    if args.save:
+        report.save(args.save, report.environment(benchmark="startup", rounds=args.rounds), results)
+    if args.compare:
+        problems = report.compare(report.load(args.compare), results)
+        for line in problems:
+            print("REGRESSION", line)
+        return 1 if problems else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
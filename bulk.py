@@ -0,0 +1,328 @@
+# bulk.py
+import csv
+import io
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, time
+
+from flask import current_app
+from sqlalchemy import select
+from sqlalchemy.orm import aliased
+
+from models import db, User, Appointment
+
+USER_COLUMNS = ["name", "email", "password", "role"]
+APPOINTMENT_COLUMNS = ["patient_id", "doctor_id", "date", "time", "status",
+                       "message", "patient_full_name", "patient_insurance"]
+ROLES = {"patient", "doctor", "admin"}
+STATUSES = {"pending", "approved", "rejected"}
+MAX_REPORTED_ERRORS = 20
+
+
+# ---------------- READING / WRITING -----------------
+def detect_format(filename, fmt=None):
+    if fmt:
+        return fmt
+    return "jsonl" if filename.endswith((".jsonl", ".ndjson")) else "csv"
+
+
+def read_rows(f, fmt):
+    """Stream (line number, dict) from a CSV (with header) or JSON Lines file, one line at a
+    time; the numbers are the file's own, for error messages."""
+    if fmt == "csv":
+        reader = csv.DictReader(f)
+        for row in reader:
+            yield reader.line_num, {k.strip(): (v if v != "" else None) for k, v in row.items() if k}
+    else:
+        for number, line in enumerate(f, 1):
+            if line.strip():
+                yield number, json.loads(line)
+
+
+def batched(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class RowWriter:
+    def __init__(self, f, fmt, columns):
+        self.f, self.fmt, self.columns = f, fmt, columns
+        if fmt == "csv":
+            self.writer = csv.writer(f)
+            self.writer.writerow(columns)
+
+    def write(self, values):
+        values = [v.isoformat() if isinstance(v, (date, time)) else v for v in values]
+        if self.fmt == "csv":
+            self.writer.writerow(values)
+        else:
+            self.f.write(json.dumps(dict(zip(self.columns, values))) + "\n")
+
+
+def _new_result():
+    return {"read": 0, "inserted": 0, "updated": 0, "skipped": 0, "errors": []}
+
+
+def _error(result, line, message):
+    result["skipped"] += 1
+    if len(result["errors"]) < MAX_REPORTED_ERRORS:
+        result["errors"].append(f"row {line}: {message}")
+
+
+# ---------------- PASSWORD HASHING POOL -----------------
+_pool_policy = None
+
+
+def _init_hasher(algorithm, cost):
+    global _pool_policy
+    from passwords import PasswordPolicy
+
+    _pool_policy = PasswordPolicy(algorithm, cost)
+
+
+def _hash_one(password):
+    return _pool_policy.hash(password)
+
+
+def hash_pool(policy, workers=None):
+    """Process pool that hashes with `policy`; hashing is CPU-bound, so threads won't do."""
+    return ProcessPoolExecutor(max_workers=workers or os.cpu_count(),
+                               initializer=_init_hasher, initargs=(policy.algorithm, policy.cost))
+
+
+# ---------------- POSTGRES COPY -----------------
+def _copy_supported(conn):
+    return conn.dialect.name == "postgresql" and conn.dialect.driver == "psycopg2"
+
+
+def _copy_into_temp(conn, temp_table, column_types, rows):
+    """COPY rows into a temp table that is dropped when the batch commits."""
+    conn.exec_driver_sql(
+        f"CREATE TEMP TABLE {temp_table} ({', '.join(f'{c} {t}' for c, t in column_types)}) ON COMMIT DROP"
+    )
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for row in rows:
+        writer.writerow([row.get(c) for c, _ in column_types])
+    buf.seek(0)
+    with conn.connection.dbapi_connection.cursor() as cur:
+        cur.copy_expert(f"COPY {temp_table} FROM STDIN WITH (FORMAT csv)", buf)
+
+
+# ---------------- USERS -----------------
+def _upsert_users(conn, rows, on_duplicate):
+    if _copy_supported(conn):
+        _copy_into_temp(conn, "import_user", [(c, "text") for c in USER_COLUMNS], rows)
+        conflict = ("DO UPDATE SET name = EXCLUDED.name, password = EXCLUDED.password, role = EXCLUDED.role"
+                    if on_duplicate == "update" else "DO NOTHING")
+        conn.exec_driver_sql(
+            f'INSERT INTO "user" (name, email, password, role) '
+            f'SELECT name, email, password, role FROM import_user ON CONFLICT (email) {conflict}'
+        )
+        return
+
+    if conn.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    stmt = dialect_insert(User)
+    if on_duplicate == "update":
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[User.email],
+            set_={"name": stmt.excluded.name, "password": stmt.excluded.password, "role": stmt.excluded.role},
+        )
+    else:
+        stmt = stmt.on_conflict_do_nothing(index_elements=[User.email])
+    conn.execute(stmt, rows)  # executemany
+
+
+def import_users(f, fmt="csv", batch_size=5000, on_duplicate="update", workers=None, policy=None):
+    """Stream users into the user table, one transaction per batch.
+
+    Rows need name and email, plus either `password` (plain text, hashed in a process pool
+    with the app's PasswordPolicy) or `password_hash` (kept as is, e.g. from an export).
+    Emails are lower-cased; an existing email is updated or skipped per `on_duplicate`.
+    Batches are idempotent, so a failed import can simply be run again.
+    """
+    from identity import invalidate_user
+    from passwords import get_password_policy
+    from stats import rebuild_counters
+
+    policy = policy or get_password_policy()
+    result = _new_result()
+    with hash_pool(policy, workers) as pool:
+        for batch in batched(read_rows(f, fmt), batch_size):
+            rows, plain = {}, {}
+            for line, raw in batch:
+                result["read"] += 1
+                email = (raw.get("email") or "").strip().lower()
+                role = raw.get("role") or "patient"
+                if not email or not raw.get("name"):
+                    _error(result, line, "name and email are required")
+                    continue
+                if role not in ROLES:
+                    _error(result, line, f"unknown role {role!r}")
+                    continue
+                if not raw.get("password") and not raw.get("password_hash"):
+                    _error(result, line, "password or password_hash is required")
+                    continue
+                if email in rows:
+                    result["skipped"] += 1  # the last row for an email wins
+                rows[email] = {"name": raw["name"], "email": email, "role": role,
+                               "password": raw.get("password_hash")}
+                plain.pop(email, None)
+                if not raw.get("password_hash"):
+                    plain[email] = raw["password"]
+
+            hashes = pool.map(_hash_one, list(plain.values()), chunksize=16)
+            for email, hashed in zip(list(plain), hashes):
+                rows[email]["password"] = hashed
+            if not rows:
+                continue
+
+            existing = dict(db.session.execute(
+                select(User.email, User.id).where(User.email.in_(list(rows)))
+            ).all())
+            _upsert_users(db.session.connection(), list(rows.values()), on_duplicate)
+            db.session.commit()
+
+            result["inserted"] += len(rows) - len(existing)
+            if on_duplicate == "update":
+                result["updated"] += len(existing)
+                for user_id in existing.values():
+                    invalidate_user(user_id)  # role or name may have changed
+            else:
+                result["skipped"] += len(existing)
+
+    if current_app.config.get("STATS_COUNTERS"):  # rows left over from an import would go stale
+        rebuild_counters()
+    return result
+
+
+def export_users(f, fmt="csv", include_password_hashes=False, chunk_size=2000):
+    """Write every user without loading the table: the rows come off a server-side cursor."""
+    columns = ["id", "name", "email", "role"] + (["password_hash"] if include_password_hashes else [])
+    fields = [User.id, User.name, User.email, User.role] + ([User.password] if include_password_hashes else [])
+    writer = RowWriter(f, fmt, columns)
+    count = 0
+    rows = db.session.execute(
+        select(*fields).order_by(User.id).execution_options(stream_results=True, yield_per=chunk_size)
+    )
+    for row in rows:
+        writer.write(row)
+        count += 1
+    return count
+
+
+# ---------------- APPOINTMENTS -----------------
+def _parse_date(value):
+    return value if isinstance(value, date) else date.fromisoformat(value)
+
+
+def _parse_time(value):
+    if value in (None, ""):
+        return None
+    return value if isinstance(value, time) else time.fromisoformat(value)
+
+
+def _insert_appointments(conn, rows):
+    """Insert, skipping rows that clash with an active booking (uq_appointment_doctor_slot)."""
+    if _copy_supported(conn):
+        types = [("patient_id", "integer"), ("doctor_id", "integer"), ("date", "date"), ("time", "time"),
+                 ("status", "text"), ("message", "text"), ("patient_full_name", "text"),
+                 ("patient_insurance", "text")]
+        _copy_into_temp(conn, "import_appointment", types, rows)
+        columns = ", ".join(APPOINTMENT_COLUMNS)
+        return conn.exec_driver_sql(
+            f"INSERT INTO appointment ({columns}) SELECT {columns} FROM import_appointment ON CONFLICT DO NOTHING"
+        ).rowcount
+
+    if conn.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    return conn.execute(dialect_insert(Appointment).on_conflict_do_nothing(), rows).rowcount
+
+
+def import_appointments(f, fmt="csv", batch_size=5000):
+    """Stream appointments in, one transaction per batch.
+
+    Patients and doctors are given by email (`patient_email`, `doctor_email`) or id
+    (`patient_id`, `doctor_id`); import users first. Rows for a slot the doctor already
+    has booked are skipped.
+    """
+    from stats import rebuild_counters
+
+    result = _new_result()
+    for batch in batched(read_rows(f, fmt), batch_size):
+        emails = {(raw.get(k) or "").strip().lower() for _, raw in batch for k in ("patient_email", "doctor_email")}
+        emails.discard("")
+        ids = dict(db.session.execute(select(User.email, User.id).where(User.email.in_(emails))).all()) if emails else {}
+
+        rows = []
+        for line, raw in batch:
+            result["read"] += 1
+            try:
+                status = raw.get("status") or "pending"
+                if status not in STATUSES:
+                    _error(result, line, f"unknown status {status!r}")
+                    continue
+                patient_id = raw.get("patient_id") or ids.get((raw.get("patient_email") or "").strip().lower())
+                doctor_email = (raw.get("doctor_email") or "").strip().lower()
+                doctor_id = raw.get("doctor_id") or (ids.get(doctor_email) if doctor_email else None)
+                if not patient_id:
+                    raise ValueError("unknown patient")
+                if doctor_email and not doctor_id:
+                    raise ValueError(f"unknown doctor {doctor_email}")
+                rows.append({
+                    "patient_id": int(patient_id),
+                    "doctor_id": int(doctor_id) if doctor_id else None,
+                    "date": _parse_date(raw["date"]),
+                    "time": _parse_time(raw.get("time")),
+                    "status": status,
+                    "message": raw.get("message"),
+                    "patient_full_name": raw.get("patient_full_name"),
+                    "patient_insurance": raw.get("patient_insurance"),
+                })
+            except (KeyError, TypeError, ValueError) as e:
+                _error(result, line, str(e) or type(e).__name__)
+
+        if rows:
+            inserted = _insert_appointments(db.session.connection(), rows)
+            db.session.commit()
+            result["inserted"] += inserted
+            result["skipped"] += len(rows) - inserted
+
+    # Bulk inserts bypass the session events that keep the dashboard counters current
+    if current_app.config.get("STATS_COUNTERS"):
+        rebuild_counters()
+    return result
+
+
+def export_appointments(f, fmt="csv", chunk_size=2000):
+    """Write every appointment with patient/doctor emails, streamed off a server-side cursor."""
+    patient, doctor = aliased(User), aliased(User)
+    columns = ["id", "patient_email", "doctor_email", "date", "time", "status",
+               "message", "patient_full_name", "patient_insurance"]
+    stmt = (
+        select(Appointment.id, patient.email, doctor.email, Appointment.date, Appointment.time,
+               Appointment.status, Appointment.message, Appointment.patient_full_name,
+               Appointment.patient_insurance)
+        .join(patient, Appointment.patient_id == patient.id)
+        .outerjoin(doctor, Appointment.doctor_id == doctor.id)
+        .order_by(Appointment.id)
+        .execution_options(stream_results=True, yield_per=chunk_size)
+    )
+    writer = RowWriter(f, fmt, columns)
+    count = 0
+    for row in db.session.execute(stmt):
+        writer.write(row)
+        count += 1
+    return count
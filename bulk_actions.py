@@ -0,0 +1,100 @@
+# bulk_actions.py
+"""Set-based admin actions (imports and exports are in bulk.py).
+
+Nothing here commits; the route commits once, so a bulk action applies completely or not
+at all. Each statement returns the rows it touched, which is what gets counted, notified
+and reported. Because the statements bypass the session's flush, the dashboard counters
+and cached list pages are updated here explicitly.
+"""
+from sqlalchemy import delete, update
+
+from models import db, Appointment, User
+from notifications import notify_status_change
+from read_models import lists_changed
+from scheduling import check_capacity
+from stats import record_bulk_change
+
+STATUSES = ("pending", "approved", "rejected", None)
+
+RETURNED_COLUMNS = (Appointment.id, Appointment.date, Appointment.time, Appointment.status, Appointment.doctor_id)
+
+
+def _has_status(status):
+    return Appointment.status.is_(None) if status is None else Appointment.status == status
+
+
+def _execute(stmt):
+    return db.session.execute(stmt, execution_options={"synchronize_session": False}).all()
+
+
+# ---------------- APPOINTMENTS -----------------
+def set_appointment_status(criteria, status):
+    """Set `status` on every appointment matching the WHERE `criteria`; returns the rows changed.
+
+    One UPDATE per current status, so the per-status counters move by exact amounts; rows
+    already at `status` are left alone. Each changed row gets its status e-mail queued, as
+    with a single update. Raises SlotFullError (or IntegrityError) when re-approving
+    rejected bookings would overfill their slots.
+    """
+    changed, deltas, revived = [], {}, []
+    for old in STATUSES:
+        if old == status:
+            continue
+        rows = _execute(
+            update(Appointment).where(*criteria, _has_status(old)).values(status=status).returning(*RETURNED_COLUMNS)
+        )
+        if rows:
+            deltas[old] = deltas.get(old, 0) - len(rows)
+            deltas[status] = deltas.get(status, 0) + len(rows)
+            changed += rows
+            if old == "rejected":
+                revived += rows
+
+    check_capacity({(row.date, row.time) for row in revived})
+    record_bulk_change(deltas)
+    for row in changed:
+        notify_status_change(row)
+    if changed:
+        lists_changed(db.session)
+    return changed
+
+
+# ---------------- USERS -----------------
+def set_user_role(user_ids, role):
+    """Give every listed user `role`; returns the ids that changed."""
+    changed = [row.id for row in _execute(
+        update(User).where(User.id.in_(user_ids), User.role != role).values(role=role).returning(User.id)
+    )]
+    if changed:
+        lists_changed(db.session)
+    return changed
+
+
+def delete_users(user_ids):
+    """Delete users together with what hangs off them; returns a dict of row counts.
+
+    Appointments they booked as patients are deleted. Appointments assigned to them as
+    doctors go back to the unassigned pool with their status kept. Queued notification jobs
+    for deleted appointments find nothing when they run and are skipped.
+    """
+    deltas = {}
+    deleted_appointments = 0
+    for status in STATUSES:
+        count = len(_execute(
+            delete(Appointment).where(Appointment.patient_id.in_(user_ids), _has_status(status))
+            .returning(Appointment.id)
+        ))
+        deltas[status] = -count
+        deleted_appointments += count
+    deltas["appointments"] = -deleted_appointments
+
+    unassigned = _execute(
+        update(Appointment).where(Appointment.doctor_id.in_(user_ids)).values(doctor_id=None).returning(Appointment.id)
+    )
+    deleted = [row.id for row in _execute(delete(User).where(User.id.in_(user_ids)).returning(User.id))]
+    deltas["users"] = -len(deleted)
+
+    record_bulk_change(deltas)
+    if deleted:
+        lists_changed(db.session)
+    return {"users": deleted, "appointments_deleted": deleted_appointments, "appointments_unassigned": len(unassigned)}
@@ -0,0 +1,140 @@
+# cache.py
+import pickle
+import threading
+import time
+
+from flask import current_app, has_app_context
+from sqlalchemy import event
+
+
+# ----------------------
+# Backends
+# ----------------------
+class SimpleCache:
+    """In-process cache. Every gunicorn worker keeps its own copy."""
+
+    def __init__(self, default_timeout=300):
+        self.default_timeout = default_timeout
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def _expiry(self, timeout):
+        timeout = self.default_timeout if timeout is None else timeout
+        return time.time() + timeout if timeout else None
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires is not None and expires < time.time():
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key, value, timeout=None):
+        with self._lock:
+            self._data[key] = (self._expiry(timeout), value)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class RedisCache:
+    """Shared cache, so every worker sees the same entries and invalidations."""
+
+    def __init__(self, url, default_timeout=300, key_prefix="dental:"):
+        import redis  # only needed when CACHE_BACKEND=redis
+
+        self.client = redis.Redis.from_url(url)
+        self.default_timeout = default_timeout
+        self.key_prefix = key_prefix
+
+    def get(self, key):
+        value = self.client.get(self.key_prefix + key)
+        return None if value is None else pickle.loads(value)
+
+    def set(self, key, value, timeout=None):
+        timeout = self.default_timeout if timeout is None else timeout
+        self.client.set(self.key_prefix + key, pickle.dumps(value), ex=timeout or None)
+
+    def delete(self, key):
+        self.client.delete(self.key_prefix + key)
+
+    def clear(self):
+        keys = list(self.client.scan_iter(self.key_prefix + "*"))
+        if keys:
+            self.client.delete(*keys)
+
+
+# ----------------------
+# Setup
+# ----------------------
+def init_cache(app):
+    backend = app.config.get("CACHE_BACKEND", "simple")
+    timeout = app.config.get("CACHE_DEFAULT_TIMEOUT", 300)
+
+    if backend == "redis":
+        url = app.config.get("CACHE_REDIS_URL")
+        if not url:
+            raise ValueError("CACHE_REDIS_URL must be set when CACHE_BACKEND=redis")
+        cache = RedisCache(url, default_timeout=timeout)
+    elif backend == "simple":
+        cache = SimpleCache(default_timeout=timeout)
+    else:
+        raise ValueError(f"Unknown CACHE_BACKEND: {backend}")
+
+    app.extensions["cache"] = cache
+    return cache
+
+
+def get_cache():
+    return current_app.extensions["cache"]
+
+
+# ----------------------
+# Home page invalidation
+# ----------------------
+HOME_CACHE_KEY = "home:sections"
+
+
+def invalidate_home():
+    get_cache().delete(HOME_CACHE_KEY)
+
+
+def _touches_home(session):
+    from models import HomeContent, SiteSettings
+
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, (HomeContent, SiteSettings)):
+            return True
+    return False
+
+
+def _mark_home_dirty(sess, flush_context, instances):
+    if _touches_home(sess):
+        sess.info["home_dirty"] = True
+
+
+def _invalidate_after_commit(sess):
+    if sess.info.pop("home_dirty", False) and has_app_context():
+        invalidate_home()
+
+
+def _reset_after_rollback(sess):
+    sess.info.pop("home_dirty", False)
+
+
+def register_home_invalidation(session):
+    """Drop the cached home page whenever a commit changes HomeContent or SiteSettings."""
+    if event.contains(session, "before_flush", _mark_home_dirty):
+        return  # db.session is shared by every app create_app() builds
+    event.listen(session, "before_flush", _mark_home_dirty)
+    event.listen(session, "after_commit", _invalidate_after_commit)
+    event.listen(session, "after_rollback", _reset_after_rollback)
@@ -0,0 +1,118 @@
+# claims.py
+"""Doctors taking appointments from the unassigned pool.
+
+Each claim is one conditional UPDATE (`... WHERE doctor_id IS NULL`), so two doctors racing
+for the same appointment can't both get it: the loser's UPDATE matches no row. Batch claims
+pick their rows with FOR UPDATE SKIP LOCKED on Postgres, so concurrent batches take
+different rows instead of queueing behind each other (SQLite ignores the clause; its writers
+are serialized anyway).
+"""
+from datetime import time
+
+from sqlalchemy import exists, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import aliased
+
+from models import db, Appointment
+from pagination import APPOINTMENT_ORDER, apply_appointment_filters
+from read_models import lists_changed
+
+MAX_BATCH = 50
+
+# What an "assigned" live event needs (see live.appointment_event)
+CLAIMED_COLUMNS = (Appointment.id, Appointment.date, Appointment.time, Appointment.status,
+                   Appointment.message, Appointment.patient_full_name, Appointment.doctor_id)
+
+
+class ClaimError(Exception):
+    pass
+
+
+def _slot_free(doctor_id):
+    """The doctor has no active booking at the appointment's slot (uq_appointment_doctor_slot)."""
+    booked = aliased(Appointment)
+    return ~exists().where(
+        booked.doctor_id == doctor_id,
+        booked.date == Appointment.date,
+        booked.time == Appointment.time,
+        booked.status != "rejected",
+    )
+
+
+def _first_of_slot():
+    """Only the lowest id among unassigned appointments sharing a slot, so one batch never
+    gives a doctor two bookings at the same time."""
+    twin = aliased(Appointment)
+    return ~exists().where(
+        twin.doctor_id.is_(None),
+        twin.date == Appointment.date,
+        twin.time == Appointment.time,
+        twin.id < Appointment.id,
+    )
+
+
+def claim_appointment(appt_id, doctor_id):
+    """Assign an unassigned appointment to `doctor_id` and commit; returns the claimed row.
+
+    Raises ClaimError when it doesn't exist, someone else claimed it first, or the doctor is
+    already booked at that time.
+    """
+    stmt = (
+        update(Appointment)
+        .where(Appointment.id == appt_id, Appointment.doctor_id.is_(None))
+        .values(doctor_id=doctor_id)
+        .returning(*CLAIMED_COLUMNS)
+    )
+    try:
+        row = db.session.execute(stmt, execution_options={"synchronize_session": False}).first()
+    except IntegrityError:
+        db.session.rollback()
+        raise ClaimError("You already have an appointment at that time.")
+
+    if row is None:
+        db.session.rollback()
+        if db.session.get(Appointment, appt_id) is None:
+            raise ClaimError("That appointment no longer exists.")
+        raise ClaimError("Another doctor has already taken that appointment.")
+
+    lists_changed(db.session)
+    db.session.commit()
+    return row
+
+
+def claim_batch(doctor_id, limit, filters=None):
+    """Claim up to `limit` of the earliest unassigned appointments (optionally filtered like
+    the listings) in one statement and commit; returns the claimed rows.
+
+    Appointments at a time the doctor is already booked are left for others.
+    """
+    candidates = (
+        select(Appointment.id)
+        .where(Appointment.doctor_id.is_(None), _slot_free(doctor_id), _first_of_slot())
+    )
+    candidates = (
+        apply_appointment_filters(candidates, filters or {})
+        .order_by(*APPOINTMENT_ORDER)
+        .limit(max(1, min(limit, MAX_BATCH)))
+        .with_for_update(skip_locked=True, of=Appointment)
+        .correlate(None)  # its own FROM appointment, not the UPDATE's row
+        .scalar_subquery()
+    )
+    stmt = (
+        update(Appointment)
+        .where(Appointment.id.in_(candidates), Appointment.doctor_id.is_(None))
+        .values(doctor_id=doctor_id)
+        .returning(*CLAIMED_COLUMNS)
+    )
+    try:
+        rows = db.session.execute(stmt, execution_options={"synchronize_session": False}).all()
+    except IntegrityError:
+        # Only when another batch for the same doctor committed a row at one of these slots
+        db.session.rollback()
+        raise ClaimError("Some of those appointments clash with one you just claimed; please try again.")
+
+    if rows:
+        lists_changed(db.session)
+    db.session.commit()
+    # RETURNING has no order; sort like APPOINTMENT_ORDER (no time first)
+    return sorted(rows, key=lambda r: (r.date, r.time is not None, r.time or time.min, r.id))
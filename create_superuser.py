@@ -1,9 +1,10 @@
 # create_superuser.py
 import os
 from getpass import getpass
-from app import app, db
+from app import create_app
+from models import db
 from models import User
-from werkzeug.security import generate_password_hash
+from passwords import hash_password
 
 def create_superuser():
     if os.getenv("FLASK_ENV") == "production":
@@ -24,6 +25,7 @@ def create_superuser():
         else:
             break
 
+    app = create_app()
     with app.app_context():
         if User.query.filter_by(email=email).first():
             print(f"❌ User with email '{email}' already exists!")
@@ -32,7 +34,7 @@ def create_superuser():
         superadmin = User(
             name=name,
             email=email,
-            password=generate_password_hash(password),
+            password=hash_password(password),
             role="superadmin",
        
         )
@@ -0,0 +1,124 @@
+# db_profiles.py
+from sqlalchemy import event
+
+# ----------------------
+# Profiles
+# ----------------------
+# sqlite           - SQLAlchemy defaults (development)
+# sqlite-kiosk     - WAL, synchronous=NORMAL, busy_timeout and mmap: readers no longer block
+#                    the writer, and a busy database waits instead of failing
+# postgres         - direct connections (Supabase port 5432): pooled per worker, with
+#                    statement_timeout and application_name sent at connect time
+# postgres-pooler  - behind PgBouncer/Supavisor in transaction mode (port 6543): no prepared
+#                    statements, and statement_timeout set per transaction because poolers
+#                    don't pass startup options through
+PROFILES = ("sqlite", "sqlite-kiosk", "postgres", "postgres-pooler")
+
+
+def default_profile(url):
+    return "sqlite" if url.startswith("sqlite") else "postgres"
+
+
+def pool_size_for(settings):
+    """(pool_size, max_overflow) per process, so every gunicorn worker together stays within
+    DB_MAX_CONNECTIONS. Without a budget the old fixed 5 + 10 is kept.
+    """
+    budget = settings.get("DB_MAX_CONNECTIONS")
+    if not budget:
+        return 5, 10
+    workers = max(1, settings.get("WEB_CONCURRENCY") or 1)
+    per_worker = max(1, budget // workers)
+    # Keep one connection per request thread; background threads (image processing) use the overflow
+    pool_size = min(per_worker, max(1, settings.get("GUNICORN_THREADS") or 1))
+    return pool_size, per_worker - pool_size
+
+
+def engine_options(profile, url, settings):
+    """SQLALCHEMY_ENGINE_OPTIONS for a profile; `settings` is app.config (or any dict)."""
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown DB_PROFILE: {profile} (choose from {', '.join(PROFILES)})")
+    is_sqlite = url.startswith("sqlite")
+    if is_sqlite != profile.startswith("sqlite"):
+        raise ValueError(f"DB_PROFILE={profile} does not fit database URL {url.split('://')[0]}://...")
+
+    if profile == "sqlite":
+        return {}
+    if profile == "sqlite-kiosk":
+        # Python's sqlite3 waits `timeout` seconds for locks too; keep it in step with busy_timeout
+        return {"connect_args": {"timeout": settings.get("SQLITE_BUSY_TIMEOUT_MS", 5000) / 1000}}
+
+    pool_size, max_overflow = pool_size_for(settings)
+    options = {
+        "pool_pre_ping": True,   # Fixes 'server closed the connection unexpectedly'
+        "pool_recycle": 300,     # Recycle connections every 5 minutes
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": settings.get("DB_POOL_TIMEOUT", 30),
+    }
+    application_name = settings.get("DB_APPLICATION_NAME") or "dental"
+    timeout = settings.get("DB_STATEMENT_TIMEOUT_MS")
+    asyncpg = "+asyncpg" in url
+
+    # asyncpg (the async API, see api/) takes server settings instead of libpq options
+    if asyncpg:
+        connect_args = {"server_settings": {"application_name": application_name}}
+    else:
+        connect_args = {"application_name": application_name}
+
+    if profile == "postgres":
+        if timeout and asyncpg:
+            connect_args["server_settings"]["statement_timeout"] = str(int(timeout))
+        elif timeout:
+            connect_args["options"] = f"-c statement_timeout={int(timeout)}"
+    else:
+        # psycopg2 never prepares statements; psycopg 3 does after 5 runs unless told not to
+        if url.startswith("postgresql+psycopg:") or url.startswith("postgresql+psycopg_async:"):
+            connect_args["prepare_threshold"] = None
+        if asyncpg:
+            connect_args["statement_cache_size"] = 0
+            connect_args["prepared_statement_cache_size"] = 0
+    options["connect_args"] = connect_args
+    return options
+
+
+# ----------------------
+# Per-connection setup
+# ----------------------
+def _sqlite_kiosk_pragmas(settings):
+    busy_timeout = int(settings.get("SQLITE_BUSY_TIMEOUT_MS", 5000))
+    mmap_size = int(settings.get("SQLITE_MMAP_SIZE", 256 * 1024 * 1024))
+
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")  # safe with WAL; fsync at checkpoints only
+        cursor.execute(f"PRAGMA busy_timeout={busy_timeout}")
+        cursor.execute(f"PRAGMA mmap_size={mmap_size}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.close()
+    return on_connect
+
+
+def _pooler_statement_timeout(timeout):
+    def on_begin(conn):
+        # SET LOCAL only lasts for this transaction, which is all the pooler guarantees us.
+        # Costs a round trip per transaction; `ALTER ROLE ... SET statement_timeout` avoids it.
+        conn.exec_driver_sql(f"SET LOCAL statement_timeout = {int(timeout)}")
+    return on_begin
+
+
+def install_profile(engine, profile, settings):
+    """Attach the profile's connection/transaction hooks to an engine."""
+    if profile == "sqlite-kiosk":
+        event.listen(engine, "connect", _sqlite_kiosk_pragmas(settings))
+    elif profile == "postgres-pooler" and settings.get("DB_STATEMENT_TIMEOUT_MS"):
+        event.listen(engine, "begin", _pooler_statement_timeout(settings["DB_STATEMENT_TIMEOUT_MS"]))
+
+
+def describe(profile, options):
+    """One line for the startup log."""
+    if "pool_size" in options:
+        connect_args = options["connect_args"]
+        name = connect_args.get("application_name") or connect_args["server_settings"]["application_name"]
+        return f"{profile} (pool {options['pool_size']} + {options['max_overflow']} overflow, application_name={name})"
+    return profile
@@ -0,0 +1,44 @@
+# gunicorn.conf.py
+# Picked up automatically by `gunicorn` started from this directory.
+import os
+import shlex
+import sys
+
+wsgi_app = "app:create_app()"
+
+# Build the app once in the master and fork the workers from it: imports, config and the
+# password dummy hash are paid once, and workers share those pages copy-on-write
+preload_app = True
+
+
+def _option(name):
+    """A setting given as a gunicorn option (`-w 4`, or in GUNICORN_CMD_ARGS); those override
+    this file, so the counts exported below have to come from them when present."""
+    from gunicorn.config import Config
+
+    args = shlex.split(os.environ.get("GUNICORN_CMD_ARGS", "")) + sys.argv[1:]
+    return getattr(Config().parser().parse_known_args(args)[0], name, None)
+
+
+# Exported before the app is built, so load_config() sizes DB pools (see db_profiles.py) and
+# picks defaults for the same worker/thread counts gunicorn actually runs. This can't wait
+# for on_starting: with preload_app the app is built before that hook runs.
+workers = _option("workers") or int(os.environ.get("WEB_CONCURRENCY", "2"))
+threads = _option("threads") or int(os.environ.get("GUNICORN_THREADS", "1"))
+os.environ["WEB_CONCURRENCY"] = str(workers)
+os.environ["GUNICORN_THREADS"] = str(threads)
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:" + os.getenv("PORT", "8000"))
+
+
+def on_starting(server):
+    if server.cfg.workers != workers or server.cfg.threads != threads:
+        server.log.warning("The app was configured for %s worker(s) x %s thread(s) but gunicorn runs %s x %s; "
+                           "set WEB_CONCURRENCY/GUNICORN_THREADS or -w/--threads instead",
+                           workers, threads, server.cfg.workers, server.cfg.threads)
+
+
+def post_fork(server, worker):
+    from app import reset_after_fork
+
+    # With preload_app this is the master's app object, not a new one
+    reset_after_fork(server.app.wsgi())
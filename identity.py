@@ -0,0 +1,104 @@
+# identity.py
+import time
+
+from flask import current_app, session
+from flask_login import UserMixin, user_logged_in, user_logged_out
+
+from cache import get_cache
+from metrics import USER_CACHE
+from models import db, User
+from replicas import primary_reads
+
+SESSION_KEY = "_identity"
+
+
+class CachedUser(UserMixin):
+    """The parts of User that requests need (id, name, email, role), without a DB row."""
+
+    def __init__(self, id, name, email, role):
+        self.id = id
+        self.name = name
+        self.email = email
+        self.role = role
+
+    @classmethod
+    def from_user(cls, user):
+        return cls(user.id, user.name, user.email, user.role)
+
+    def to_dict(self):
+        return {"id": self.id, "name": self.name, "email": self.email, "role": self.role}
+
+
+def _cache_key(user_id):
+    return f"user:{int(user_id)}"
+
+
+def invalidate_user(user_id):
+    """Drop a cached identity so role changes and deletions apply on the next request."""
+    get_cache().delete(_cache_key(user_id))
+
+
+def load_user(user_id):
+    """Flask-Login user loader.
+
+    USER_SESSION_MODE picks where identities are remembered between requests:
+      "off"    - query the user table on every request
+      "cache"  - cache backend with USER_CACHE_TTL, invalidated by admin.update_user/delete_user;
+                 needs CACHE_BACKEND=redis once there is more than one worker, since an
+                 invalidation only reaches the cache it runs against
+      "signed" - name and role ride in the signed session cookie and are re-checked every
+                 USER_CACHE_TTL seconds; admin changes take effect after at most one TTL
+    """
+    mode = current_app.config.get("USER_SESSION_MODE") or "off"
+    ttl = current_app.config.get("USER_CACHE_TTL", 300)
+    user_id = int(user_id)
+
+    if mode == "signed":
+        data = session.get(SESSION_KEY)
+        if data and data["id"] == user_id and data["checked"] + ttl > time.time():
+            USER_CACHE.inc("hit")
+            return CachedUser(data["id"], data["name"], data["email"], data["role"])
+    elif mode == "cache":
+        data = get_cache().get(_cache_key(user_id))
+        if data is not None:
+            USER_CACHE.inc("hit")
+            return CachedUser(**data)
+
+    USER_CACHE.inc("miss")
+    if mode == "off":
+        user = db.session.get(User, user_id)
+    else:
+        with primary_reads():  # what gets remembered must not predate a role change
+            user = db.session.get(User, user_id)
+    if user is None:
+        return None
+
+    identity = CachedUser.from_user(user)
+    if mode == "signed":
+        session[SESSION_KEY] = dict(identity.to_dict(), checked=time.time())
+    elif mode == "cache":
+        get_cache().set(_cache_key(user_id), identity.to_dict(), timeout=ttl)
+    return identity
+
+
+def _remember_login(sender, user, **extra):
+    if current_app.config.get("USER_SESSION_MODE") == "signed":
+        session[SESSION_KEY] = dict(CachedUser.from_user(user).to_dict(), checked=time.time())
+
+
+def _forget_logout(sender, user, **extra):
+    session.pop(SESSION_KEY, None)
+
+
+def init_identity(app, login_manager):
+    config = app.config
+    mode = config.get("USER_SESSION_MODE")
+    shared = config.get("CACHE_BACKEND") == "redis"
+    if mode is None:
+        mode = config["USER_SESSION_MODE"] = "cache" if shared else "off"
+    if mode == "cache" and not shared and config.get("WEB_CONCURRENCY", 1) > 1:
+        raise ValueError("USER_SESSION_MODE=cache with a per-worker cache keeps stale identities in "
+                         "other workers after a role change; use CACHE_BACKEND=redis, signed or off")
+    login_manager.user_loader(load_user)
+    user_logged_in.connect(_remember_login, app)
+    user_logged_out.connect(_forget_logout, app)
@@ -0,0 +1,138 @@
+# images.py
+import io
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+from PIL import Image, ImageOps
+
+from models import db, HomeContent
+from storage import get_storage
+
+DEFAULT_WIDTHS = (320, 640, 1280)
+VARIANT_DIR = "variants"  # key prefix inside the upload storage
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+_executor = None
+
+
+# ---------------- VARIANTS -----------------
+def _flatten(img):
+    """JPEG has no alpha channel: paint transparent images onto white."""
+    if img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info):
+        img = img.convert("RGBA")
+        background = Image.new("RGB", img.size, (255, 255, 255))
+        background.paste(img, mask=img.getchannel("A"))
+        return background
+    return img.convert("RGB")
+
+
+def _save_variant(storage, key, img, fmt, **options):
+    buf = io.BytesIO()
+    img.save(buf, fmt, **options)
+    buf.seek(0)
+    storage.save(key, buf, content_type=f"image/{fmt.lower()}", cache_control=IMMUTABLE)
+
+
+def generate_variants(storage, filename, widths=DEFAULT_WIDTHS, quality=80):
+    """Write WebP and JPEG copies of an upload at several widths.
+
+    Images are rotated per their EXIF orientation and re-encoded from pixels only, so
+    EXIF/GPS/ICC metadata is dropped. Returns the variant set stored on HomeContent.
+    """
+    stem = variant_stem(filename)
+
+    with storage.open(filename) as f, Image.open(f) as src:
+        img = ImageOps.exif_transpose(src)
+        img.load()
+
+    # Never upscale; a small image gets a single variant at its own width
+    targets = sorted({w for w in widths if w < img.width} | {min(img.width, max(widths))})
+
+    variants = {"webp": [], "jpeg": []}
+    for width in targets:
+        height = round(img.height * width / img.width)
+        resized = img.resize((width, height), Image.LANCZOS) if width != img.width else img
+
+        webp_name = f"{VARIANT_DIR}/{stem}-{width}.webp"
+        _save_variant(storage, webp_name, resized, "WEBP", quality=quality, method=4)
+        variants["webp"].append([width, webp_name])
+
+        jpeg_name = f"{VARIANT_DIR}/{stem}-{width}.jpg"
+        _save_variant(storage, jpeg_name, _flatten(resized), "JPEG",
+                      quality=quality, optimize=True, progressive=True)
+        variants["jpeg"].append([width, jpeg_name])
+
+    variants["fallback"] = variants["jpeg"][-1][1]
+    return variants
+
+
+def variant_stem(filename):
+    return filename.replace(".", "_")  # keeps photo.png and photo.jpg apart
+
+
+def delete_variants(storage, filename):
+    """Remove every variant generated from `filename`."""
+    for key, _ in list(storage.list(f"{VARIANT_DIR}/{variant_stem(filename)}-")):
+        storage.delete(key)
+
+
+# ---------------- WORKER POOL -----------------
+def _get_executor(app):
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=app.config.get("IMAGE_WORKERS", 2),
+            thread_name_prefix="image-worker",
+        )
+    return _executor
+
+
+def process_content_image(app, content_id, filename):
+    """Build variants for one HomeContent image; runs on the worker pool."""
+    with app.app_context():
+        widths = app.config.get("IMAGE_VARIANT_WIDTHS", DEFAULT_WIDTHS)
+        try:
+            variants = generate_variants(get_storage(), filename, widths)
+            status = "ready"
+        except Exception:
+            app.logger.exception("Could not process image %s", filename)
+            variants, status = None, "failed"
+
+        content = db.session.get(HomeContent, content_id)
+        # The admin may have replaced or removed the image while we were working
+        if content is None or content.image != filename:
+            return
+        content.image_variants = json.dumps(variants) if variants else None
+        content.image_status = status
+        db.session.commit()
+
+
+def mark_image_pending(content):
+    content.image_status = "pending" if content.image else None
+    content.image_variants = None
+    if not content.image:
+        return
+
+    # Identical uploads share a blob (see uploads.py), so they can share its variants too
+    done = HomeContent.query.filter(
+        HomeContent.image == content.image,
+        HomeContent.image_status == "ready",
+    ).first()
+    if done is not None:
+        content.image_variants = done.image_variants
+        content.image_status = "ready"
+
+
+def queue_image_processing(content):
+    """Hand a committed upload to the worker pool, so the admin request returns immediately.
+
+    With IMAGE_PROCESSING_SYNC set (tests, CLI backfill) the variants are built inline.
+    """
+    if content.image_status != "pending":
+        return None
+    app = current_app._get_current_object()
+    if app.config.get("IMAGE_PROCESSING_SYNC"):
+        process_content_image(app, content.id, content.image)
+        return None
+    return _get_executor(app).submit(process_content_image, app, content.id, content.image)
@@ -0,0 +1,181 @@
+# instrumentation.py
+import random
+import time
+from functools import wraps
+
+from flask import g, has_request_context, request, before_render_template, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from models import db
+from query_guard import query_count
+from metrics import (
+    REQUEST_LATENCY, REQUEST_SQL_COUNT, REQUEST_SQL_TIME, TEMPLATE_RENDER,
+    POOL_CHECKOUT_WAIT, POOL_CHECKED_OUT, SLOW_REQUESTS,
+)
+
+
+def _endpoint():
+    # Label by route, never by raw path, so 404 scans can't blow up the series count
+    return request.url_rule.endpoint if request.url_rule else "<unmatched>"
+
+
+# ---------------- SQL -----------------
+def _before_execute(conn, cursor, statement, parameters, context, executemany):
+    # Statements on one connection run one at a time, so a single slot is enough
+    conn.info["query_start"] = time.perf_counter()
+
+
+def _after_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.pop("query_start", None)
+    if started is None or not has_request_context():
+        return
+    elapsed = time.perf_counter() - started
+    g.sql_time = g.get("sql_time", 0.0) + elapsed
+    trace = g.get("sql_trace")
+    if trace is not None:
+        trace.append((elapsed, statement))  # no parameters: they hold emails and password hashes
+
+
+# ---------------- POOL -----------------
+def _instrument_pool(engine):
+    """Time Pool.connect(), which is where a request blocks when the pool is exhausted.
+
+    SQLAlchemy has no "checkout started" event, so the bound method is wrapped on the pool
+    instance. engine.dispose() builds a new pool; this runs per request and re-wraps it.
+    """
+    pool = engine.pool
+    if getattr(pool, "_metrics_wrapped", False):
+        return
+    connect = pool.connect
+
+    @wraps(connect)
+    def timed_connect(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return connect(*args, **kwargs)
+        finally:
+            POOL_CHECKOUT_WAIT.observe(time.perf_counter() - started)
+            if hasattr(pool, "checkedout"):
+                POOL_CHECKED_OUT.set(pool.checkedout())
+
+    pool.connect = timed_connect
+    pool._metrics_wrapped = True
+    if hasattr(pool, "checkedout"):
+        event.listen(pool, "checkin", lambda *a: POOL_CHECKED_OUT.set(pool.checkedout()))
+
+
+# ---------------- TEMPLATES -----------------
+def _template_started(app, template, context, **extra):
+    if has_request_context():
+        g.setdefault("template_start", []).append(time.perf_counter())
+
+
+def _template_finished(app, template, context, **extra):
+    stack = g.get("template_start") if has_request_context() else None
+    if stack:
+        TEMPLATE_RENDER.observe(time.perf_counter() - stack.pop(), template.name or "<string>")
+
+
+# ---------------- SLOW REQUESTS -----------------
+def _log_slow_request(app, endpoint, elapsed):
+    SLOW_REQUESTS.inc(endpoint)
+    trace = g.get("sql_trace")
+    lines = [
+        f"Slow request: {request.method} {request.path} ({endpoint}) -> {g.get('status_code', '-')} "
+        f"in {elapsed * 1000:.0f} ms; {query_count()} SQL statements, {g.get('sql_time', 0.0) * 1000:.0f} ms in SQL"
+    ]
+    if trace:
+        for i, (took, statement) in enumerate(trace, 1):
+            lines.append(f"  #{i} {took * 1000:.1f} ms  {' '.join(statement.split())}")
+    app.logger.warning("\n".join(lines))
+
+
+# ----------------------
+# Setup
+# ----------------------
+def init_instrumentation(app):
+    """Record per-endpoint latency, SQL count/time, template render time and pool waits.
+
+    SLOW_REQUEST_MS logs requests over the threshold. The full SQL trace is only collected
+    for a SQL_TRACE_SAMPLE_RATE fraction of requests, since keeping every statement costs
+    memory on busy pages. Metrics are per process; see /admin/metrics.
+    """
+    if not event.contains(Engine, "before_cursor_execute", _before_execute):
+        event.listen(Engine, "before_cursor_execute", _before_execute)
+        event.listen(Engine, "after_cursor_execute", _after_execute)
+    before_render_template.connect(_template_started, app)
+    template_rendered.connect(_template_finished, app)
+
+    @app.before_request
+    def start_request_timer():
+        g.request_start = time.perf_counter()
+        g.sql_time = 0.0
+        rate = app.config.get("SQL_TRACE_SAMPLE_RATE", 0.0)
+        if app.config.get("SLOW_REQUEST_MS") and rate and random.random() < rate:
+            g.sql_trace = []
+        _instrument_pool(db.engine)
+
+    @app.after_request
+    def remember_status(response):
+        g.status_code = response.status_code
+        return response
+
+    @app.teardown_request
+    def record_request(exc=None):
+        started = g.pop("request_start", None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        endpoint = _endpoint()
+        REQUEST_LATENCY.observe(elapsed, endpoint)
+        REQUEST_SQL_COUNT.observe(query_count(), endpoint)
+        REQUEST_SQL_TIME.observe(g.get("sql_time", 0.0), endpoint)
+
+        threshold = app.config.get("SLOW_REQUEST_MS") or 0
+        if threshold and elapsed * 1000 >= threshold:
+            _log_slow_request(app, endpoint, elapsed)
+
+
+def endpoint_summary():
+    """Rows for the admin metrics page, slowest p95 first."""
+    latency = REQUEST_LATENCY.snapshot()
+    sql_count = REQUEST_SQL_COUNT.snapshot()
+    sql_time = REQUEST_SQL_TIME.snapshot()
+    rows = []
+    for endpoint, data in latency.items():
+        count = data["count"]
+        rows.append({
+            "endpoint": endpoint,
+            "count": count,
+            "avg_ms": data["sum"] / count * 1000,
+            "p50_ms": REQUEST_LATENCY.quantile(0.50, endpoint) * 1000,
+            "p95_ms": REQUEST_LATENCY.quantile(0.95, endpoint) * 1000,
+            "p99_ms": REQUEST_LATENCY.quantile(0.99, endpoint) * 1000,
+            "avg_sql": sql_count.get(endpoint, {}).get("sum", 0) / count,
+            "avg_sql_ms": sql_time.get(endpoint, {}).get("sum", 0) / count * 1000,
+            "slow": SLOW_REQUESTS.value(endpoint),
+        })
+    return sorted(rows, key=lambda r: r["p95_ms"], reverse=True)
+
+
+def template_summary():
+    rows = []
+    for name, data in TEMPLATE_RENDER.snapshot().items():
+        rows.append({
+            "template": name,
+            "count": data["count"],
+            "avg_ms": data["sum"] / data["count"] * 1000,
+            "p95_ms": TEMPLATE_RENDER.quantile(0.95, name) * 1000,
+        })
+    return sorted(rows, key=lambda r: r["avg_ms"] * r["count"], reverse=True)
+
+
+def pool_summary():
+    data = POOL_CHECKOUT_WAIT.snapshot().get(None, {"count": 0, "sum": 0.0})
+    return {
+        "checkouts": data["count"],
+        "avg_wait_ms": data["sum"] / data["count"] * 1000 if data["count"] else 0.0,
+        "p99_wait_ms": (POOL_CHECKOUT_WAIT.quantile(0.99) or 0.0) * 1000,
+        "checked_out": POOL_CHECKED_OUT.value(),
+    }
@@ -0,0 +1,71 @@
+# jinja_cache.py
+"""Compiled templates: a bytecode cache every process shares, and a warmup at boot.
+
+The first render of a template parses it, generates Python and compiles that; the
+bytecode cache stores the result, so a fresh worker only unmarshals it. warm_templates()
+loads every template before the first request; with preload_app (gunicorn.conf.py) that
+happens once in the master and the workers inherit the compiled templates.
+"""
+import hashlib
+import os
+import time
+
+from jinja2 import FileSystemBytecodeCache, MemcachedBytecodeCache, TemplateSyntaxError
+
+
+def make_bytecode_cache(app):
+    """JINJA_BYTECODE_CACHE: "filesystem" (JINJA_CACHE_DIR), "cache" (the CACHE_BACKEND) or "off"."""
+    kind = app.config.get("JINJA_BYTECODE_CACHE", "filesystem")
+    if kind == "off":
+        return None
+    if kind == "filesystem":
+        directory = app.config.get("JINJA_CACHE_DIR") or os.path.join(app.instance_path, "jinja_cache")
+        os.makedirs(directory, exist_ok=True)
+        return FileSystemBytecodeCache(directory)
+    if kind == "cache":
+        # SimpleCache/RedisCache have the get/set(key, value, timeout) the memcached cache expects;
+        # timeout=0 keeps entries until evicted (Jinja checks the source checksum on load)
+        return MemcachedBytecodeCache(app.extensions["cache"], prefix="jinja:", timeout=0)
+    raise ValueError(f"Unknown JINJA_BYTECODE_CACHE: {kind} (choose filesystem, cache or off)")
+
+
+def warm_templates(app):
+    """Load every template into the environment (compiling it or reading the bytecode cache).
+
+    Returns (loaded names, seconds). A template that doesn't compile is logged and skipped;
+    it still fails when a page renders it.
+    """
+    env = app.jinja_env
+    started = time.perf_counter()
+    loaded = []
+    for name in env.list_templates(extensions=["html"]):
+        try:
+            env.get_template(name)
+        except TemplateSyntaxError:
+            app.logger.exception("Template %s does not compile", name)
+            continue
+        loaded.append(name)
+    return loaded, time.perf_counter() - started
+
+
+def build_version(app):
+    """Digest of every template's source and the asset manifest: what a deploy changes in
+    rendered pages, for ETags over them."""
+    env = app.jinja_env
+    digest = hashlib.sha1()
+    for name in sorted(env.list_templates()):
+        source, _, _ = env.loader.get_source(env, name)
+        digest.update(name.encode() + b"\0" + source.encode())
+    assets = app.extensions.get("assets")
+    if assets is not None:
+        for logical, path in sorted(assets.urls.items()):
+            digest.update(f"{logical}={path}".encode())
+    return digest.hexdigest()[:12]
+
+
+def init_templates(app):
+    app.jinja_env.bytecode_cache = make_bytecode_cache(app)
+    if not app.config.get("BUILD_VERSION"):
+        app.config["BUILD_VERSION"] = build_version(app)
+    if app.config.get("TEMPLATE_WARMUP"):
+        warm_templates(app)
@@ -0,0 +1,188 @@
+# jobs.py
+import json
+import os
+import random
+import socket
+import time
+import traceback
+import uuid
+from datetime import datetime, timedelta
+from itertools import groupby
+
+from flask import current_app
+from sqlalchemy import delete, select, update
+
+from models import db, Job
+
+# kind -> (handler, batch). Batch handlers receive a list of payloads.
+HANDLERS = {}
+
+
+def job(kind, batch=False):
+    """Register a handler for a job kind."""
+    def decorator(fn):
+        HANDLERS[kind] = (fn, batch)
+        return fn
+    return decorator
+
+
+def enqueue(kind, payload=None, run_at=None, max_attempts=5, session=None):
+    """Queue a job in the current session (db.session unless another one is given).
+
+    Nothing is written until the caller commits, so the job and the change that caused
+    it are saved (or rolled back) together.
+    """
+    new_job = Job(
+        kind=kind,
+        payload=json.dumps(payload or {}),
+        status="queued",
+        attempts=0,
+        max_attempts=max_attempts,
+        run_at=run_at or datetime.utcnow(),
+    )
+    (session or db.session).add(new_job)
+    return new_job
+
+
+def backoff(attempts, base=30, cap=3600):
+    """Seconds to wait before retry number `attempts` (exponential, with jitter)."""
+    delay = min(cap, base * 2 ** (attempts - 1))
+    return delay * random.uniform(0.8, 1.2)
+
+
+# ---------------- CLAIMING -----------------
+def _due(now):
+    return (Job.status == "queued", Job.run_at <= now)
+
+
+def _claim_postgres(size, worker_id, now):
+    # Row locks are held until the batch commits; other workers skip past them
+    jobs = db.session.execute(
+        select(Job).where(*_due(now)).order_by(Job.run_at, Job.id)
+        .limit(size).with_for_update(skip_locked=True)
+    ).scalars().all()
+    for j in jobs:
+        j.status, j.locked_by, j.locked_at = "running", worker_id, now
+    return jobs
+
+
+def _claim_sqlite(size, worker_id, now, lock_timeout):
+    # No row locks on SQLite: claim with one conditional UPDATE (SQLite serializes writers)
+    # and commit, so a second worker can't pick the same rows.
+    db.session.execute(
+        update(Job)
+        .where(Job.status == "running", Job.locked_at < now - timedelta(seconds=lock_timeout))
+        .values(status="queued", locked_by=None, locked_at=None),
+        execution_options={"synchronize_session": False},
+    )
+    due_ids = select(Job.id).where(*_due(now)).order_by(Job.run_at, Job.id).limit(size).scalar_subquery()
+    db.session.execute(
+        update(Job)
+        .where(Job.id.in_(due_ids), Job.status == "queued")
+        .values(status="running", locked_by=worker_id, locked_at=now),
+        execution_options={"synchronize_session": False},
+    )
+    db.session.commit()
+    return db.session.execute(
+        select(Job).where(Job.locked_by == worker_id, Job.status == "running").order_by(Job.run_at, Job.id)
+    ).scalars().all()
+
+
+def claim_batch(size, worker_id, lock_timeout=600):
+    now = datetime.utcnow()
+    if db.engine.dialect.name == "postgresql":
+        return _claim_postgres(size, worker_id, now)
+    return _claim_sqlite(size, worker_id, now, lock_timeout)
+
+
+# ---------------- RUNNING -----------------
+def _finish(j):
+    j.status, j.locked_by, j.locked_at, j.last_error = "done", None, None, None
+
+
+def _retry(j, error):
+    j.attempts += 1
+    j.last_error = "".join(traceback.format_exception_only(type(error), error)).strip()
+    j.locked_by = j.locked_at = None
+    if j.attempts >= j.max_attempts:
+        j.status = "failed"
+        current_app.logger.error("Job %s (%s) failed permanently: %s", j.id, j.kind, j.last_error)
+    else:
+        j.status = "queued"
+        j.run_at = datetime.utcnow() + timedelta(seconds=backoff(j.attempts))
+
+
+def _run(handler, batch, group):
+    """Run jobs of one kind inside a savepoint, so a failure only rolls back its own work.
+
+    If a batch fails, its jobs are retried one by one to find the culprit; delivery is
+    at-least-once, so handlers should tolerate running twice.
+    """
+    if not batch and len(group) > 1:
+        for j in group:
+            _run(handler, batch, [j])
+        return
+    try:
+        with db.session.begin_nested():
+            if batch:
+                handler([j.data for j in group])
+            else:
+                handler(group[0].data)
+    except Exception as e:
+        if len(group) == 1:
+            _retry(group[0], e)
+            return
+        for j in group:
+            _run(handler, batch, [j])
+        return
+    for j in group:
+        _finish(j)
+
+
+def run_batch(size=50, worker_id=None, lock_timeout=600):
+    """Claim up to `size` due jobs, run them, and commit everything in one transaction."""
+    worker_id = worker_id or default_worker_id()
+    jobs = claim_batch(size, worker_id, lock_timeout)
+    if not jobs:
+        db.session.commit()
+        return 0
+
+    for kind, group in groupby(sorted(jobs, key=lambda j: j.kind), key=lambda j: j.kind):
+        group = list(group)
+        if kind not in HANDLERS:
+            for j in group:
+                j.max_attempts = j.attempts + 1
+                _retry(j, LookupError(f"No handler registered for job kind {kind!r}"))
+            continue
+        handler, batch = HANDLERS[kind]
+        _run(handler, batch, group)
+
+    db.session.commit()
+    return len(jobs)
+
+
+def prune_jobs(older_than_days=7):
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    result = db.session.execute(delete(Job).where(Job.status == "done", Job.created_at < cutoff))
+    db.session.commit()
+    return result.rowcount
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+def work(batch_size=50, poll_interval=2.0, once=False, lock_timeout=600):
+    """Worker loop: drain due jobs in batches, sleep when the queue is empty."""
+    worker_id = default_worker_id()
+    last_prune = 0
+    while True:
+        processed = run_batch(batch_size, worker_id, lock_timeout)
+        if time.time() - last_prune > 3600:
+            prune_jobs(current_app.config.get("JOB_RETENTION_DAYS", 7))
+            last_prune = time.time()
+        if processed:
+            continue
+        if once:
+            return
+        time.sleep(poll_interval)
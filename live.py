@@ -0,0 +1,294 @@
+# live.py
+"""Appointment deltas pushed to open doctor dashboards as server-sent events.
+
+Routes call publish_appointment() after their commit. The broker fans each event out to the
+streams open in this process. Every stream has a bounded buffer (LIVE_BUFFER_SIZE): a client
+that falls that far behind is told to resync (reload once) instead of slowing the publisher
+or growing memory. LIVE_UPDATES_BACKEND:
+
+  "local"    - in-process only; right for a single worker process (asgi.py, or one
+               gunicorn worker with GUNICORN_THREADS > 1)
+  "postgres" - NOTIFY on publish and a LISTEN thread in every worker feeding its local
+               broker, so streams on any worker see every event
+  "off"      - no stream; the dashboard works as before, with full reloads
+"""
+import json
+import os
+import queue
+import select
+import threading
+import time
+import uuid
+from collections import deque
+
+from flask import current_app
+from sqlalchemy import create_engine, func
+from sqlalchemy import select as sql_select
+from sqlalchemy.pool import NullPool
+
+from metrics import LIVE_EVENTS, LIVE_STREAMS
+
+CHANNEL = "appointment_events"
+RESYNC = {"type": "resync"}
+
+
+class Subscription:
+    """One open stream: a bounded queue plus the filter deciding which events it wants."""
+
+    def __init__(self, accept, size):
+        self.accept = accept
+        self.queue = queue.Queue(maxsize=size)
+        self.overflowed = False
+
+    def offer(self, event):
+        if self.overflowed or not self.accept(event):
+            return
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            # Never block the publisher on a slow reader; it reloads instead
+            self.overflowed = True
+            LIVE_EVENTS.inc("overflow")
+
+    def get(self, timeout):
+        """The next event, RESYNC once the client can't be caught up, or None after `timeout`."""
+        if self.overflowed:
+            return RESYNC
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class LocalBroker:
+    def __init__(self, app, buffer_size=100, replay_size=500, max_streams=1):
+        self.app = app
+        self.buffer_size = buffer_size
+        self.max_streams = max_streams
+        self.lock = threading.Lock()
+        self.subscriptions = set()
+        self.recent = deque(maxlen=replay_size)  # replayed to clients reconnecting with Last-Event-ID
+
+    def publish(self, event):
+        self.deliver(event)
+
+    def deliver(self, event):
+        with self.lock:
+            self.recent.append(event)
+            for sub in self.subscriptions:
+                sub.offer(event)
+        LIVE_EVENTS.inc("published")
+
+    def subscribe(self, accept, last_event_id=None):
+        """A Subscription, or None when max_streams streams are already open here."""
+        with self.lock:
+            if len(self.subscriptions) >= self.max_streams:
+                return None
+            sub = Subscription(accept, self.buffer_size)
+            if last_event_id:
+                ids = [e["id"] for e in self.recent]
+                if last_event_id in ids:
+                    for event in list(self.recent)[ids.index(last_event_id) + 1:]:
+                        sub.offer(event)
+                else:
+                    sub.overflowed = True  # missed events we no longer have
+            self.subscriptions.add(sub)
+            LIVE_STREAMS.set(len(self.subscriptions))
+        return sub
+
+    def unsubscribe(self, sub):
+        with self.lock:
+            self.subscriptions.discard(sub)
+            LIVE_STREAMS.set(len(self.subscriptions))
+
+    def resync_all(self):
+        with self.lock:
+            for sub in self.subscriptions:
+                sub.overflowed = True
+
+
+class PostgresBroker(LocalBroker):
+    """NOTIFY on publish; a LISTEN thread per process delivers to the local streams.
+
+    LISTEN needs a session of its own, so with the Supabase transaction pooler (port 6543)
+    point LIVE_DATABASE_URL at the direct or session-mode connection.
+    """
+
+    def __init__(self, app, url, **kwargs):
+        super().__init__(app, **kwargs)
+        self.url = url
+        self.listener_pid = None
+
+    def publish(self, event):
+        from models import db
+
+        payload = json.dumps(event)
+        if len(payload) >= 8000:  # NOTIFY's payload limit
+            payload = json.dumps(dict(RESYNC, id=event["id"]))
+        with db.engine.connect() as conn:
+            conn.execute(sql_select(func.pg_notify(CHANNEL, payload)))
+            conn.commit()
+        # This process receives it back through its own LISTEN, like every other worker
+
+    def subscribe(self, accept, last_event_id=None):
+        self._ensure_listener()
+        return super().subscribe(accept, last_event_id)
+
+    def _ensure_listener(self):
+        # Threads don't survive fork: start one per worker process, on its first stream
+        with self.lock:
+            if self.listener_pid == os.getpid():
+                return
+            self.listener_pid = os.getpid()
+        threading.Thread(target=self._listen, name="live-listen", daemon=True).start()
+
+    def _listen(self):
+        engine = create_engine(self.url, poolclass=NullPool)
+        delay = 1
+        while True:
+            try:
+                raw = engine.raw_connection()
+                try:
+                    conn = raw.driver_connection
+                    conn.autocommit = True
+                    conn.cursor().execute(f"LISTEN {CHANNEL}")
+                    delay = 1
+                    while True:
+                        if select.select([conn], [], [], 30) == ([], [], []):
+                            continue
+                        conn.poll()
+                        while conn.notifies:
+                            self.deliver(json.loads(conn.notifies.pop(0).payload))
+                finally:
+                    raw.close()
+            except Exception:
+                self.app.logger.exception("Live updates: LISTEN connection lost, retrying in %ss", delay)
+                self.resync_all()  # events sent while we were away are gone
+                time.sleep(delay)
+                delay = min(delay * 2, 30)
+
+
+# ---------------- PUBLISHING -----------------
+def appointment_event(kind, appt, patient_name=None, previous_doctor_id=None):
+    """kind: "created", "assigned" or "status"."""
+    return {
+        "id": uuid.uuid4().hex,
+        "type": kind,
+        "previous_doctor_id": previous_doctor_id,
+        "appointment": {
+            "id": appt.id,
+            "date": appt.date.isoformat(),
+            "time": appt.time.strftime("%H:%M") if appt.time else None,
+            "status": appt.status or "pending",
+            "message": appt.message,
+            "patient_name": appt.patient_full_name or patient_name,
+            "doctor_id": appt.doctor_id,
+        },
+    }
+
+
+def publish_appointment(kind, appt, patient_name=None, previous_doctor_id=None):
+    """Push a delta to open dashboards; call after the commit that made the change."""
+    broker = current_app.extensions.get("live")
+    if broker is None:
+        return None
+    event = appointment_event(kind, appt, patient_name, previous_doctor_id)
+    try:
+        broker.publish(event)
+    except Exception:
+        # The change is committed; dashboards catch up on their next reload
+        current_app.logger.exception("Live updates: could not publish %s", kind)
+    return event
+
+
+def publish_resync():
+    """Tell every open dashboard to reload once, e.g. after a bulk change touching many rows."""
+    broker = current_app.extensions.get("live")
+    if broker is None:
+        return
+    try:
+        broker.publish(dict(RESYNC, id=uuid.uuid4().hex))
+    except Exception:
+        current_app.logger.exception("Live updates: could not publish resync")
+
+
+# ---------------- STREAMING -----------------
+def doctor_filter(doctor_id):
+    """What a doctor's dashboard shows: their appointments and the unassigned ones."""
+    def accept(event):
+        if event["type"] == "resync":
+            return True
+        if event["type"] == "assigned" and event["previous_doctor_id"] in (doctor_id, None):
+            return True  # leaves the unassigned list (or this doctor's)
+        return event["appointment"]["doctor_id"] in (doctor_id, None)
+    return accept
+
+
+def sse(event, name="appointment"):
+    return f"id: {event['id']}\nevent: {name}\ndata: {json.dumps(event)}\n\n"
+
+
+def stream(broker, sub, heartbeat, lifetime):
+    """SSE lines for `sub`; ends after `lifetime` seconds so a worker thread isn't held
+    forever (EventSource reconnects with Last-Event-ID and gets what it missed)."""
+    deadline = time.monotonic() + lifetime
+    try:
+        yield "retry: 3000\n: connected\n\n"
+        while time.monotonic() < deadline:
+            event = sub.get(timeout=min(heartbeat, max(deadline - time.monotonic(), 0.1)))
+            if event is None:
+                yield ": keep-alive\n\n"  # also how a closed connection gets noticed
+            elif event["type"] == "resync":
+                yield "event: resync\ndata: {}\n\n"
+                return
+            else:
+                LIVE_EVENTS.inc("sent")
+                yield sse(event)
+    finally:
+        broker.unsubscribe(sub)
+
+
+def _request_threads(config):
+    """Threads this process serves requests on."""
+    return config["ASGI_WSGI_THREADS"] if config.get("SERVED_BY_ASGI") else config.get("GUNICORN_THREADS", 1)
+
+
+def init_live(app):
+    """Streams pin a request thread each, so they need a server with threads to spare: asgi.py
+    or gthread workers (GUNICORN_THREADS > 1). A sync worker would be held for the whole stream
+    and killed by gunicorn's timeout."""
+    config = app.config
+    threads = _request_threads(config)
+    workers = config.get("WEB_CONCURRENCY", 1)
+    backend = config.get("LIVE_UPDATES_BACKEND")
+    if backend is None:
+        backend = "local" if threads > 1 and workers == 1 else "off"
+    if backend == "off":
+        return None
+
+    if threads < 2:
+        raise ValueError(f"LIVE_UPDATES_BACKEND={backend} needs GUNICORN_THREADS >= 2 or asgi.py: "
+                         "each open stream holds a request thread")
+    # Always leave a thread for pages; LIVE_MAX_STREAMS can only lower the cap
+    max_streams = threads - 1
+    if config.get("LIVE_MAX_STREAMS"):
+        max_streams = min(max_streams, config["LIVE_MAX_STREAMS"])
+    options = {
+        "buffer_size": config.get("LIVE_BUFFER_SIZE", 100),
+        "replay_size": config.get("LIVE_REPLAY_SIZE", 500),
+        "max_streams": max_streams,
+    }
+    if backend == "local":
+        if workers > 1:
+            raise ValueError("LIVE_UPDATES_BACKEND=local only reaches streams in its own process; "
+                             "with WEB_CONCURRENCY > 1 use postgres (or off)")
+        broker = LocalBroker(app, **options)
+    elif backend == "postgres":
+        url = config.get("LIVE_DATABASE_URL") or config["SQLALCHEMY_DATABASE_URI"]
+        if not url.startswith("postgres"):
+            raise ValueError("LIVE_UPDATES_BACKEND=postgres needs a Postgres LIVE_DATABASE_URL")
+        broker = PostgresBroker(app, url, **options)
+    else:
+        raise ValueError(f"Unknown LIVE_UPDATES_BACKEND: {backend} (choose local, postgres or off)")
+    app.extensions["live"] = broker
+    return broker
@@ -1,12 +1,181 @@
-from app import app, db
+import click
+from flask import current_app
 from flask_migrate import Migrate
 from flask.cli import FlaskGroup
+from app import create_app, init_db
+from models import db
+
+# Flask-Migrate (and alembic) only load for the CLI, not in web workers
+migrate = Migrate()
+
+
+def create_cli_app():
+    # Commands never check a login or render a page, so skip the dummy hash and template warmups
+    app = create_app({"PASSWORD_HASH_WARMUP": False, "TEMPLATE_WARMUP": False})
+    migrate.init_app(app, db)
+    return app
 
-# Initialize Flask-Migrate
-migrate = Migrate(app, db)
 
 # Setup Flask CLI group
-cli = FlaskGroup(app)
+cli = FlaskGroup(create_app=create_cli_app)
+
+
+@cli.command("init-db")
+def init_db_command():
+    """Create any missing tables (local SQLite; use `db upgrade` on Postgres)."""
+    init_db(current_app)
+    click.echo("Tables created.")
+
+
+@cli.command("rebuild-counters")
+def rebuild_counters_command():
+    """Recompute the dashboard stat counters from scratch."""
+    from stats import rebuild_counters
+
+    stats = rebuild_counters()
+    for name, value in stats.items():
+        click.echo(f"{name}: {value}")
+
+
+@cli.command("build-assets")
+@click.option("--clean", is_flag=True, help="Delete earlier builds first (pages cached by browsers may still use them).")
+def build_assets_command(clean):
+    """Fingerprint and precompress static/ into static/dist/ (restart the app to pick it up)."""
+    from assets import brotli, build_assets
+
+    if brotli is None:
+        click.echo("brotli is not installed; building gzip copies only (pip install brotli).")
+    files = build_assets(current_app.static_folder, clean=clean)
+    for logical, entry in sorted(files.items()):
+        sizes = ", ".join(f"{enc} {size / 1024:.1f} KiB" for enc, size in entry["encodings"].items())
+        click.echo(f"{logical} -> {entry['path']} ({entry['size'] / 1024:.1f} KiB{', ' + sizes if sizes else ''})")
+
+
+@cli.command("build-templates")
+def build_templates_command():
+    """Compile every template into the Jinja bytecode cache (e.g. while building the image)."""
+    from jinja_cache import warm_templates
+
+    if current_app.jinja_env.bytecode_cache is None:
+        raise click.ClickException("JINJA_BYTECODE_CACHE is off; nothing to build.")
+    names, seconds = warm_templates(current_app)
+    where = current_app.config["JINJA_BYTECODE_CACHE"]
+    if where == "filesystem":
+        where = current_app.jinja_env.bytecode_cache.directory
+    click.echo(f"Compiled {len(names)} templates in {seconds * 1000:.0f} ms into {where}.")
+
+
+@cli.command("process-images")
+@click.option("--all", "reprocess_all", is_flag=True, help="Rebuild variants that are already ready.")
+def process_images_command(reprocess_all):
+    """Build resized WebP/JPEG variants for home page images."""
+    from images import process_content_image
+    from models import HomeContent
+
+    query = HomeContent.query.filter(HomeContent.image.isnot(None))
+    if not reprocess_all:
+        query = query.filter(db.or_(HomeContent.image_status.is_(None), HomeContent.image_status != "ready"))
+    for content in query.all():
+        process_content_image(current_app._get_current_object(), content.id, content.image)
+        click.echo(f"{content.image}: {db.session.get(HomeContent, content.id).image_status}")
+
+
+@cli.command("gc-uploads")
+@click.option("--min-age", default=3600, show_default=True, help="Keep files younger than this many seconds.")
+@click.option("--dry-run", is_flag=True, help="Only list what would be deleted.")
+def gc_uploads_command(min_age, dry_run):
+    """Delete uploaded images and variants that no home content references."""
+    from uploads import collect_garbage
+
+    removed = collect_garbage(min_age=min_age, dry_run=dry_run)
+    for name in removed:
+        click.echo(("would remove " if dry_run else "removed ") + name)
+    click.echo(f"{len(removed)} file(s)")
+
+
+@cli.command("push-uploads")
+def push_uploads_command():
+    """Copy files from the local UPLOAD_FOLDER into the configured storage backend."""
+    from storage import LocalStorage, get_storage
+
+    local, storage = LocalStorage(current_app.config["UPLOAD_FOLDER"]), get_storage()
+    if isinstance(storage, LocalStorage):
+        click.echo("STORAGE_BACKEND is local; nothing to do.")
+        return
+    for key, _ in local.list():
+        if key.startswith(".") or storage.exists(key):
+            continue
+        with local.open(key) as f:
+            storage.save(key, f)
+        click.echo(f"uploaded {key}")
+
+
+@cli.command("worker")
+@click.option("--batch-size", default=50, show_default=True, help="Jobs claimed and committed together.")
+@click.option("--poll-interval", default=2.0, show_default=True, help="Seconds to sleep when idle.")
+@click.option("--once", is_flag=True, help="Drain the due jobs and exit.")
+def worker_command(batch_size, poll_interval, once):
+    """Run the background job worker."""
+    import notifications  # noqa: F401 - registers the job handlers
+    from jobs import work
+
+    work(batch_size=batch_size, poll_interval=poll_interval, once=once)
+
+
+def _echo_result(result):
+    click.echo(f"read {result['read']}, inserted {result['inserted']}, "
+               f"updated {result['updated']}, skipped {result['skipped']}")
+    for error in result["errors"]:
+        click.echo(f"  {error}", err=True)
+
+
+@cli.command("import-users")
+@click.argument("source", type=click.File("r", encoding="utf-8"))
+@click.option("--format", "fmt", type=click.Choice(["csv", "jsonl"]), help="Default: from the file extension.")
+@click.option("--batch-size", default=5000, show_default=True, help="Rows per transaction.")
+@click.option("--on-duplicate", type=click.Choice(["update", "skip"]), default="update", show_default=True,
+              help="What to do with emails that already exist.")
+@click.option("--workers", type=int, help="Password hashing processes (default: one per CPU).")
+def import_users_command(source, fmt, batch_size, on_duplicate, workers):
+    """Bulk load users from CSV/JSONL (name, email, role, password or password_hash)."""
+    from bulk import detect_format, import_users
+
+    _echo_result(import_users(source, detect_format(source.name, fmt), batch_size, on_duplicate, workers))
+
+
+@cli.command("import-appointments")
+@click.argument("source", type=click.File("r", encoding="utf-8"))
+@click.option("--format", "fmt", type=click.Choice(["csv", "jsonl"]), help="Default: from the file extension.")
+@click.option("--batch-size", default=5000, show_default=True, help="Rows per transaction.")
+def import_appointments_command(source, fmt, batch_size):
+    """Bulk load appointments from CSV/JSONL (patient_email, doctor_email, date, time, status, ...)."""
+    from bulk import detect_format, import_appointments
+
+    _echo_result(import_appointments(source, detect_format(source.name, fmt), batch_size))
+
+
+@cli.command("export-users")
+@click.argument("target", type=click.File("w", encoding="utf-8"))
+@click.option("--format", "fmt", type=click.Choice(["csv", "jsonl"]), help="Default: from the file extension.")
+@click.option("--include-password-hashes", is_flag=True, help="Add a password_hash column (for migrations).")
+def export_users_command(target, fmt, include_password_hashes):
+    """Stream every user to CSV/JSONL ('-' for stdout)."""
+    from bulk import detect_format, export_users
+
+    count = export_users(target, detect_format(target.name, fmt), include_password_hashes)
+    click.echo(f"{count} user(s)", err=True)
+
+
+@cli.command("export-appointments")
+@click.argument("target", type=click.File("w", encoding="utf-8"))
+@click.option("--format", "fmt", type=click.Choice(["csv", "jsonl"]), help="Default: from the file extension.")
+def export_appointments_command(target, fmt):
+    """Stream every appointment to CSV/JSONL ('-' for stdout)."""
+    from bulk import detect_format, export_appointments
+
+    count = export_appointments(target, detect_format(target.name, fmt))
+    click.echo(f"{count} appointment(s)", err=True)
+
 
 if __name__ == "__main__":
     cli()
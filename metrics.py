@@ -0,0 +1,170 @@
+# metrics.py
+import bisect
+import os
+import threading
+
+# Every metric registers itself here; render_prometheus() walks this list.
+REGISTRY = []
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+WAIT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+
+
+def _label_str(label_name, label):
+    if label_name is None or label is None:
+        return ""
+    escaped = str(label).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return f'{label_name}="{escaped}"'
+
+
+class Counter:
+    """Process-local counter, optionally split by one label."""
+
+    kind = "counter"
+
+    def __init__(self, name, help_text, label_name=None):
+        self.name = name
+        self.help = help_text
+        self.label_name = label_name
+        self._values = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def inc(self, label=None, by=1):
+        with self._lock:
+            self._values[label] = self._values.get(label, 0) + by
+
+    def value(self, label=None):
+        return self._values.get(label, 0)
+
+    def values(self):
+        with self._lock:
+            return dict(self._values)
+
+    def samples(self):
+        for label, value in sorted(self.values().items(), key=lambda kv: str(kv[0])):
+            labels = _label_str(self.label_name, label)
+            yield f"{self.name}{{{labels}}}" if labels else self.name, value
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value, label=None):
+        with self._lock:
+            self._values[label] = value
+
+
+class Histogram:
+    """Process-local histogram with cumulative buckets, optionally split by one label."""
+
+    kind = "histogram"
+
+    def __init__(self, name, help_text, label_name=None, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.label_name = label_name
+        self.buckets = tuple(buckets)
+        self._series = {}  # label -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def observe(self, value, label=None):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label)
+            if series is None:
+                series = self._series[label] = [0] * (len(self.buckets) + 2)
+            series[i] += 1
+            series[-1] += value
+
+    def snapshot(self):
+        """{label: {"count", "sum", "buckets": [(upper_bound, count_in_bucket), ...]}}"""
+        with self._lock:
+            series = {label: list(values) for label, values in self._series.items()}
+        result = {}
+        for label, values in series.items():
+            bounds = list(self.buckets) + [float("inf")]
+            result[label] = {
+                "count": sum(values[:-1]),
+                "sum": values[-1],
+                "buckets": list(zip(bounds, values[:-1])),
+            }
+        return result
+
+    def quantile(self, q, label=None):
+        """Estimate a quantile by interpolating inside the bucket it falls in."""
+        data = self.snapshot().get(label)
+        if not data or not data["count"]:
+            return None
+        rank = q * data["count"]
+        seen, lower = 0, 0.0
+        for upper, count in data["buckets"]:
+            if seen + count >= rank and count:
+                if upper == float("inf"):
+                    return lower
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+            lower = upper if upper != float("inf") else lower
+        return lower
+
+    def samples(self):
+        for label, data in sorted(self.snapshot().items(), key=lambda kv: str(kv[0])):
+            base = _label_str(self.label_name, label)
+            cumulative = 0
+            for upper, count in data["buckets"]:
+                cumulative += count
+                le = "+Inf" if upper == float("inf") else repr(upper)
+                labels = f'{base},le="{le}"' if base else f'le="{le}"'
+                yield f"{self.name}_bucket{{{labels}}}", cumulative
+            suffix = f"{{{base}}}" if base else ""
+            yield f"{self.name}_sum{suffix}", data["sum"]
+            yield f"{self.name}_count{suffix}", data["count"]
+
+
+def _with_worker(sample, worker):
+    name, _, labels = sample.partition("{")
+    return f"{name}{{{worker},{labels}" if labels else f"{name}{{{worker}}}"
+
+
+def render_prometheus():
+    """All registered metrics in the Prometheus text exposition format.
+
+    Every gunicorn worker keeps its own registry and a scrape reaches whichever worker
+    answers, so each series carries a `worker` label (the pid). Prometheus then sees one
+    series per worker instead of a counter jumping between workers' values; sum them with
+    `sum without (worker)`.
+    """
+    worker = _label_str("worker", os.getpid())
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for name, value in metric.samples():
+            lines.append(f"{_with_worker(name, worker)} {value}")
+    return "\n".join(lines) + "\n"
+
+
+# ----------------------
+# Application metrics
+# ----------------------
+USER_CACHE = Counter("user_cache_requests_total", "Flask-Login user lookups by result (hit/miss).", "result")
+LIST_CACHE = Counter("list_cache_requests_total", "Cached list page lookups by result (hit/miss).", "result")
+LIVE_STREAMS = Gauge("live_streams_open", "Dashboard event streams open in this process.")
+LIVE_EVENTS = Counter("live_events_total", "Live update events by outcome (published/sent/overflow).", "outcome")
+
+REQUEST_LATENCY = Histogram("http_request_duration_seconds", "Request latency by endpoint.", "endpoint")
+REQUEST_SQL_COUNT = Histogram("http_request_sql_statements", "SQL statements per request by endpoint.",
+                              "endpoint", buckets=COUNT_BUCKETS)
+REQUEST_SQL_TIME = Histogram("http_request_sql_seconds", "Time spent in SQL per request by endpoint.", "endpoint")
+TEMPLATE_RENDER = Histogram("template_render_seconds", "Jinja render time by template.", "template")
+POOL_CHECKOUT_WAIT = Histogram("db_pool_checkout_wait_seconds", "Time waiting for a pooled DB connection.",
+                               buckets=WAIT_BUCKETS)
+POOL_CHECKED_OUT = Gauge("db_pool_checked_out", "DB connections currently checked out of the pool.")
+SLOW_REQUESTS = Counter("http_slow_requests_total", "Requests slower than SLOW_REQUEST_MS by endpoint.", "endpoint")
+LOGIN_ATTEMPTS = Counter("login_attempts_total", "Login attempts by result (success/failure/limited).", "result")
+LOGIN_RATE_LIMITED = Counter("login_rate_limited_total", "Login attempts rejected before hashing, by limit.", "limit")
+REPLICA_ROUTING = Counter("db_replica_routing_total",
+                          "Replica-routed requests by where their reads went (replica/primary_fallback).", "target")
+REPLICA_HEALTHY = Gauge("db_replica_healthy", "1 if the read replica passed its last health check.", "replica")
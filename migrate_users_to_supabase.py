@@ -0,0 +1,48 @@
+# migrate_users_to_supabase.py
+"""Copy users and appointments from the local SQLite database into Supabase.
+
+    SUPABASE_DB_URL=postgresql://... python migrate_users_to_supabase.py
+
+Runs `manage.py export-*` against SQLite into a temporary JSONL file, then
+`manage.py import-*` against Supabase; both stream, so table size doesn't matter.
+Password hashes are copied as they are; emails that already exist in Supabase are updated.
+"""
+import os
+import subprocess
+import sys
+import tempfile
+
+basedir = os.path.abspath(os.path.dirname(__file__))
+
+
+def _manage(args, **env):
+    env = dict(os.environ, **env)
+    env.pop("DATABASE_URL", None)
+    subprocess.run([sys.executable, os.path.join(basedir, "manage.py")] + args, env=env, cwd=basedir, check=True)
+
+
+def copy(export_args, import_args, supabase_url):
+    fd, path = tempfile.mkstemp(suffix=".jsonl")
+    os.close(fd)
+    try:
+        _manage(export_args + [path], USE_SUPABASE="False")
+        _manage(import_args + [path], USE_SUPABASE="True", SUPABASE_DB_URL=supabase_url)
+    finally:
+        os.remove(path)
+
+
+def main():
+    supabase_url = os.getenv("SUPABASE_DB_URL")
+    if not supabase_url:
+        sys.exit("❌ Set SUPABASE_DB_URL to the target database")
+
+    try:
+        copy(["export-users", "--include-password-hashes"], ["import-users"], supabase_url)
+        copy(["export-appointments"], ["import-appointments"], supabase_url)
+    except subprocess.CalledProcessError as e:
+        sys.exit(f"❌ Migration failed: {' '.join(e.cmd[2:])}")
+    print("✅ Migration finished")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+"""Add composite indexes for appointment listings
+
+Revision ID: 3c1f2a9d8e47
+Revises: b5ef21328788
+Create Date: 2026-10-18 09:12:40.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c1f2a9d8e47'
+down_revision = 'b5ef21328788'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('appointment', schema=None) as batch_op:
+        batch_op.create_index('ix_appointment_doctor_id_date', ['doctor_id', 'date'], unique=False)
+        batch_op.create_index('ix_appointment_patient_id_date', ['patient_id', 'date'], unique=False)
+        batch_op.create_index('ix_appointment_status_date', ['status', 'date'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('appointment', schema=None) as batch_op:
+        batch_op.drop_index('ix_appointment_status_date')
+        batch_op.drop_index('ix_appointment_patient_id_date')
+        batch_op.drop_index('ix_appointment_doctor_id_date')
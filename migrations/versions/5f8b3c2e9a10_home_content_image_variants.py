@@ -0,0 +1,28 @@
+"""Store resized image variants on home_content
+
+Revision ID: 5f8b3c2e9a10
+Revises: d27e5b9c41f3
+Create Date: 2026-10-18 11:20:05.671342
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5f8b3c2e9a10'
+down_revision = 'd27e5b9c41f3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('home_content', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('image_variants', sa.Text(), nullable=True))
+        batch_op.add_column(sa.Column('image_status', sa.String(length=20), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('home_content', schema=None) as batch_op:
+        batch_op.drop_column('image_status')
+        batch_op.drop_column('image_variants')
@@ -0,0 +1,28 @@
+"""Add stat_counter table for dashboard counters
+
+Revision ID: 8a4d6e0b2c15
+Revises: 3c1f2a9d8e47
+Create Date: 2026-10-18 10:03:17.552961
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8a4d6e0b2c15'
+down_revision = '3c1f2a9d8e47'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('stat_counter',
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('value', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade():
+    op.drop_table('stat_counter')
@@ -0,0 +1,32 @@
+"""Unique active booking per doctor slot
+
+Revision ID: d27e5b9c41f3
+Revises: 8a4d6e0b2c15
+Create Date: 2026-10-18 10:41:52.904117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd27e5b9c41f3'
+down_revision = '8a4d6e0b2c15'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Fails if the table already holds double bookings; resolve those first.
+    with op.batch_alter_table('appointment', schema=None) as batch_op:
+        batch_op.create_index(
+            'uq_appointment_doctor_slot', ['doctor_id', 'date', 'time'],
+            unique=True,
+            sqlite_where=sa.text("status <> 'rejected'"),
+            postgresql_where=sa.text("status <> 'rejected'"),
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('appointment', schema=None) as batch_op:
+        batch_op.drop_index('uq_appointment_doctor_slot')
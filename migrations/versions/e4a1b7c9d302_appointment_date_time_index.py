@@ -0,0 +1,30 @@
+"""Index appointments by date, time and id for the unfiltered listing
+
+Revision ID: e4a1b7c9d302
+Revises: a93c7f1d6b28
+Create Date: 2026-10-18 16:20:11.503918
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4a1b7c9d302'
+down_revision = 'a93c7f1d6b28'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('appointment', schema=None) as batch_op:
+        batch_op.create_index(
+            'ix_appointment_date_time_id', ['date', 'time', 'id'],
+            unique=False,
+            postgresql_ops={'time': 'NULLS FIRST'},
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('appointment', schema=None) as batch_op:
+        batch_op.drop_index('ix_appointment_date_time_id')
@@ -2,8 +2,11 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 from datetime import datetime
+import json
 
-db = SQLAlchemy()
+from replicas import RoutingSession
+
+db = SQLAlchemy(session_options={"class_": RoutingSession})  # see replicas.py
 
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -32,6 +35,25 @@ class Appointment(db.Model):
     patient = db.relationship('User', foreign_keys=[patient_id])
     doctor = db.relationship('User', foreign_keys=[doctor_id])
 
+    # Composite indexes backing the keyset-paginated listings (see pagination.py)
+    __table_args__ = (
+        db.Index('ix_appointment_doctor_id_date', 'doctor_id', 'date'),
+        db.Index('ix_appointment_patient_id_date', 'patient_id', 'date'),
+        db.Index('ix_appointment_status_date', 'status', 'date'),
+        # The unfiltered listing's order (pagination.APPOINTMENT_ORDER). SQLite puts NULLs
+        # first by itself; Postgres needs it spelled out for the index to match the ORDER BY.
+        db.Index('ix_appointment_date_time_id', 'date', 'time', 'id',
+                 postgresql_ops={'time': 'NULLS FIRST'}),
+        # One active booking per doctor and slot; enforced by the database so concurrent
+        # bookings can't both succeed (see scheduling.py)
+        db.Index(
+            'uq_appointment_doctor_slot', 'doctor_id', 'date', 'time',
+            unique=True,
+            sqlite_where=db.text("status <> 'rejected'"),
+            postgresql_where=db.text("status <> 'rejected'"),
+        ),
+    )
+
 
 
 class SiteSettings(db.Model):
@@ -45,5 +67,41 @@ class HomeContent(db.Model):
     title = db.Column(db.String(200))
     description = db.Column(db.Text)
     image = db.Column(db.String(200))  # store filename of uploaded image
+    image_variants = db.Column(db.Text)  # JSON set of resized WebP/JPEG copies (see images.py)
+    image_status = db.Column(db.String(20))  # None (original only), "pending", "ready" or "failed"
     order = db.Column(db.Integer, default=0)  # for sorting cards
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
\ No newline at end of file
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    @property
+    def variants(self):
+        if self.image_status != "ready" or not self.image_variants:
+            return None
+        return json.loads(self.image_variants)
+
+class StatCounter(db.Model):
+    # Materialized dashboard counters (see stats.py); rebuilt by `manage.py rebuild-counters`
+    name = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.BigInteger, nullable=False, default=0)
+
+
+class Job(db.Model):
+    # Background job queue stored in the app database (see jobs.py)
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    payload = db.Column(db.Text, nullable=False, default="{}")  # JSON
+    status = db.Column(db.String(20), nullable=False, default="queued")  # queued, running, done, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=5)
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_by = db.Column(db.String(64))
+    locked_at = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_job_status_run_at', 'status', 'run_at'),
+    )
+
+    @property
+    def data(self):
+        return json.loads(self.payload or "{}")
@@ -0,0 +1,105 @@
+# notifications.py
+import smtplib
+from datetime import datetime, time, timedelta
+from email.message import EmailMessage
+
+from flask import current_app
+from sqlalchemy.orm import joinedload
+
+from jobs import enqueue, job
+from models import Appointment
+
+
+# ---------------- SENDING -----------------
+def send_emails(messages):
+    """Send (to, subject, body) messages over one SMTP connection, or log them without SMTP_HOST."""
+    config = current_app.config
+    if not config.get("SMTP_HOST"):
+        for to, subject, body in messages:
+            current_app.logger.info("Notification to %s: %s\n%s", to, subject, body)
+        return
+
+    with smtplib.SMTP(config["SMTP_HOST"], config.get("SMTP_PORT", 587), timeout=30) as smtp:
+        if config.get("SMTP_USE_TLS", True):
+            smtp.starttls()
+        if config.get("SMTP_USERNAME"):
+            smtp.login(config["SMTP_USERNAME"], config.get("SMTP_PASSWORD", ""))
+        for to, subject, body in messages:
+            msg = EmailMessage()
+            msg["From"] = config.get("MAIL_FROM", "no-reply@localhost")
+            msg["To"] = to
+            msg["Subject"] = subject
+            msg.set_content(body)
+            smtp.send_message(msg)
+
+
+def _load(payloads):
+    ids = {p["appointment_id"] for p in payloads}
+    appts = Appointment.query.options(joinedload(Appointment.patient)).filter(Appointment.id.in_(ids)).all()
+    return {appt.id: appt for appt in appts}
+
+
+def _describe(appt):
+    when = appt.date.strftime("%A %d %B %Y")
+    if appt.time:
+        when += " at " + appt.time.strftime("%H:%M")
+    return when
+
+
+# ---------------- JOBS -----------------
+@job("appointment.status_changed", batch=True)
+def appointment_status_changed(payloads):
+    appts = _load(payloads)
+    messages = []
+    for payload in payloads:
+        appt = appts.get(payload["appointment_id"])
+        if appt is None or appt.status != payload["status"]:
+            continue  # deleted or changed again since; the newer job reports that
+        messages.append((
+            appt.patient.email,
+            f"Your appointment was {appt.status}",
+            f"Hello {appt.patient_full_name or appt.patient.name},\n\n"
+            f"Your appointment on {_describe(appt)} has been {appt.status}.",
+        ))
+    send_emails(messages)
+
+
+@job("appointment.reminder", batch=True)
+def appointment_reminder(payloads):
+    appts = _load(payloads)
+    messages = []
+    for payload in payloads:
+        appt = appts.get(payload["appointment_id"])
+        # Skip reminders for appointments that were rejected or moved after scheduling
+        if appt is None or appt.status != "approved" or appt.date.isoformat() != payload["date"]:
+            continue
+        messages.append((
+            appt.patient.email,
+            "Appointment reminder",
+            f"Hello {appt.patient_full_name or appt.patient.name},\n\n"
+            f"This is a reminder of your appointment on {_describe(appt)}.",
+        ))
+    send_emails(messages)
+
+
+# ---------------- HOOKS FOR ROUTES -----------------
+def schedule_reminder(appt, session=None):
+    """Queue a reminder for the day before the appointment (REMINDER_HOUR, UTC)."""
+    hour = current_app.config.get("REMINDER_HOUR", 9)
+    run_at = datetime.combine(appt.date - timedelta(days=1), time(hour))
+    now = datetime.utcnow()
+    if datetime.combine(appt.date, appt.time or time.min) <= now:
+        return None
+    return enqueue(
+        "appointment.reminder",
+        {"appointment_id": appt.id, "date": appt.date.isoformat()},
+        run_at=max(run_at, now),
+        session=session,
+    )
+
+
+def notify_status_change(appt, session=None):
+    """Queue the status e-mail (and the reminder when approved); commit with the status change."""
+    enqueue("appointment.status_changed", {"appointment_id": appt.id, "status": appt.status}, session=session)
+    if appt.status == "approved":
+        schedule_reminder(appt, session)
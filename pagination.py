@@ -0,0 +1,124 @@
+# pagination.py
+import base64
+from datetime import datetime
+
+from sqlalchemy import and_, or_
+
+from models import Appointment
+
+DEFAULT_PER_PAGE = 50
+MAX_PER_PAGE = 200
+
+# Appointments without a time come first on their day. The listing order matches
+# ix_appointment_date_time_id column for column, so it is read off the index, not sorted.
+APPOINTMENT_ORDER = (Appointment.date, Appointment.time.asc().nulls_first(), Appointment.id)
+
+
+class KeysetPage:
+    def __init__(self, items, next_cursor):
+        self.items = items
+        self.next_cursor = next_cursor
+
+    @classmethod
+    def from_rows(cls, rows, per_page):
+        """`rows` fetched with limit per_page + 1; the extra row only says there is a next page."""
+        items = rows[:per_page]
+        return cls(items, encode_cursor(items[-1]) if len(rows) > per_page else None)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+# ---------------- CURSORS -----------------
+def encode_cursor(appt):
+    t = appt.time.strftime('%H:%M:%S') if appt.time else ""
+    raw = f"{appt.date.isoformat()}|{t}|{appt.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Return (date, time, id) for a cursor string (time None for an appointment without
+    one), or None if it is missing or malformed."""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        date_str, time_str, id_str = base64.urlsafe_b64decode(padded).decode().split("|")
+        return (
+            datetime.strptime(date_str, "%Y-%m-%d").date(),
+            datetime.strptime(time_str, "%H:%M:%S").time() if time_str else None,
+            int(id_str),
+        )
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+# ---------------- FILTERS -----------------
+def appointment_filters(args):
+    """Read status / doctor / date range filters from request.args, ignoring bad values."""
+    filters = {}
+
+    status = args.get("status")
+    if status in ("pending", "approved", "rejected"):
+        filters["status"] = status
+
+    doctor = args.get("doctor")
+    if doctor == "none":
+        filters["doctor_id"] = None
+    elif doctor and doctor.isdigit():
+        filters["doctor_id"] = int(doctor)
+
+    for key in ("date_from", "date_to"):
+        value = args.get(key)
+        if value:
+            try:
+                filters[key] = datetime.strptime(value, "%Y-%m-%d").date()
+            except ValueError:
+                pass
+    return filters
+
+
+def appointment_criteria(filters):
+    """The WHERE clauses for filters from appointment_filters()."""
+    criteria = []
+    if "status" in filters:
+        criteria.append(Appointment.status == filters["status"])
+    if "doctor_id" in filters:
+        criteria.append(Appointment.doctor_id == filters["doctor_id"])
+    if "date_from" in filters:
+        criteria.append(Appointment.date >= filters["date_from"])
+    if "date_to" in filters:
+        criteria.append(Appointment.date <= filters["date_to"])
+    return criteria
+
+
+def apply_appointment_filters(query, filters):
+    return query.filter(*appointment_criteria(filters))
+
+
+# ---------------- KEYSET PAGINATION -----------------
+def clamp_per_page(per_page):
+    return max(1, min(per_page, MAX_PER_PAGE))
+
+
+def keyset_page(query, cursor, per_page, filters=None):
+    """Filter, position after `cursor`, order and limit a Query or select() over Appointment."""
+    query = apply_appointment_filters(query, filters or {})
+
+    after = decode_cursor(cursor)
+    if after:
+        d, t, appt_id = after
+        if t is None:
+            same_day = or_(Appointment.time.isnot(None), and_(Appointment.time.is_(None), Appointment.id > appt_id))
+        else:
+            same_day = or_(Appointment.time > t, and_(Appointment.time == t, Appointment.id > appt_id))
+        query = query.filter(or_(Appointment.date > d, and_(Appointment.date == d, same_day)))
+    return query.order_by(*APPOINTMENT_ORDER).limit(per_page + 1)
+
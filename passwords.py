@@ -0,0 +1,209 @@
+# passwords.py
+import time
+
+from flask import current_app
+from werkzeug.security import generate_password_hash, check_password_hash
+
+try:
+    import argon2  # optional: pip install argon2-cffi
+except ImportError:
+    argon2 = None
+
+ALGORITHMS = ("scrypt", "pbkdf2", "argon2")
+
+# Calibration never goes below these (OWASP-recommended minimums) or above the ceilings
+MIN_COST = {"scrypt": 2 ** 14, "pbkdf2": 600_000, "argon2": 2}
+MAX_COST = {"scrypt": 2 ** 17, "pbkdf2": 10_000_000, "argon2": 20}
+DEFAULT_COST = {"scrypt": 2 ** 15, "pbkdf2": 1_000_000, "argon2": 3}
+
+SCRYPT_R, SCRYPT_P = 8, 1
+ARGON2_MEMORY_KIB, ARGON2_PARALLELISM = 19 * 1024, 1
+
+
+class PasswordPolicy:
+    """How new passwords are hashed, and whether an existing hash is still good enough.
+
+    `cost` is the algorithm's main work factor: N for scrypt (a power of two), the iteration
+    count for pbkdf2 (sha256), time_cost for argon2id. Hashes made under any algorithm are
+    still verified, so changing the policy only affects new hashes and rehash-on-login.
+    """
+
+    def __init__(self, algorithm="scrypt", cost=None):
+        if algorithm not in ALGORITHMS:
+            raise ValueError(f"Unknown password hash algorithm: {algorithm}")
+        if algorithm == "argon2" and argon2 is None:
+            raise ValueError("argon2 needs the argon2-cffi package")
+        cost = int(cost or DEFAULT_COST[algorithm])
+        if algorithm == "scrypt" and cost & (cost - 1):
+            raise ValueError(f"scrypt cost must be a power of two, got {cost}")
+        self.algorithm = algorithm
+        self.cost = cost
+        self._dummy_hash = None
+        if algorithm == "argon2":
+            self._argon2 = argon2.PasswordHasher(
+                time_cost=cost, memory_cost=ARGON2_MEMORY_KIB, parallelism=ARGON2_PARALLELISM
+            )
+
+    def __repr__(self):
+        return f"PasswordPolicy({self.algorithm!r}, cost={self.cost})"
+
+    @property
+    def method(self):
+        """Werkzeug method string for scrypt/pbkdf2."""
+        if self.algorithm == "scrypt":
+            return f"scrypt:{self.cost}:{SCRYPT_R}:{SCRYPT_P}"
+        return f"pbkdf2:sha256:{self.cost}"
+
+    def hash(self, password):
+        if self.algorithm == "argon2":
+            return self._argon2.hash(password)
+        return generate_password_hash(password, method=self.method)
+
+    def verify(self, stored, password):
+        if not stored:
+            return False
+        if stored.startswith("$argon2"):
+            if argon2 is None:
+                raise RuntimeError("Found an argon2 password hash but argon2-cffi is not installed")
+            try:
+                return argon2.PasswordHasher().verify(stored, password)
+            except (argon2.exceptions.VerificationError, argon2.exceptions.InvalidHashError):
+                return False
+        try:
+            return check_password_hash(stored, password)
+        except ValueError:  # unknown or malformed method
+            return False
+
+    def warm_up(self):
+        """Build the dummy hash now, or the first unknown-email login is slower."""
+        if self._dummy_hash is None:
+            self._dummy_hash = self.hash("dummy-password-for-timing")
+
+    def dummy_verify(self, password):
+        """Spend the same time as a real check, for logins with an unknown email."""
+        self.warm_up()
+        self.verify(self._dummy_hash, password)
+        return False
+
+    def needs_rehash(self, stored):
+        """True when `stored` uses another algorithm or a lower cost than this policy.
+
+        A *higher* stored cost is left alone, so workers that calibrated slightly differently
+        don't keep rehashing each other's passwords.
+        """
+        algorithm, cost = parse_hash(stored)
+        if algorithm != self.algorithm:
+            return True
+        if algorithm == "argon2":
+            return cost < self.cost or int(_argon2_params(stored).get("m", 0)) < ARGON2_MEMORY_KIB
+        if algorithm == "pbkdf2" and not stored.startswith("pbkdf2:sha256:"):
+            return True
+        return cost < self.cost
+
+
+def parse_hash(stored):
+    """(algorithm, cost) of a stored hash; (None, 0) when it can't be read."""
+    if not stored:
+        return None, 0
+    if stored.startswith("$argon2"):
+        return "argon2", int(_argon2_params(stored).get("t", 0))
+    method = stored.split("$", 1)[0].split(":")
+    try:
+        if method[0] == "scrypt":
+            return "scrypt", int(method[1]) if len(method) > 1 else 2 ** 15
+        if method[0] == "pbkdf2":
+            return "pbkdf2", int(method[2]) if len(method) > 2 else 600_000
+    except ValueError:
+        pass
+    return method[0], 0
+
+
+def _argon2_params(stored):
+    # $argon2id$v=19$m=19456,t=3,p=1$salt$hash
+    parts = stored.split("$")
+    if len(parts) < 4:
+        return {}
+    return dict(p.split("=", 1) for p in parts[3].split(",") if "=" in p)
+
+
+# ---------------- CALIBRATION -----------------
+def time_hash(policy, rounds=3):
+    """Best-of-`rounds` seconds for one hash under `policy`."""
+    best = None
+    for _ in range(rounds):
+        started = time.perf_counter()
+        policy.hash("calibration-password")
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def calibrate(algorithm, target_ms):
+    """The highest cost whose hash still takes at most `target_ms` on this machine.
+
+    Never returns less than MIN_COST: on slow hardware logins get slower rather than weaker.
+    """
+    target = target_ms / 1000
+    if algorithm == "pbkdf2":
+        # Cost is linear in the iteration count: measure once and scale
+        probe = 100_000
+        per_iteration = time_hash(PasswordPolicy("pbkdf2", probe)) / probe
+        cost = int(target / per_iteration) // 10_000 * 10_000
+        return max(MIN_COST["pbkdf2"], min(MAX_COST["pbkdf2"], cost))
+
+    cost = MIN_COST[algorithm]
+    step = (lambda c: c * 2) if algorithm == "scrypt" else (lambda c: c + 1)
+    while step(cost) <= MAX_COST[algorithm] and time_hash(PasswordPolicy(algorithm, step(cost))) <= target:
+        cost = step(cost)
+    return cost
+
+
+# ----------------------
+# Setup
+# ----------------------
+def init_passwords(app):
+    """Build the app's PasswordPolicy from PASSWORD_HASH_* config.
+
+    An explicit PASSWORD_HASH_COST wins. Otherwise, with PASSWORD_HASH_TARGET_MS set, the
+    cost is calibrated once at startup (each gunicorn worker unless the app is preloaded).
+    """
+    algorithm = app.config.get("PASSWORD_HASH_ALGORITHM", "scrypt")
+    if algorithm == "argon2" and argon2 is None:
+        app.logger.warning("PASSWORD_HASH_ALGORITHM=argon2 but argon2-cffi is not installed; using scrypt")
+        algorithm = "scrypt"
+
+    cost = app.config.get("PASSWORD_HASH_COST")
+    target_ms = app.config.get("PASSWORD_HASH_TARGET_MS")
+    if not cost and target_ms:
+        cost = calibrate(algorithm, target_ms)
+        app.logger.info("Calibrated %s password hashing to cost %s for %s ms", algorithm, cost, target_ms)
+
+    policy = PasswordPolicy(algorithm, cost)
+    if app.config.get("PASSWORD_HASH_WARMUP", True):
+        policy.warm_up()  # once in the gunicorn master when the app is preloaded
+    app.extensions["password_policy"] = policy
+    return policy
+
+
+def get_password_policy():
+    return current_app.extensions["password_policy"]
+
+
+def hash_password(password):
+    return get_password_policy().hash(password)
+
+
+def verify_password(user, password):
+    """Check a login; on success, upgrade an outdated hash in place (the caller commits).
+
+    `user` may be None (unknown email): a dummy hash is checked so the response takes as
+    long as a wrong password and doesn't reveal which emails have accounts.
+    """
+    policy = get_password_policy()
+    if user is None:
+        return policy.dummy_verify(password)
+    if not policy.verify(user.password, password):
+        return False
+    if policy.needs_rehash(user.password):
+        user.password = policy.hash(password)
+    return True
@@ -0,0 +1,41 @@
+# query_guard.py
+from flask import g, has_request_context, current_app
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class QueryLimitExceeded(RuntimeError):
+    pass
+
+
+def query_count():
+    """Number of SQL statements executed so far in the current request."""
+    return g.get("query_count", 0)
+
+
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    if not has_request_context():
+        return
+    g.query_count = g.get("query_count", 0) + 1
+
+    limit = current_app.config.get("QUERY_COUNT_LIMIT") or 0
+    if limit and g.query_count > limit:
+        raise QueryLimitExceeded(
+            f"Request exceeded QUERY_COUNT_LIMIT={limit} SQL statements; last one was: {statement}"
+        )
+
+
+def init_query_guard(app):
+    """Count SQL statements per request and fail requests that go over QUERY_COUNT_LIMIT.
+
+    Off unless QUERY_COUNT_LIMIT is set (e.g. in tests or debug mode). Catches N+1 regressions
+    like a template touching a lazy relationship once per row.
+    """
+    if not event.contains(Engine, "before_cursor_execute", _count_query):
+        event.listen(Engine, "before_cursor_execute", _count_query)
+
+    @app.after_request
+    def add_query_count_header(response):
+        if app.config.get("QUERY_COUNT_LIMIT"):
+            response.headers["X-Query-Count"] = str(query_count())
+        return response
@@ -0,0 +1,173 @@
+# ratelimit.py
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+
+from flask import current_app, request
+
+from metrics import LOGIN_ATTEMPTS, LOGIN_RATE_LIMITED
+
+
+# ----------------------
+# Backends
+# ----------------------
+class MemoryWindowStore:
+    """Per-process sliding-window log. Every gunicorn worker counts on its own.
+
+    Keys are kept in least-recently-hit order, so credential stuffing across many emails
+    can't grow it past max_keys: the stalest key is dropped to make room.
+    """
+
+    def __init__(self, max_keys=100_000):
+        self.max_keys = max_keys
+        self._hits = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _trim(self, key, now, window):
+        hits = self._hits.get(key)
+        if hits is None:
+            return None
+        while hits and hits[0] <= now - window:
+            hits.popleft()
+        if not hits:
+            del self._hits[key]
+            return None
+        return hits
+
+    def add(self, key, now, window):
+        """Record a hit; returns (hits in window, oldest hit time)."""
+        with self._lock:
+            hits = self._trim(key, now, window)
+            if hits is None:
+                while len(self._hits) >= self.max_keys:
+                    self._hits.popitem(last=False)
+                hits = self._hits[key] = deque()
+            else:
+                self._hits.move_to_end(key)
+            hits.append(now)
+            return len(hits), hits[0]
+
+    def count(self, key, now, window):
+        with self._lock:
+            hits = self._trim(key, now, window)
+            return (len(hits), hits[0]) if hits else (0, None)
+
+    def reset(self, key):
+        with self._lock:
+            self._hits.pop(key, None)
+
+
+class RedisWindowStore:
+    """Sliding-window log in Redis sorted sets, shared by every worker and server."""
+
+    def __init__(self, url, key_prefix="dental:ratelimit:"):
+        import redis  # only needed when RATELIMIT_BACKEND=redis
+
+        self.client = redis.Redis.from_url(url)
+        self.key_prefix = key_prefix
+
+    def _window(self, key, now, window, add):
+        key = self.key_prefix + key
+        pipe = self.client.pipeline()
+        pipe.zremrangebyscore(key, 0, now - window)
+        if add:
+            pipe.zadd(key, {f"{now}:{uuid.uuid4().hex[:8]}": now})
+            pipe.expire(key, int(window) + 1)
+        pipe.zcard(key)
+        pipe.zrange(key, 0, 0, withscores=True)
+        *_, count, oldest = pipe.execute()
+        return count, (oldest[0][1] if oldest else None)
+
+    def add(self, key, now, window):
+        return self._window(key, now, window, add=True)
+
+    def count(self, key, now, window):
+        return self._window(key, now, window, add=False)
+
+    def reset(self, key):
+        self.client.delete(self.key_prefix + key)
+
+
+# ----------------------
+# Limiter
+# ----------------------
+class SlidingWindowLimiter:
+    """At most `limit` hits per key in any `window` seconds."""
+
+    def __init__(self, store, limit, window):
+        self.store = store
+        self.limit = limit
+        self.window = window
+
+    def _retry_after(self, oldest, now):
+        return max(1, int(oldest + self.window - now) + 1) if oldest is not None else self.window
+
+    def hit(self, key):
+        """Count an attempt; returns seconds to wait if it's over the limit, else None."""
+        now = time.time()
+        count, oldest = self.store.add(key, now, self.window)
+        return self._retry_after(oldest, now) if count > self.limit else None
+
+    def blocked(self, key):
+        """Like hit(), but only looks; use with hit() on failure to limit failures only."""
+        now = time.time()
+        count, oldest = self.store.count(key, now, self.window)
+        return self._retry_after(oldest, now) if count >= self.limit else None
+
+    def reset(self, key):
+        self.store.reset(key)
+
+
+def init_ratelimit(app):
+    backend = app.config.get("RATELIMIT_BACKEND", "memory")
+    if backend == "memory":
+        store = MemoryWindowStore()
+    elif backend == "redis":
+        url = app.config.get("RATELIMIT_REDIS_URL")
+        if not url:
+            raise ValueError("RATELIMIT_REDIS_URL (or CACHE_REDIS_URL) must be set when RATELIMIT_BACKEND=redis")
+        store = RedisWindowStore(url)
+    else:
+        raise ValueError(f"Unknown RATELIMIT_BACKEND: {backend}")
+
+    window = app.config.get("LOGIN_LIMIT_WINDOW", 300)
+    app.extensions["login_limiters"] = {
+        "ip": SlidingWindowLimiter(store, app.config.get("LOGIN_LIMIT_PER_IP", 30), window),
+        "email": SlidingWindowLimiter(store, app.config.get("LOGIN_LIMIT_PER_EMAIL", 5), window),
+    }
+
+
+# ---------------- LOGIN -----------------
+def _limiters():
+    return current_app.extensions["login_limiters"]
+
+
+def login_throttled(email, ip=None):
+    """Seconds the caller must wait before trying to log in, or None.
+
+    Runs before any password hashing, so a flood of attempts costs a dict (or Redis)
+    lookup instead of a hash. Every attempt counts against the client's IP; only failed
+    ones count against the email, so a user's own typos don't lock them out for long.
+    `ip` defaults to the Flask request's address.
+    """
+    limiters = _limiters()
+    retry_after = limiters["ip"].hit(f"login:ip:{ip or request.remote_addr}")
+    if retry_after:
+        LOGIN_RATE_LIMITED.inc("ip")
+    else:
+        retry_after = limiters["email"].blocked(f"login:email:{email}")
+        if retry_after:
+            LOGIN_RATE_LIMITED.inc("email")
+    if retry_after:
+        LOGIN_ATTEMPTS.inc("limited")
+    return retry_after
+
+
+def record_login_result(email, success):
+    LOGIN_ATTEMPTS.inc("success" if success else "failure")
+    limiter = _limiters()["email"]
+    if success:
+        limiter.reset(f"login:email:{email}")
+    else:
+        limiter.hit(f"login:email:{email}")
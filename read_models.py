@@ -0,0 +1,151 @@
+# read_models.py
+"""Column-only rows for the list pages, optionally cached for a few seconds.
+
+The list templates read a handful of columns. Selecting just those into NamedTuples skips
+the identity map, change tracking and the users' password hashes. With LIST_CACHE_TTL > 0
+each page is cached per scope (role/user) and filters; any commit that touches users or
+appointments starts a new cache generation (see register_list_invalidation).
+"""
+import datetime
+import time as clock
+from typing import NamedTuple, Optional
+
+from flask import current_app, has_app_context
+from sqlalchemy import event, select
+from sqlalchemy.orm import aliased
+
+from cache import get_cache
+from metrics import LIST_CACHE
+from models import db, Appointment, User
+from pagination import DEFAULT_PER_PAGE, KeysetPage, clamp_per_page, keyset_page
+from replicas import primary_reads
+
+GENERATION_KEY = "lists:generation"
+
+
+class UserRow(NamedTuple):
+    id: int
+    name: str
+    email: str
+    role: str
+
+
+class AppointmentRow(NamedTuple):
+    id: int
+    date: datetime.date
+    time: Optional[datetime.time]
+    status: Optional[str]
+    message: Optional[str]
+    patient_full_name: Optional[str]
+    patient_insurance: Optional[str]
+    patient_id: int
+    doctor_id: Optional[int]
+    patient_name: Optional[str]
+    doctor_name: Optional[str]
+
+
+USER_COLUMNS = (User.id, User.name, User.email, User.role)
+APPOINTMENT_COLUMNS = (
+    Appointment.id, Appointment.date, Appointment.time, Appointment.status, Appointment.message,
+    Appointment.patient_full_name, Appointment.patient_insurance, Appointment.patient_id, Appointment.doctor_id,
+)
+
+# The names as correlated subqueries: SQLite and Postgres evaluate them only for the rows
+# left after ORDER BY/LIMIT, instead of joining user to every matching appointment first.
+# Built once; constructing them per request cost more than running the page query.
+_patient, _doctor = aliased(User, name="patient"), aliased(User, name="doctor")
+PATIENT_NAME = select(_patient.name).where(_patient.id == Appointment.patient_id).scalar_subquery()
+DOCTOR_NAME = select(_doctor.name).where(_doctor.id == Appointment.doctor_id).scalar_subquery()
+
+
+# ---------------- QUERIES -----------------
+def appointment_page_select(criteria, cursor=None, per_page=DEFAULT_PER_PAGE, filters=None):
+    """SELECT for one page (per_page + 1 rows) of AppointmentRow columns."""
+    stmt = select(*APPOINTMENT_COLUMNS, PATIENT_NAME.label("patient_name"), DOCTOR_NAME.label("doctor_name"))
+    return keyset_page(stmt.where(*criteria), cursor, per_page, filters)
+
+
+def fetch_appointment_page(criteria, cursor=None, per_page=DEFAULT_PER_PAGE, filters=None):
+    per_page = clamp_per_page(per_page)
+    rows = db.session.execute(appointment_page_select(criteria, cursor, per_page, filters)).all()
+    return KeysetPage.from_rows([AppointmentRow(*row) for row in rows], per_page)
+
+
+def fetch_users(*criteria, order_by=User.id):
+    rows = db.session.execute(select(*USER_COLUMNS).where(*criteria).order_by(order_by)).all()
+    return [UserRow(*row) for row in rows]
+
+
+# ---------------- CACHED PAGES -----------------
+def cached(scope, key, build):
+    """build() once per LIST_CACHE_TTL for (scope, key) in the current generation."""
+    ttl = current_app.config.get("LIST_CACHE_TTL", 0)
+    if not ttl:
+        return build()
+    cache = get_cache()
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        generation = invalidate_lists()
+    full_key = f"lists:{generation}:{scope}:{key!r}"
+    value = cache.get(full_key)
+    if value is None:
+        LIST_CACHE.inc("miss")
+        with primary_reads():
+            value = build()
+        cache.set(full_key, value, timeout=ttl)
+    else:
+        LIST_CACHE.inc("hit")
+    return value
+
+
+def appointment_page(scope, criteria, cursor=None, per_page=DEFAULT_PER_PAGE, filters=None):
+    """A KeysetPage of AppointmentRow; `scope` names whose rows `criteria` select (e.g. "patient:7")."""
+    filters = filters or {}
+    key = (cursor, per_page, sorted(filters.items()))
+    return cached(scope, key, lambda: fetch_appointment_page(criteria, cursor, per_page, filters))
+
+
+def user_list():
+    return cached("users", None, fetch_users)
+
+
+def doctor_list():
+    return cached("doctors", None, lambda: fetch_users(User.role == "doctor", order_by=User.name))
+
+
+# ---------------- INVALIDATION -----------------
+def invalidate_lists():
+    """Start a new generation, orphaning every cached page (they expire with their TTL)."""
+    generation = clock.time_ns()
+    get_cache().set(GENERATION_KEY, generation, timeout=0)
+    return generation
+
+
+def _mark_lists_dirty(sess, flush_context, instances):
+    for obj in list(sess.new) + list(sess.dirty) + list(sess.deleted):
+        if isinstance(obj, (User, Appointment)):
+            sess.info["lists_dirty"] = True
+            return
+
+
+def _invalidate_after_commit(sess):
+    if sess.info.pop("lists_dirty", False) and has_app_context() and current_app.config.get("LIST_CACHE_TTL"):
+        invalidate_lists()
+
+
+def lists_changed(sess):
+    """For set-based UPDATE/DELETE statements, which change rows without a flush."""
+    sess.info["lists_dirty"] = True
+
+
+def _reset_after_rollback(sess):
+    sess.info.pop("lists_dirty", False)
+
+
+def register_list_invalidation(session):
+    """Drop cached list pages whenever a commit changes a User or an Appointment."""
+    if event.contains(session, "before_flush", _mark_lists_dirty):
+        return
+    event.listen(session, "before_flush", _mark_lists_dirty)
+    event.listen(session, "after_commit", _invalidate_after_commit)
+    event.listen(session, "after_rollback", _reset_after_rollback)
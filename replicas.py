@@ -0,0 +1,211 @@
+# replicas.py
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import current_app, g, has_request_context, request, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.sql.dml import UpdateBase
+from sqlalchemy.sql.elements import TextClause
+
+from db_profiles import engine_options, install_profile
+from metrics import REPLICA_HEALTHY, REPLICA_ROUTING
+
+# Session key holding the time until which this browser reads from the primary
+STICKY_KEY = "_db_primary_until"
+READ_METHODS = ("GET", "HEAD")
+
+
+# ----------------------
+# Replica set
+# ----------------------
+class Replica:
+    def __init__(self, url, engine):
+        self.name = make_url(url).render_as_string(hide_password=True)
+        self.engine = engine
+        self.healthy = True
+        self.checked = 0.0  # time.monotonic() of the last health check
+
+
+class ReplicaSet:
+    """Read replicas, picked round-robin. Health checks run lazily on the request path, at
+    most once per REPLICA_HEALTH_INTERVAL per replica and process; a replica that fails one,
+    or drops a connection mid-request, is skipped until it passes again. With no healthy
+    replica left, reads go to the primary.
+    """
+
+    def __init__(self, replicas, interval=10, max_lag=0):
+        self.replicas = replicas
+        self.interval = interval
+        self.max_lag = max_lag
+        self._next = 0
+        self._lock = threading.Lock()
+        for replica in replicas:
+            REPLICA_HEALTHY.set(1, replica.name)
+
+    def set_health(self, replica, healthy):
+        if replica.healthy != healthy:
+            current_app.logger.warning("Read replica %s is %s", replica.name, "back" if healthy else "down")
+        replica.healthy = healthy
+        REPLICA_HEALTHY.set(1 if healthy else 0, replica.name)
+
+    def check(self, replica):
+        try:
+            with replica.engine.connect() as conn:
+                if self.max_lag and conn.dialect.name == "postgresql":
+                    # NULL when nothing was replayed yet (or this isn't a standby): treat as current
+                    lag = conn.execute(text(
+                        "SELECT COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)"
+                    )).scalar()
+                    healthy = lag <= self.max_lag
+                else:
+                    conn.execute(text("SELECT 1"))
+                    healthy = True
+        except DBAPIError:
+            healthy = False
+        self.set_health(replica, healthy)
+
+    def choose(self):
+        """Next healthy replica, or None."""
+        now = time.monotonic()
+        for _ in range(len(self.replicas)):
+            with self._lock:
+                replica = self.replicas[self._next % len(self.replicas)]
+                self._next += 1
+                due = replica.checked + self.interval <= now
+                if due:
+                    replica.checked = now  # one thread checks; the others use the last result
+            if due:
+                self.check(replica)
+            if replica.healthy:
+                return replica
+        return None
+
+
+def _mark_down_on_disconnect(replica_set, replica):
+    def on_error(context):
+        # connection is None when connecting failed; is_disconnect covers a dropped server
+        if context.is_disconnect or context.connection is None:
+            replica_set.set_health(replica, False)
+    return on_error
+
+
+# ----------------------
+# Routing
+# ----------------------
+def _is_write(clause):
+    if isinstance(clause, UpdateBase):
+        return True
+    if isinstance(clause, TextClause):
+        return not clause.text.lstrip().lower().startswith(("select", "with"))
+    return False
+
+
+def _request_replica(replica_set):
+    """The replica for this request: chosen once, so every read sees the same snapshot."""
+    if "db_replica" not in g:
+        g.db_replica = replica_set.choose()
+        REPLICA_ROUTING.inc("replica" if g.db_replica else "primary_fallback")
+    return g.db_replica
+
+
+class RoutingSession(Session):
+    """db.session that reads from a replica when the request was routed to one.
+
+    Flushes and UPDATE/INSERT/DELETE statements always go to the primary, and once a request
+    has written, its remaining reads do too (read-your-writes).
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        primary = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        if bind is not None or not has_request_context():
+            return primary
+        if self._flushing or _is_write(clause):
+            g.db_wrote = True
+            return primary
+        replica_set = current_app.extensions.get("db_replicas")
+        if replica_set is None or g.get("db_route") != "replica" or g.get("db_wrote"):
+            return primary
+        replica = _request_replica(replica_set)
+        return replica.engine if replica else primary
+
+
+def db_route(target):
+    """Pin a view to "primary" (e.g. an edit form that must show the latest row) or
+    "replica" (a read-only POST such as a search form), overriding the per-method default.
+    """
+    if target not in ("primary", "replica"):
+        raise ValueError(f"db_route target must be 'primary' or 'replica', not {target!r}")
+
+    def decorator(view):
+        view.db_route = target  # copied onto wrappers by functools.wraps
+        return view
+    return decorator
+
+
+@contextmanager
+def primary_reads():
+    """Read from the primary inside the block. Use it around queries whose result is cached:
+    a lagging replica's rows would otherwise outlive the lag in the cache."""
+    if not has_request_context():
+        yield
+        return
+    route = g.get("db_route")
+    g.db_route = "primary"
+    try:
+        yield
+    finally:
+        g.db_route = route
+
+
+# ----------------------
+# Setup
+# ----------------------
+def _replica_engine(url, app):
+    options = engine_options(app.config["DB_PROFILE"], url, app.config)
+    if url.startswith("postgresql") and "+asyncpg" not in url:
+        # A dead replica must fail fast, since health checks run inside requests
+        options["connect_args"]["connect_timeout"] = app.config.get("REPLICA_CONNECT_TIMEOUT", 2)
+    engine = create_engine(url, **options)
+    install_profile(engine, app.config["DB_PROFILE"], app.config)
+    return engine
+
+
+def init_replicas(app):
+    """Send reads from GET/HEAD requests to DATABASE_REPLICA_URLS.
+
+    After a request writes, the browser keeps reading from the primary for
+    REPLICA_STICKY_SECONDS, so a redirect after a POST shows the change even if the replica
+    is behind. CLI commands and the job worker always use the primary.
+    """
+    urls = app.config.get("DATABASE_REPLICA_URLS") or []
+    if not urls:
+        return
+    replica_set = ReplicaSet(
+        [Replica(url, _replica_engine(url, app)) for url in urls],
+        interval=app.config.get("REPLICA_HEALTH_INTERVAL", 10),
+        max_lag=app.config.get("REPLICA_MAX_LAG_SECONDS", 0),
+    )
+    for replica in replica_set.replicas:
+        event.listen(replica.engine, "handle_error", _mark_down_on_disconnect(replica_set, replica))
+    app.extensions["db_replicas"] = replica_set
+
+    @app.before_request
+    def choose_db_route():
+        view = app.view_functions.get(request.endpoint)
+        route = getattr(view, "db_route", None)
+        if route is None:
+            route = "replica" if request.method in READ_METHODS else "primary"
+        if route == "replica" and session.get(STICKY_KEY, 0) > time.time():
+            route = "primary"
+        g.db_route = route
+
+    @app.after_request
+    def stick_to_primary_after_write(response):
+        sticky = app.config.get("REPLICA_STICKY_SECONDS", 0)
+        if sticky and g.get("db_wrote"):
+            session[STICKY_KEY] = time.time() + sticky
+        return response
@@ -4,8 +4,10 @@ def register_routes(app):
     from .patient import patient_bp
     from .doctor import doctor_bp
     from .admin import admin_bp
+    from .media import media_bp
 
     app.register_blueprint(auth_bp)
     app.register_blueprint(patient_bp)
     app.register_blueprint(doctor_bp)
     app.register_blueprint(admin_bp)
+    app.register_blueprint(media_bp)
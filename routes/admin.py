@@ -1,10 +1,26 @@
 # routes/admin.py
-from flask import Blueprint, render_template, redirect, url_for, request, flash, current_app
+from flask import Blueprint, render_template, redirect, url_for, request, flash, current_app, abort, Response
 from flask_login import login_required, current_user
 from models import User, Appointment, SiteSettings, db, HomeContent
-from werkzeug.utils import secure_filename
-import os
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from pagination import appointment_filters, appointment_criteria
+from read_models import appointment_page, doctor_list, user_list
+from stats import dashboard_stats
+from images import mark_image_pending, queue_image_processing
+from uploads import save_upload, release_upload
+from identity import invalidate_user
+from metrics import USER_CACHE, LIST_CACHE, LIVE_STREAMS, LIVE_EVENTS, LOGIN_ATTEMPTS, LOGIN_RATE_LIMITED, REPLICA_ROUTING, REPLICA_HEALTHY, render_prometheus
+from instrumentation import endpoint_summary, template_summary, pool_summary
+from notifications import notify_status_change
+from live import publish_appointment, publish_resync
+from bulk import ROLES
+from bulk_actions import set_appointment_status, set_user_role, delete_users
+from replicas import db_route
+from scheduling import SlotFullError, check_capacity, lock_slot
 from functools import wraps
+import hmac
+import os
 
 admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
 
@@ -23,27 +39,54 @@ def admin_required(f):
 @login_required
 @admin_required
 def dashboard():
-    total_users = User.query.count()
-    total_appointments = Appointment.query.count()
-    pending = Appointment.query.filter_by(status="pending").count()
-    approved = Appointment.query.filter_by(status="approved").count()
-    rejected = Appointment.query.filter_by(status="rejected").count()
+    stats = dashboard_stats()
     return render_template(
         "admin/dashboard.html",
-        users=total_users,
-        appointments=total_appointments,
-        pending=pending,
-        approved=approved,
-        rejected=rejected
+        users=stats["users"],
+        appointments=stats["appointments"],
+        pending=stats["pending"],
+        approved=stats["approved"],
+        rejected=stats["rejected"],
+        user_cache=USER_CACHE.values()
     )
 
+# ---------------- METRICS -----------------
+@admin_bp.route("/metrics")
+@login_required
+@admin_required
+def metrics():
+    return render_template(
+        "admin/metrics.html",
+        worker=os.getpid(),
+        endpoints=endpoint_summary(),
+        templates=template_summary(),
+        pool=pool_summary(),
+        user_cache=USER_CACHE.values(),
+        list_cache=LIST_CACHE.values(),
+        live_streams=LIVE_STREAMS.values(),
+        live_events=LIVE_EVENTS.values(),
+        logins=LOGIN_ATTEMPTS.values(),
+        login_limited=LOGIN_RATE_LIMITED.values(),
+        replica_routing=REPLICA_ROUTING.values(),
+        replicas=REPLICA_HEALTHY.values()
+    )
+
+@admin_bp.route("/metrics/prometheus")
+def metrics_prometheus():
+    # Scrapers can't log in: accept "Authorization: Bearer <METRICS_TOKEN>" as well as an admin session
+    token = current_app.config.get("METRICS_TOKEN")
+    header = request.headers.get("Authorization", "")
+    authorized = bool(token) and hmac.compare_digest(header, f"Bearer {token}")
+    if not authorized and not (current_user.is_authenticated and current_user.role == 'admin'):
+        abort(403)
+    return Response(render_prometheus(), mimetype="text/plain; version=0.0.4")
+
 # ---------------- USERS -----------------
 @admin_bp.route("/users")
 @login_required
 @admin_required
 def users():
-    users = User.query.all()
-    return render_template("admin/users.html", users=users)
+    return render_template("admin/users.html", users=user_list())
 
 @admin_bp.route("/users/update/<int:user_id>", methods=['POST'])
 @login_required
@@ -56,6 +99,7 @@ def update_user(user_id):
         return redirect(url_for('admin.users'))
     user.role = new_role
     db.session.commit()
+    invalidate_user(user.id)
     flash(f"{user.name} role updated to {new_role}", "success")
     return redirect(url_for('admin.users'))
 
@@ -64,9 +108,60 @@ def update_user(user_id):
 @admin_required
 def delete_user(user_id):
     user = User.query.get_or_404(user_id)
-    db.session.delete(user)
+    name = user.name
+    result = delete_users([user_id])  # their bookings go too; their patients return to the pool
     db.session.commit()
-    flash(f"User {user.name} deleted", "success")
+    _after_user_deletion(result)
+    flash(f"User {name} deleted", "success")
+    return redirect(url_for('admin.users'))
+
+def _after_user_deletion(result):
+    for user_id in result["users"]:
+        invalidate_user(user_id)
+    if result["appointments_deleted"] or result["appointments_unassigned"]:
+        publish_resync()
+
+# ---------------- BULK ACTIONS (see bulk_actions.py) -----------------
+def _selected_ids():
+    return [int(i) for i in request.form.getlist('ids') if i.isdigit()]
+
+@admin_bp.route("/users/bulk", methods=['POST'])
+@login_required
+@admin_required
+def bulk_users():
+    """Change the role of, or delete, the ticked users (scope=matching: every user with `filter_role`)."""
+    action = request.form.get('action')
+    if action != 'delete' and action not in ROLES:
+        flash("Invalid action", "danger")
+        return redirect(url_for('admin.users'))
+
+    if request.form.get('scope') == 'matching':
+        role = request.form.get('filter_role')
+        if role not in ROLES:
+            flash("Pick the role whose users you want to change.", "danger")
+            return redirect(url_for('admin.users'))
+        ids = db.session.scalars(select(User.id).where(User.role == role)).all()
+    else:
+        ids = _selected_ids()
+    if current_user.id in ids:
+        ids.remove(current_user.id)
+        flash("Your own account was left out.", "warning")
+    if not ids:
+        flash("No users selected.", "warning")
+        return redirect(url_for('admin.users'))
+
+    if action == 'delete':
+        result = delete_users(ids)
+        db.session.commit()
+        _after_user_deletion(result)
+        flash(f"Deleted {len(result['users'])} user(s) and {result['appointments_deleted']} of their bookings; "
+              f"{result['appointments_unassigned']} appointment(s) went back to the unassigned pool.", "success")
+    else:
+        changed = set_user_role(ids, action)
+        db.session.commit()
+        for user_id in changed:
+            invalidate_user(user_id)
+        flash(f"{len(changed)} user(s) are now {action}s.", "success")
     return redirect(url_for('admin.users'))
 
 # ---------------- APPOINTMENTS -----------------
@@ -74,8 +169,14 @@ def delete_user(user_id):
 @login_required
 @admin_required
 def appointments():
-    appointments = Appointment.query.all()
-    return render_template("admin/appointments.html", appointments=appointments)
+    filters = appointment_filters(request.args)
+    page = appointment_page(
+        "admin", (),
+        cursor=request.args.get('cursor'),
+        per_page=current_app.config.get('APPOINTMENTS_PER_PAGE', 50),
+        filters=filters,
+    )
+    return render_template("admin/appointments.html", appointments=page, filters=filters, doctors=doctor_list())
 
 @admin_bp.route('/appointments/update_status/<int:appt_id>', methods=['POST'])
 @login_required
@@ -86,17 +187,76 @@ def update_appt_status(appt_id):
     if status not in ['approved', 'rejected']:
         flash("Invalid status", "danger")
         return redirect(url_for('admin.appointments'))
+    lock_slot(appt.date, appt.time)
     appt.status = status
-    db.session.commit()
+    notify_status_change(appt)
+    try:
+        check_capacity([(appt.date, appt.time)])
+        db.session.commit()
+    except (IntegrityError, SlotFullError):
+        # Re-approving a rejected booking whose slot was taken since
+        db.session.rollback()
+        flash("Nothing was changed: that would double-book a doctor.", "danger")
+        return redirect(url_for('admin.appointments'))
+    publish_appointment("status", appt)
     flash(f"Appointment {status} successfully!", "success")
     return redirect(url_for('admin.appointments'))
 
+@admin_bp.route('/appointments/bulk', methods=['POST'])
+@login_required
+@admin_required
+def bulk_appointments():
+    """Approve or reject the ticked appointments, or with scope=matching every appointment
+    matching the posted filters (e.g. status=pending and date_to), in one transaction."""
+    status = request.form.get('new_status')
+    filters = appointment_filters(request.form)  # the listing's filters, posted back as hidden fields
+    back = url_for('admin.appointments', **{k: request.form[k] for k in ('status', 'doctor', 'date_from', 'date_to')
+                                           if request.form.get(k)})
+    if status not in ['approved', 'rejected']:
+        flash("Invalid status", "danger")
+        return redirect(back)
+
+    if request.form.get('scope') == 'matching':
+        if not filters:
+            flash("Set a filter first; bulk changes never apply to every appointment at once.", "danger")
+            return redirect(back)
+        criteria = appointment_criteria(filters)
+    else:
+        ids = _selected_ids()
+        if not ids:
+            flash("No appointments selected.", "warning")
+            return redirect(back)
+        criteria = [Appointment.id.in_(ids)]
+
+    try:
+        changed = set_appointment_status(criteria, status)
+        db.session.commit()
+    except (IntegrityError, SlotFullError):
+        # uq_appointment_doctor_slot or slot capacity: re-approving a rejected booking whose slot was taken since
+        db.session.rollback()
+        flash("Nothing was changed: that would double-book a doctor.", "danger")
+        return redirect(back)
+
+    if changed:
+        publish_resync()
+    flash(f"{len(changed)} appointment(s) {status}.", "success")
+    return redirect(back)
+
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def release_old_image(filename):
+    """Delete an image nobody references any more; `manage.py gc-uploads` retries failures."""
+    try:
+        release_upload(filename)
+    except Exception:
+        current_app.logger.exception("Could not delete upload %s", filename)
+        flash("Content saved, but the old image file could not be deleted.", "warning")
+
 @admin_bp.route('/home-content/edit/<int:content_id>', methods=['GET', 'POST'])
+@db_route("primary")  # the form must show what is saved now, not what the replica has
 @login_required
 @admin_required
 def edit_home_content(content_id):
@@ -110,16 +270,19 @@ def edit_home_content(content_id):
         content.order = int(request.form['order'])
 
         # Handle optional image upload
+        old_image = content.image
         if 'image' in request.files:
             file = request.files['image']
             if file and allowed_file(file.filename):
-                filename = secure_filename(file.filename)
-                upload_path = os.path.join(current_app.root_path, 'static/uploads', filename)
-                file.save(upload_path)
-                content.image = filename
+                content.image = save_upload(file)
+                if content.image != old_image:
+                    mark_image_pending(content)
 
         try:
             db.session.commit()
+            queue_image_processing(content)
+            if old_image and old_image != content.image:
+                release_old_image(old_image)
             flash('Homepage content updated successfully!', 'success')
             return redirect(url_for('admin.home_content_list'))
         except Exception as e:
@@ -133,6 +296,7 @@ def edit_home_content(content_id):
 
 # ---------------- SITE SETTINGS -----------------
 @admin_bp.route("/settings", methods=['GET', 'POST'])
+@db_route("primary")
 @login_required
 @admin_required
 def settings():
@@ -171,11 +335,8 @@ def add_home_content():
 
         image_file = request.files.get('image')
         filename = None
-        if image_file:
-            filename = secure_filename(image_file.filename)
-            upload_folder = current_app.config.get('UPLOAD_FOLDER', 'static/uploads')
-            os.makedirs(upload_folder, exist_ok=True)
-            image_file.save(os.path.join(upload_folder, filename))
+        if image_file and allowed_file(image_file.filename):
+            filename = save_upload(image_file)
 
         new_content = HomeContent(
             title=title,
@@ -184,8 +345,10 @@ def add_home_content():
             image=filename,
             order=order
         )
+        mark_image_pending(new_content)
         db.session.add(new_content)
         db.session.commit()
+        queue_image_processing(new_content)
         flash('Content added successfully!', 'success')
         return redirect(url_for('admin.home_content_list'))
 
@@ -196,13 +359,11 @@ def add_home_content():
 @admin_required
 def delete_home_content(content_id):
     content = HomeContent.query.get_or_404(content_id)
-    # Delete image file if exists
-    if content.image:
-        try:
-            os.remove(os.path.join(current_app.config['UPLOAD_FOLDER'], content.image))
-        except Exception:
-            pass
+    image = content.image
     db.session.delete(content)
     db.session.commit()
     flash("Content deleted successfully!", "success")
+    # Delete the image file once the row is gone and no other content uses it
+    if image:
+        release_old_image(image)
     return redirect(url_for('admin.home_content_list'))
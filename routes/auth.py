@@ -1,16 +1,78 @@
 # routes/auth.py
-from flask import Blueprint, render_template, request, redirect, url_for, flash
-from flask_login import login_user, logout_user, login_required
+import hashlib
+from datetime import datetime, timezone
+
+from flask import Blueprint, render_template, request, redirect, url_for, flash, session, make_response, current_app
+from flask_login import login_user, logout_user, login_required, current_user
+from markupsafe import Markup
 from models import User, db, HomeContent
-from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.http import is_resource_modified
+from cache import get_cache, HOME_CACHE_KEY
+from replicas import primary_reads
+from passwords import hash_password, verify_password
+from ratelimit import login_throttled, record_login_result
 
 auth_bp = Blueprint('auth', __name__)
 
 # ---------------- HOME -----------------
+def build_home_sections():
+    """Render each home page section once; the result is cached until HomeContent changes."""
+    contents = HomeContent.query.order_by(HomeContent.order, HomeContent.id).all()
+    by_type = {}
+    for content in contents:
+        by_type.setdefault(content.section_type, []).append(content)
+
+    logo = (by_type.get('logo') or [None])[0]
+    hero = (by_type.get('hero') or [None])[0]
+    sections = {
+        'hero': Markup(render_template('home/hero.html', hero=hero)),
+        'services': Markup(render_template('home/services.html', services=by_type.get('service', []))),
+        'testimonials': Markup(render_template('home/testimonials.html', testimonials=by_type.get('testimonial', []))),
+    }
+
+    digest = hashlib.sha1(current_app.config.get("BUILD_VERSION", "").encode('utf-8'))  # a deploy changes the page too
+    for name in sorted(sections):
+        digest.update(sections[name].encode('utf-8'))
+    if logo:
+        digest.update(f"{logo.title}|{logo.image}".encode('utf-8'))
+
+    return {
+        'sections': sections,
+        'logo': {'title': logo.title, 'image': logo.image} if logo else None,
+        'etag': digest.hexdigest(),
+        'last_modified': datetime.now(timezone.utc).replace(microsecond=0),
+    }
+
+
+def get_home_sections():
+    cache = get_cache()
+    page = cache.get(HOME_CACHE_KEY)
+    if page is None:
+        with primary_reads():  # cached until the next change, so never from a lagging replica
+            page = build_home_sections()
+        # With redis every worker sees the invalidation, so the page is kept until then; a
+        # per-worker cache only hears of changes made in its own worker, so it expires
+        ttl = current_app.config.get("HOME_CACHE_TTL") or (0 if current_app.config.get("CACHE_BACKEND") == "redis" else 30)
+        cache.set(HOME_CACHE_KEY, page, timeout=ttl)
+    return page
+
+
 @auth_bp.route('/')
 def home():
-    contents = HomeContent.query.order_by(HomeContent.order).all()
-    return render_template('home.html', home_contents=contents)
+    page = get_home_sections()
+
+    # Only anonymous pages without pending flash messages are identical for everyone
+    shareable = not current_user.is_authenticated and '_flashes' not in session
+    if shareable and not is_resource_modified(request.environ, etag=page['etag'], last_modified=page['last_modified']):
+        response = make_response('', 304)
+    else:
+        response = make_response(render_template('home.html', sections=page['sections'], logo=page['logo']))
+
+    if shareable:
+        response.set_etag(page['etag'])
+        response.last_modified = page['last_modified']
+        response.cache_control.no_cache = True
+    return response
 
 # ---------------- REGISTER -----------------
 @auth_bp.route("/register", methods=['GET', 'POST'])
@@ -18,7 +80,7 @@ def register():
     if request.method == 'POST':
         name = request.form['name']
         email = request.form['email']
-        password = generate_password_hash(request.form['password'])
+        password = hash_password(request.form['password'])
         role = request.form.get('role', 'patient')
 
         if User.query.filter_by(email=email).first():
@@ -39,9 +101,20 @@ def login():
         email = request.form['email'].strip().lower()
         password = request.form['password']
 
+        retry_after = login_throttled(email)
+        if retry_after:
+            flash(f"Too many login attempts. Please try again in {retry_after} seconds.", "danger")
+            response = make_response(render_template("login.html"), 429)
+            response.headers['Retry-After'] = str(retry_after)
+            return response
+
         user = User.query.filter_by(email=email).first()
+        ok = verify_password(user, password)
+        record_login_result(email, ok)
 
-        if user and check_password_hash(user.password, password):
+        if ok:
+            if db.session.is_modified(user):
+                db.session.commit()  # saves the hash upgraded by verify_password
             login_user(user)
             flash("Logged in successfully", "success")
             return redirect(url_for('auth.home'))
@@ -1,7 +1,14 @@
 # routes/doctor.py
-from flask import Blueprint, render_template, redirect, url_for, flash, request
+from flask import Blueprint, render_template, redirect, url_for, flash, request, current_app, abort, Response
 from flask_login import login_required, current_user
 from models import Appointment, db
+from pagination import appointment_filters
+from read_models import appointment_page
+from notifications import notify_status_change
+from live import doctor_filter, publish_appointment, stream
+from claims import ClaimError, claim_appointment, claim_batch
+from scheduling import SlotFullError, check_capacity, lock_slot
+from sqlalchemy.exc import IntegrityError
 
 doctor_bp = Blueprint('doctor', __name__, url_prefix='/doctor')
 
@@ -13,17 +20,63 @@ def doctor_dashboard():
         flash("Access denied: Doctors only", "danger")
         return redirect(url_for('auth.home'))
 
+    filters = appointment_filters(request.args)
+    filters.pop('doctor_id', None)
+    per_page = current_app.config.get('APPOINTMENTS_PER_PAGE', 50)
+
     # Appointments assigned to this doctor
-    my_appointments = Appointment.query.filter_by(doctor_id=current_user.id).all()
+    my_appointments = appointment_page(
+        f"doctor:{current_user.id}", (Appointment.doctor_id == current_user.id,),
+        cursor=request.args.get('cursor'),
+        per_page=per_page,
+        filters=filters,
+    )
 
     # Unassigned appointments
-    unassigned_appointments = Appointment.query.filter_by(doctor_id=None).all()
+    unassigned_appointments = appointment_page(
+        "unassigned", (Appointment.doctor_id.is_(None),),
+        cursor=request.args.get('unassigned_cursor'),
+        per_page=per_page,
+        filters=filters,
+    )
+
+    # Live updates only patch the first, unfiltered page; anything else reloads as before
+    live = ("live" in current_app.extensions and not filters
+            and not request.args.get('cursor') and not request.args.get('unassigned_cursor'))
 
     return render_template(
         "doctor/dashboard.html",
         my_appointments=my_appointments,
-        unassigned_appointments=unassigned_appointments
+        unassigned_appointments=unassigned_appointments,
+        filters=filters,
+        live=live
+    )
+
+
+# ---------------- LIVE UPDATES (server-sent events, see live.py) ----------------
+@doctor_bp.route("/events")
+@login_required
+def events():
+    if current_user.role != 'doctor':
+        abort(403)
+    broker = current_app.extensions.get("live")
+    if broker is None:
+        abort(404)
+
+    sub = broker.subscribe(doctor_filter(current_user.id), request.headers.get('Last-Event-ID'))
+    if sub is None:
+        # Every stream holds a worker thread; the dashboard falls back to reloading
+        return Response("Too many live streams, try again later\n", 503, {"Retry-After": "60"})
+
+    config = current_app.config
+    # Not stream_with_context: the request (and its DB session) is torn down before streaming
+    response = Response(
+        stream(broker, sub, config.get('LIVE_HEARTBEAT_SECONDS', 15), config.get('LIVE_STREAM_SECONDS', 300)),
+        mimetype="text/event-stream",
     )
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"  # nginx must not buffer the stream
+    return response
 
 
 # ---------------- UPDATE APPOINTMENT STATUS ----------------
@@ -46,12 +99,66 @@ def update_appt_status(appt_id):
         flash("Invalid status", "danger")
         return redirect(url_for('doctor.doctor_dashboard'))
 
+    lock_slot(appt.date, appt.time)
     appt.status = status
-    db.session.commit()
+    notify_status_change(appt)
+    try:
+        check_capacity([(appt.date, appt.time)])
+        db.session.commit()
+    except (IntegrityError, SlotFullError):
+        # Re-approving a rejected booking whose slot was taken since
+        db.session.rollback()
+        flash("Nothing was changed: that would double-book a doctor.", "danger")
+        return redirect(url_for('doctor.doctor_dashboard'))
+    publish_appointment("status", appt)
     flash(f"Appointment {status} successfully!", "success")
     return redirect(url_for('doctor.doctor_dashboard'))
 
 
+# ---------------- CLAIM UNASSIGNED APPOINTMENTS (see claims.py) ----------------
+@doctor_bp.route("/appointments/<int:appt_id>/claim", methods=['POST'])
+@login_required
+def claim(appt_id):
+    if current_user.role != 'doctor':
+        flash("Access denied", "danger")
+        return redirect(url_for('auth.home'))
+
+    try:
+        row = claim_appointment(appt_id, current_user.id)
+    except ClaimError as e:
+        flash(str(e), "danger")
+        return redirect(url_for('doctor.doctor_dashboard'))
+
+    publish_appointment("assigned", row)
+    flash(f"Appointment #{row.id} is now yours.", "success")
+    return redirect(url_for('doctor.doctor_dashboard'))
+
+
+@doctor_bp.route("/appointments/claim", methods=['POST'])
+@login_required
+def claim_next():
+    """Claim the earliest unassigned appointments matching the dashboard's filters."""
+    if current_user.role != 'doctor':
+        flash("Access denied", "danger")
+        return redirect(url_for('auth.home'))
+
+    filters = appointment_filters(request.form)
+    filters.pop('doctor_id', None)
+    try:
+        rows = claim_batch(current_user.id, request.form.get('count', 10, type=int), filters)
+    except ClaimError as e:
+        flash(str(e), "danger")
+        return redirect(url_for('doctor.doctor_dashboard'))
+
+    for row in rows:
+        publish_appointment("assigned", row)
+    if rows:
+        flash(f"Claimed {len(rows)} appointment(s).", "success")
+    else:
+        flash("No unassigned appointments left that fit your schedule.", "info")
+    return redirect(url_for('doctor.doctor_dashboard'))
+
+
 # ---------------- OPTIONAL: VIEW SINGLE APPOINTMENT ----------------
 @doctor_bp.route("/appointments/<int:appt_id>")
 @login_required
@@ -0,0 +1,18 @@
+# routes/media.py
+from flask import Blueprint
+from storage import get_storage
+from uploads import is_immutable
+
+media_bp = Blueprint('media', __name__)
+
+ONE_YEAR = 365 * 24 * 3600
+
+# ---------------- UPLOADED FILES -----------------
+@media_bp.route('/media/<path:filename>')
+def upload(filename):
+    immutable = is_immutable(filename)
+    # Local storage streams the file; S3 storage answers with a redirect to the bucket
+    response = get_storage().send(filename, max_age=ONE_YEAR if immutable else None)
+    if immutable and response.status_code == 200:
+        response.cache_control.immutable = True
+    return response
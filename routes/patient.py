@@ -1,7 +1,12 @@
 # routes/patient.py
-from flask import Blueprint, render_template, request, redirect, url_for, flash
+from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app, jsonify
 from flask_login import login_required, current_user
-from models import Appointment, db
+from sqlalchemy.exc import IntegrityError
+from models import Appointment, User, db
+from pagination import appointment_filters
+from read_models import appointment_page, doctor_list
+from scheduling import SlotFullError, check_capacity, free_slots, is_bookable, lock_slot
+from live import publish_appointment
 from datetime import datetime, date, time
 
 
@@ -17,6 +22,7 @@ def book():
         message = request.form.get('message')
         full_name = request.form.get('full_name')
         insurance = request.form.get('insurance')
+        doctor_id = request.form.get('doctor_id', type=int)
 
         # Convert to Python objects
         try:
@@ -31,8 +37,18 @@ def book():
             flash("Invalid time format. Use HH:MM (24-hour).")
             return redirect(url_for('patient.book'))
 
+        slot_minutes = current_app.config.get('APPOINTMENT_SLOT_MINUTES', 30)
+        if date_obj < date.today() or not is_bookable(date_obj, time_obj, slot_minutes):
+            flash("That time is outside our working hours. Please pick one of the available slots.")
+            return redirect(url_for('patient.book'))
+
+        if doctor_id and not User.query.filter_by(id=doctor_id, role='doctor').first():
+            flash("Please choose a valid doctor.")
+            return redirect(url_for('patient.book'))
+
         new_appointment = Appointment(
             patient_id=current_user.id,
+            doctor_id=doctor_id or None,
             date=date_obj,
             time=time_obj,
             message=message,
@@ -40,17 +56,54 @@ def book():
             patient_insurance=insurance
         )
 
+        # uq_appointment_doctor_slot rejects a double booking even if two requests race;
+        # check_capacity does the same for "any doctor" bookings
+        lock_slot(date_obj, time_obj)
         db.session.add(new_appointment)
-        db.session.commit()
+        try:
+            check_capacity([(date_obj, time_obj)])
+            db.session.commit()
+        except (IntegrityError, SlotFullError):
+            db.session.rollback()
+            flash("Sorry, that slot was just booked. Please pick another time.")
+            return redirect(url_for('patient.book'))
+        publish_appointment("created", new_appointment, current_user.name)
         flash("Appointment requested successfully!")
         return redirect(url_for('patient.book'))
 
-    return render_template("book.html")
+    return render_template("book.html", doctors=doctor_list())
+
+
+@patient_bp.route("/availability")
+@login_required
+def availability():
+    """Free slots as JSON: /availability?start=2026-01-10&end=2026-01-16&doctor=3"""
+    doctor_id = request.args.get('doctor', type=int)
+    try:
+        start = datetime.strptime(request.args['start'], "%Y-%m-%d").date()
+        end = datetime.strptime(request.args.get('end', request.args['start']), "%Y-%m-%d").date()
+    except (KeyError, ValueError):
+        return jsonify(error="start and end must be dates in YYYY-MM-DD format"), 400
+
+    slot_minutes = current_app.config.get('APPOINTMENT_SLOT_MINUTES', 30)
+    try:
+        slots = free_slots(doctor_id, start, end, slot_minutes)
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+
+    return jsonify(doctor_id=doctor_id, slot_minutes=slot_minutes, slots=slots)
 
 
 
 @patient_bp.route("/my-appointments")
 @login_required
 def my_appointments():
-    appointments = Appointment.query.filter_by(patient_id=current_user.id).all()
-    return render_template("appointments.html", appointments=appointments)
+    filters = appointment_filters(request.args)
+    filters.pop('doctor_id', None)
+    appointments = appointment_page(
+        f"patient:{current_user.id}", (Appointment.patient_id == current_user.id,),
+        cursor=request.args.get('cursor'),
+        per_page=current_app.config.get('APPOINTMENTS_PER_PAGE', 50),
+        filters=filters,
+    )
+    return render_template("appointments.html", appointments=appointments, filters=filters)
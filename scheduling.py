@@ -0,0 +1,260 @@
+# scheduling.py
+import bisect
+import re
+from datetime import datetime, timedelta
+
+from sqlalchemy import case, func, select, tuple_
+
+from models import db, Appointment, SiteSettings, User
+
+DEFAULT_WORKING_HOURS = "9AM - 5PM"
+DEFAULT_SLOT_MINUTES = 30
+MAX_RANGE_DAYS = 31
+SLOT_LOCK_CLASS = 5810  # first key of the Postgres advisory locks taken per slot
+
+DAYS = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
+
+_TIME = r"(\d{1,2})(?:[:.](\d{2}))?\s*(am|pm)?"
+_RANGE_RE = re.compile(_TIME + r"\s*(?:-|–|to)\s*" + _TIME, re.I)
+_DAYS_RE = re.compile(r"\b(mon|tue|wed|thu|fri|sat|sun)[a-z]*\.?(?:\s*(?:-|–|to)\s*(mon|tue|wed|thu|fri|sat|sun)[a-z]*\.?)?", re.I)
+
+
+class WorkingHoursError(ValueError):
+    pass
+
+
+class SlotFullError(Exception):
+    """A slot would hold more active bookings than there are doctors to see them."""
+
+
+# ---------------- WORKING HOURS -----------------
+def _to_minutes(hour, minute, meridiem):
+    hour, minute = int(hour), int(minute or 0)
+    if meridiem:
+        meridiem = meridiem.lower()
+        if not 1 <= hour <= 12:
+            raise WorkingHoursError(f"Invalid hour: {hour}{meridiem}")
+        hour = hour % 12 + (12 if meridiem == "pm" else 0)
+    if hour > 24 or minute > 59:
+        raise WorkingHoursError(f"Invalid time: {hour}:{minute:02d}")
+    return hour * 60 + minute
+
+
+def parse_working_hours(text):
+    """Parse SiteSettings.working_hours into {weekday: [(start_minute, end_minute), ...]}.
+
+    Accepts e.g. "9AM - 5PM", "09:00-17:00" or "Mon-Fri 8:30-17:00; Sat 9am-1pm".
+    Segments without days apply to every day.
+    """
+    hours = {}
+    for segment in re.split(r"[;,\n]", text or ""):
+        segment = segment.strip()
+        if not segment:
+            continue
+        match = _RANGE_RE.search(segment)
+        if not match:
+            raise WorkingHoursError(f"Could not read working hours: {segment!r}")
+        h1, m1, ap1, h2, m2, ap2 = match.groups()
+        # "9-5PM" means 9AM-5PM
+        if ap2 and not ap1 and int(h1) <= 12:
+            ap1 = "am" if ap2.lower() == "pm" and int(h1) > int(h2) else ap2
+        start, end = _to_minutes(h1, m1, ap1), _to_minutes(h2, m2, ap2)
+        if end <= start:
+            raise WorkingHoursError(f"Working hours end before they start: {segment!r}")
+
+        weekdays = set()
+        for first, last in _DAYS_RE.findall(segment[:match.start()]):
+            i = DAYS.index(first.lower()[:3])
+            j = DAYS.index(last.lower()[:3]) if last else i
+            while True:
+                weekdays.add(i)
+                if i == j:
+                    break
+                i = (i + 1) % 7
+        for weekday in weekdays or range(7):
+            hours.setdefault(weekday, []).append((start, end))
+
+    for ranges in hours.values():
+        ranges.sort()
+    return hours
+
+
+def working_hours_or_default(text):
+    try:
+        return parse_working_hours(text or DEFAULT_WORKING_HOURS)
+    except WorkingHoursError:
+        return parse_working_hours(DEFAULT_WORKING_HOURS)
+
+
+WORKING_HOURS_SELECT = select(SiteSettings.working_hours).order_by(SiteSettings.id).limit(1)
+
+
+def clinic_working_hours():
+    return working_hours_or_default(db.session.execute(WORKING_HOURS_SELECT).scalar())
+
+
+# ---------------- SLOT GRID -----------------
+def slot_grid(working_hours, day, slot_minutes=DEFAULT_SLOT_MINUTES):
+    """Start times (in minutes) of every slot that fits inside the working hours of `day`."""
+    starts = []
+    for start, end in working_hours.get(day.weekday(), []):
+        t = start
+        while t + slot_minutes <= end:
+            starts.append(t)
+            t += slot_minutes
+    return starts
+
+
+class IntervalIndex:
+    """Booked intervals of one day, kept sorted so overlap checks are a bisect away."""
+
+    def __init__(self, intervals=()):
+        self.intervals = sorted(intervals)
+        self._starts = [start for start, _ in self.intervals]
+
+    def add(self, start, end):
+        i = bisect.bisect_left(self._starts, start)
+        self._starts.insert(i, start)
+        self.intervals.insert(i, (start, end))
+
+    def overlaps(self, start, end):
+        i = bisect.bisect_left(self._starts, end)
+        # Only the interval starting right before `end` can reach into [start, end)
+        return i > 0 and self.intervals[i - 1][1] > start
+
+
+def _minutes(t):
+    return t.hour * 60 + t.minute
+
+
+def _format(minutes):
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def booked_select(doctor_id, start_date, end_date):
+    """A doctor's active bookings, served by ix_appointment_doctor_id_date."""
+    return select(Appointment.date, Appointment.time).where(
+        Appointment.doctor_id == doctor_id,
+        Appointment.date >= start_date,
+        Appointment.date <= end_date,
+        Appointment.status != "rejected",
+        Appointment.time.isnot(None),
+    )
+
+
+def index_bookings(rows, slot_minutes=DEFAULT_SLOT_MINUTES):
+    """{date: IntervalIndex} from (date, time) rows."""
+    index = {}
+    for day, t in rows:
+        start = _minutes(t)
+        index.setdefault(day, IntervalIndex()).add(start, start + slot_minutes)
+    return index
+
+
+def booked_index(doctor_id, start_date, end_date, slot_minutes=DEFAULT_SLOT_MINUTES):
+    return index_bookings(db.session.execute(booked_select(doctor_id, start_date, end_date)).all(), slot_minutes)
+
+
+# ---------------- SLOT CAPACITY -----------------
+# uq_appointment_doctor_slot only sees bookings with a doctor. Bookings for "any doctor"
+# (doctor_id NULL) are held to capacity instead: a slot takes no more active bookings, with
+# or without a doctor, than there are doctors (at least one, so a clinic that hasn't added
+# its doctor accounts yet still takes requests). Claims then always find a doctor free.
+def _doctor_capacity():
+    doctors = select(func.count()).select_from(User).where(User.role == "doctor").scalar_subquery()
+    return case((doctors > 0, doctors), else_=1)
+
+
+def _active_by_slot():
+    return (
+        select(Appointment.date, Appointment.time)
+        .where(Appointment.status != "rejected", Appointment.time.isnot(None))
+        .group_by(Appointment.date, Appointment.time)
+    )
+
+
+def full_slots_select(start_date, end_date):
+    """(date, time) of slots with no doctor left for another booking."""
+    return (
+        _active_by_slot()
+        .where(Appointment.date >= start_date, Appointment.date <= end_date)
+        .having(func.count() >= _doctor_capacity())
+    )
+
+
+def overbooked_select(slots):
+    """The (date, time) pairs among `slots` holding more active bookings than there are doctors."""
+    return (
+        _active_by_slot()
+        .where(tuple_(Appointment.date, Appointment.time).in_(slots))
+        .having(func.count() > _doctor_capacity())
+    )
+
+
+def slot_lock_select(dialect_name, day, t):
+    """A transaction-scoped advisory lock on the slot, so concurrent bookings of it count one
+    after the other. None on SQLite, whose single writer serializes them already."""
+    if dialect_name != "postgresql":
+        return None
+    return select(func.pg_advisory_xact_lock(SLOT_LOCK_CLASS, day.toordinal() * 1440 + _minutes(t)))
+
+
+def lock_slot(day, t):
+    stmt = slot_lock_select(db.session.connection().dialect.name, day, t) if t else None
+    if stmt is not None:
+        db.session.execute(stmt)
+
+
+def check_capacity(slots):
+    """Flush, then raise SlotFullError if any of the (date, time) `slots` is overbooked."""
+    slots = [(day, t) for day, t in slots if t is not None]
+    if not slots:
+        return
+    db.session.flush()
+    if db.session.execute(overbooked_select(slots)).first() is not None:
+        raise SlotFullError("that slot is fully booked")
+
+
+def check_range(start_date, end_date):
+    if end_date < start_date:
+        raise ValueError("end date is before start date")
+    if (end_date - start_date).days >= MAX_RANGE_DAYS:
+        raise ValueError(f"range is limited to {MAX_RANGE_DAYS} days")
+
+
+def free_slots(doctor_id, start_date, end_date, slot_minutes=DEFAULT_SLOT_MINUTES, now=None):
+    """{date: ["09:00", "09:30", ...]} of open slots between two dates (inclusive).
+
+    Without a doctor, every slot inside working hours that some doctor can still take.
+    """
+    check_range(start_date, end_date)
+    hours = clinic_working_hours()
+    rows = db.session.execute(full_slots_select(start_date, end_date)).all()
+    if doctor_id:
+        rows += db.session.execute(booked_select(doctor_id, start_date, end_date)).all()
+    return open_slots(hours, index_bookings(rows, slot_minutes), start_date, end_date, slot_minutes, now)
+
+
+def open_slots(hours, booked, start_date, end_date, slot_minutes=DEFAULT_SLOT_MINUTES, now=None):
+    """The slot computation behind free_slots(), given working hours and booked_index()."""
+    now = now or datetime.now()
+    slots = {}
+    day = start_date
+    while day <= end_date:
+        taken = booked.get(day, IntervalIndex())
+        free = []
+        for start in slot_grid(hours, day, slot_minutes):
+            if day == now.date() and start <= _minutes(now.time()):
+                continue
+            if day < now.date() or taken.overlaps(start, start + slot_minutes):
+                continue
+            free.append(_format(start))
+        slots[day.isoformat()] = free
+        day += timedelta(days=1)
+    return slots
+
+
+def is_bookable(day, t, slot_minutes=DEFAULT_SLOT_MINUTES, hours=None):
+    """Whether `t` on `day` is the start of a slot inside working hours."""
+    hours = clinic_working_hours() if hours is None else hours
+    return _minutes(t) in slot_grid(hours, day, slot_minutes) and t.second == 0
@@ -0,0 +1,126 @@
+# stats.py
+from flask import current_app
+from sqlalchemy import case, event, func, inspect, select, update
+
+from models import db, User, Appointment, StatCounter
+
+COUNTER_NAMES = ("users", "appointments", "pending", "approved", "rejected")
+
+
+# ---------------- DASHBOARD NUMBERS -----------------
+def aggregate_stats():
+    """All dashboard numbers in a single query (one pass over appointment)."""
+    def status_count(status):
+        return func.coalesce(func.sum(case((Appointment.status == status, 1), else_=0)), 0)
+
+    row = db.session.execute(
+        select(
+            select(func.count(User.id)).scalar_subquery(),
+            func.count(Appointment.id),
+            status_count("pending"),
+            status_count("approved"),
+            status_count("rejected"),
+        ).select_from(Appointment)
+    ).one()
+    return dict(zip(COUNTER_NAMES, (int(v) for v in row)))
+
+
+def counter_stats():
+    rows = db.session.execute(select(StatCounter.name, StatCounter.value)).all()
+    counters = {name: value for name, value in rows}
+    if not all(name in counters for name in COUNTER_NAMES):
+        return None  # table not built yet, see `manage.py rebuild-counters`
+    return {name: counters[name] for name in COUNTER_NAMES}
+
+
+def dashboard_stats():
+    if current_app.config.get("STATS_COUNTERS"):
+        stats = counter_stats()
+        if stats is not None:
+            return stats
+    return aggregate_stats()
+
+
+# ---------------- COUNTER MAINTENANCE -----------------
+def rebuild_counters():
+    """Recompute every counter from the source tables and overwrite the stored values."""
+    stats = aggregate_stats()
+    for name, value in stats.items():
+        counter = db.session.get(StatCounter, name)
+        if counter is None:
+            db.session.add(StatCounter(name=name, value=value))
+        else:
+            counter.value = value
+    db.session.commit()
+    return stats
+
+
+def _status_of(obj):
+    return inspect(obj).dict.get("status") or "pending"
+
+
+def _collect_deltas(session):
+    deltas = {}
+
+    def bump(name, by):
+        if name in COUNTER_NAMES:
+            deltas[name] = deltas.get(name, 0) + by
+
+    for obj in session.new:
+        if isinstance(obj, User):
+            bump("users", 1)
+        elif isinstance(obj, Appointment):
+            bump("appointments", 1)
+            bump(_status_of(obj), 1)
+
+    for obj in session.deleted:
+        if isinstance(obj, User):
+            bump("users", -1)
+        elif isinstance(obj, Appointment):
+            bump("appointments", -1)
+            history = inspect(obj).attrs.status.history
+            bump((history.deleted or history.unchanged or [_status_of(obj)])[0], -1)
+
+    for obj in session.dirty:
+        if isinstance(obj, Appointment) and obj not in session.deleted:
+            history = inspect(obj).attrs.status.history
+            if history.added and history.deleted:
+                bump(history.deleted[0], -1)
+                bump(history.added[0], 1)
+
+    return {name: by for name, by in deltas.items() if by}
+
+
+def apply_counter_deltas(connection, deltas):
+    table = StatCounter.__table__
+    for name, by in deltas.items():
+        connection.execute(
+            update(table).where(table.c.name == name).values(value=table.c.value + by)
+        )
+
+
+def record_bulk_change(deltas):
+    """Apply counter deltas for set-based UPDATE/DELETE statements, which never reach the
+    after_flush hook; runs in the caller's transaction."""
+    if not current_app.config.get("STATS_COUNTERS"):
+        return
+    deltas = {name: by for name, by in deltas.items() if name in COUNTER_NAMES and by}
+    if deltas:
+        apply_counter_deltas(db.session.connection(), deltas)
+
+
+def _update_counters(sess, flush_context):
+    deltas = _collect_deltas(sess)
+    if deltas:
+        apply_counter_deltas(sess.connection(), deltas)
+
+
+def register_counter_tracking(session):
+    """Keep stat_counter in step with User/Appointment changes, inside the same transaction."""
+    if not event.contains(session, "after_flush", _update_counters):
+        event.listen(session, "after_flush", _update_counters)
+
+
+def init_stats(app):
+    if app.config.get("STATS_COUNTERS"):
+        register_counter_tracking(db.session)
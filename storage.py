@@ -0,0 +1,216 @@
+# storage.py
+import os
+import shutil
+import tempfile
+
+from flask import current_app, redirect, send_from_directory
+from werkzeug.security import safe_join
+
+CHUNK_SIZE = 64 * 1024
+
+
+# ----------------------
+# Local filesystem driver
+# ----------------------
+class LocalStorage:
+    """Files under a local directory (UPLOAD_FOLDER); Flask streams them to the browser."""
+
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, key):
+        path = safe_join(self.root, key)
+        if path is None:
+            raise ValueError(f"Invalid storage key: {key!r}")
+        return path
+
+    def exists(self, key):
+        return os.path.isfile(self._path(key))
+
+    def save(self, key, fileobj, content_type=None, cache_control=None):
+        """Copy a file-like object into storage in chunks."""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".upload-")
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                shutil.copyfileobj(fileobj, tmp, CHUNK_SIZE)
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def save_file(self, key, local_path, content_type=None, cache_control=None):
+        """Move a local temp file into storage (the temp file is consumed)."""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            os.chmod(local_path, 0o644)
+            os.replace(local_path, path)
+        except OSError:
+            # Different filesystem: copy through a temp file next to the target
+            with open(local_path, "rb") as f:
+                self.save(key, f)
+            os.remove(local_path)
+
+    def open(self, key):
+        return open(self._path(key), "rb")
+
+    def touch(self, key):
+        os.utime(self._path(key))
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def list(self, prefix=""):
+        """Yield (key, modified_timestamp) for every stored file under `prefix`."""
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                key = os.path.relpath(path, self.root).replace(os.sep, "/")
+                if key.startswith(prefix):
+                    yield key, os.path.getmtime(path)
+
+    def public_url(self, key):
+        return None
+
+    def send(self, key, max_age=None):
+        return send_from_directory(self.root, key, max_age=max_age)
+
+
+# ----------------------
+# S3-compatible driver (AWS S3, MinIO, Supabase Storage S3 API, ...)
+# ----------------------
+class S3Storage:
+    """Objects in an S3 bucket. Browsers are redirected to the bucket instead of going through Flask."""
+
+    def __init__(self, bucket, client=None, endpoint_url=None, region=None,
+                 key_prefix="", public_url=None, url_expires=3600):
+        if client is None:
+            import boto3  # only needed when STORAGE_BACKEND=s3
+
+            client = boto3.client("s3", endpoint_url=endpoint_url, region_name=region)
+        self.client = client
+        self.bucket = bucket
+        self.key_prefix = key_prefix
+        self.public_base = public_url.rstrip("/") + "/" if public_url else None
+        self.url_expires = url_expires
+
+    def _key(self, key):
+        return self.key_prefix + key
+
+    def _extra_args(self, content_type, cache_control):
+        extra = {}
+        if content_type:
+            extra["ContentType"] = content_type
+        if cache_control:
+            extra["CacheControl"] = cache_control
+        return extra
+
+    def exists(self, key):
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._key(key))
+            return True
+        except Exception as e:  # botocore ClientError, or a fake client's equivalent
+            code = getattr(e, "response", {}).get("Error", {}).get("Code")
+            if code in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+
+    def save(self, key, fileobj, content_type=None, cache_control=None):
+        # upload_fileobj streams in multipart chunks; the whole file is never held in memory
+        self.client.upload_fileobj(
+            fileobj, self.bucket, self._key(key),
+            ExtraArgs=self._extra_args(content_type, cache_control),
+        )
+
+    def save_file(self, key, local_path, content_type=None, cache_control=None):
+        try:
+            self.client.upload_file(
+                local_path, self.bucket, self._key(key),
+                ExtraArgs=self._extra_args(content_type, cache_control),
+            )
+        finally:
+            os.remove(local_path)
+
+    def open(self, key):
+        """Download into a spooled temp file (seekable, spills to disk past 1 MB)."""
+        tmp = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+        self.client.download_fileobj(self.bucket, self._key(key), tmp)
+        tmp.seek(0)
+        return tmp
+
+    def touch(self, key):
+        # A copy onto itself needs REPLACE, which drops whatever isn't passed again
+        head = self.client.head_object(Bucket=self.bucket, Key=self._key(key))
+        self.client.copy_object(
+            Bucket=self.bucket, Key=self._key(key),
+            CopySource={"Bucket": self.bucket, "Key": self._key(key)},
+            MetadataDirective="REPLACE",
+            Metadata=head.get("Metadata", {}),
+            **self._extra_args(head.get("ContentType"), head.get("CacheControl")),
+        )
+
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(key))
+
+    def list(self, prefix=""):
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self._key(prefix)):
+            for obj in page.get("Contents", []):
+                yield obj["Key"][len(self.key_prefix):], obj["LastModified"].timestamp()
+
+    def public_url(self, key):
+        """Direct URL when the bucket (or a CDN in front of it) is publicly readable."""
+        return self.public_base + self._key(key) if self.public_base else None
+
+    def presigned_url(self, key):
+        return self.client.generate_presigned_url(
+            "get_object",
+            Params={"Bucket": self.bucket, "Key": self._key(key)},
+            ExpiresIn=self.url_expires,
+        )
+
+    def send(self, key, max_age=None):
+        response = redirect(self.public_url(key) or self.presigned_url(key))
+        # Let browsers reuse the redirect, but not past the presigned URL's lifetime
+        response.cache_control.private = True
+        response.cache_control.max_age = self.url_expires // 2
+        return response
+
+
+# ----------------------
+# Setup
+# ----------------------
+def init_storage(app):
+    backend = app.config.get("STORAGE_BACKEND", "local")
+
+    if backend == "local":
+        storage = LocalStorage(app.config["UPLOAD_FOLDER"])
+    elif backend == "s3":
+        bucket = app.config.get("S3_BUCKET")
+        if not bucket:
+            raise ValueError("S3_BUCKET must be set when STORAGE_BACKEND=s3")
+        storage = S3Storage(
+            bucket,
+            endpoint_url=app.config.get("S3_ENDPOINT_URL"),
+            region=app.config.get("S3_REGION"),
+            key_prefix=app.config.get("S3_KEY_PREFIX", ""),
+            public_url=app.config.get("STORAGE_PUBLIC_URL"),
+            url_expires=app.config.get("STORAGE_URL_EXPIRES", 3600),
+        )
+    else:
+        raise ValueError(f"Unknown STORAGE_BACKEND: {backend}")
+
+    app.extensions["storage"] = storage
+    return storage
+
+
+def get_storage():
+    return current_app.extensions["storage"]
@@ -0,0 +1,118 @@
+# uploads.py
+import hashlib
+import mimetypes
+import os
+import re
+import tempfile
+import time
+
+from flask import url_for
+
+from images import IMMUTABLE, VARIANT_DIR, delete_variants, variant_stem
+from models import db, HomeContent
+from storage import get_storage
+
+CHUNK_SIZE = 64 * 1024
+
+# Content-addressed names: sha256 of the bytes plus the original extension
+BLOB_NAME_RE = re.compile(r"^[0-9a-f]{64}\.[a-z0-9]+$")
+
+
+def is_blob_name(name):
+    return bool(name and BLOB_NAME_RE.match(name))
+
+
+# ---------------- STORE -----------------
+def save_upload(file):
+    """Store an uploaded file under the hash of its contents and return the new filename.
+
+    The upload is streamed in chunks to a temp file while hashing, then handed to the
+    storage backend. If the same bytes were uploaded before, the existing blob is reused.
+    """
+    ext = file.filename.rsplit(".", 1)[1].lower()
+    storage = get_storage()
+
+    digest = hashlib.sha256()
+    fd, tmp_path = tempfile.mkstemp(prefix=".upload-")
+    try:
+        with os.fdopen(fd, "wb") as tmp:
+            for chunk in iter(lambda: file.stream.read(CHUNK_SIZE), b""):
+                digest.update(chunk)
+                tmp.write(chunk)
+
+        name = f"{digest.hexdigest()}.{ext}"
+        if storage.exists(name):
+            os.remove(tmp_path)
+            storage.touch(name)  # counts as fresh for the garbage collector's grace period
+        else:
+            storage.save_file(name, tmp_path, content_type=mimetypes.guess_type(name)[0],
+                              cache_control=IMMUTABLE)
+        return name
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def refcount(name):
+    return HomeContent.query.filter_by(image=name).count()
+
+
+def release_upload(name):
+    """Delete a stored image and its variants once no HomeContent row points at it.
+
+    Call after the commit that dropped the reference. Returns True if the file was removed;
+    raises OSError (or the storage backend's error) if it could not be.
+    """
+    if not name or refcount(name):
+        return False
+    storage = get_storage()
+    storage.delete(name)
+    delete_variants(storage, name)
+    return True
+
+
+# ---------------- GARBAGE COLLECTION -----------------
+def collect_garbage(min_age=3600, dry_run=False):
+    """Remove blobs and variants that no HomeContent row references.
+
+    Files younger than `min_age` seconds are kept: an upload is stored before the row
+    that references it is committed.
+    """
+    storage = get_storage()
+    referenced = {name for (name,) in db.session.query(HomeContent.image).distinct() if name}
+    referenced_stems = {variant_stem(name) for name in referenced}
+    cutoff = time.time() - min_age
+    removed = []
+
+    for key, modified in list(storage.list()):
+        if modified >= cutoff:
+            continue
+        if key.startswith(VARIANT_DIR + "/"):
+            orphan = key[len(VARIANT_DIR) + 1:].rsplit("-", 1)[0] not in referenced_stems
+        else:
+            orphan = (is_blob_name(key) and key not in referenced) or key.startswith(".upload-")
+        if orphan:
+            removed.append(key)
+            if not dry_run:
+                storage.delete(key)
+
+    return removed
+
+
+# ---------------- SERVING -----------------
+_IMMUTABLE_VARIANT_RE = re.compile(r"^" + VARIANT_DIR + r"/[0-9a-f]{64}_")
+
+
+def is_immutable(filename):
+    """Hashed blobs and their variants never change, so browsers may cache them forever."""
+    return is_blob_name(filename) or bool(_IMMUTABLE_VARIANT_RE.match(filename))
+
+
+def upload_url(name):
+    """URL for a stored upload (used by templates).
+
+    Points straight at the bucket/CDN when the storage backend has a public URL,
+    otherwise at /media/, which streams the file or redirects to a presigned URL.
+    """
+    return get_storage().public_url(name) or url_for("media.upload", filename=name)